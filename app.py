@@ -1,12 +1,24 @@
 import os
 from datetime import datetime
-from flask import Flask, redirect, url_for, session
-from flask_login import current_user
+from flask import Flask, redirect, url_for
 from config import Config
 from extensions import db, migrate, login_manager
 from models import User
 from dotenv import load_dotenv
 from db_seed import run_seed
+from services.banco_horas import backfill_resumo, fechar_mes_command
+from services.estatisticas import atualizar_estatisticas_command
+from services.folha import gerar_folha_command
+from services.importacao import importar_funcionarios_command
+from services.auditoria import auditoria
+from services.conexoes import monitor_conexoes, opcoes_engine
+from services.arquivo import arquivar_ano_command
+from services.identidade import carregar_usuario
+from services.ingestao import fila_marcacoes
+from services.particoes import criar_particoes_command, desanexar_particoes_command
+from services.pdf import renderizador_pdf, cache_pdf
+from services.replicas import fixar_primario_apos_escrita
+from services.sessao import renovar_sessao
 from utils import format_timedelta
 
 load_dotenv()
@@ -16,17 +28,28 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     app.cli.add_command(run_seed)
+    app.cli.add_command(backfill_resumo)
+    app.cli.add_command(fechar_mes_command)
+    app.cli.add_command(atualizar_estatisticas_command)
+    app.cli.add_command(gerar_folha_command)
+    app.cli.add_command(importar_funcionarios_command)
+    app.cli.add_command(criar_particoes_command)
+    app.cli.add_command(desanexar_particoes_command)
+    app.cli.add_command(arquivar_ano_command)
     app.jinja_env.filters['format_timedelta'] = format_timedelta
 
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", opcoes_engine(app.config))
     db.init_app(app)
+    monitor_conexoes.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    fila_marcacoes.init_app(app)
+    auditoria.init_app(app)
+    renderizador_pdf.init_app(app)
+    cache_pdf.init_app(app)
 
-    @app.before_request
-    def refresh_permanent_session():
-        if current_user and current_user.is_authenticated:
-            session.permanent = True
-            session.modified = True
+    app.before_request(renovar_sessao)
+    app.after_request(fixar_primario_apos_escrita)
 
     # Blueprints
     from routes.admin import admin_bp
@@ -54,9 +77,7 @@ def create_app():
     
     return app
 
-@login_manager.user_loader
-def carregar_usuario(user_id):
-    return User.query.get(int(user_id))
+login_manager.user_loader(carregar_usuario)
 
 # Rodar o app
 if __name__ == '__main__':
@@ -3,7 +3,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 from extensions import db
 from models import User
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.senha import gerar_hash, precisa_rehash
+from utils import log_action
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -16,7 +17,12 @@ def login():
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_senha(senha):
+            # Hash de uma política anterior (método/custo): refeito agora que a senha é conhecida
+            if precisa_rehash(user.senha):
+                user.set_senha(senha)
+                db.session.commit()
             login_user(user, remember=False)
+            log_action(user, "Login")
             flash("Login realizado com sucesso", "success")
 
             if user.tipo == "superadmin": 
@@ -79,7 +85,7 @@ def registrar_ponto():
             flash('Email já cadastrado.', 'warning')
             return redirect(url_for('registrar_funcionario'))
         
-        novo_user = User(nome=nome, data_nascimento=datetime.strptime(data_nascimento, '%Y-%m-%d'), cpf=cpf, cargo=cargo, salario_mensal=salario_mensal, email=email, senha=generate_password_hash(senha), tipo=tipo, rua=rua, telefone=telefone, cidade_uf=cidade_uf, complemento=complemento, bairro=bairro, numero=numero, data_admissao=datetime.strptime(data_admissao, "%Y-%m-%d").date() if data_admissao else date.today(), ativo=ativo)
+        novo_user = User(nome=nome, data_nascimento=datetime.strptime(data_nascimento, '%Y-%m-%d'), cpf=cpf, cargo=cargo, salario_mensal=salario_mensal, email=email, senha=gerar_hash(senha), tipo=tipo, rua=rua, telefone=telefone, cidade_uf=cidade_uf, complemento=complemento, bairro=bairro, numero=numero, data_admissao=datetime.strptime(data_admissao, "%Y-%m-%d").date() if data_admissao else date.today(), ativo=ativo)
         db.session.add(novo_user)
         db.session.commit()
         
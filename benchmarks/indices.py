@@ -0,0 +1,96 @@
+# Benchmark dos índices de ponto: compara os planos de consulta antes e depois dos índices compostos.
+# Usa um banco PostgreSQL descartável (os dados são apagados):
+#   DATABASE_URL=postgresql+psycopg2://.../portal_bench python -m benchmarks.indices --funcionarios 1000 --dias 250
+import click
+from datetime import date
+from sqlalchemy import text
+from app import create_app
+from extensions import db
+from models import Ponto
+from repositories.ponto import consultar_horarios
+
+INDICES = [
+    ("uq_pontos_user_data", "CREATE UNIQUE INDEX uq_pontos_user_data ON pontos (user_id, data)"),
+    ("ix_marcacoes_ponto_hora", "CREATE INDEX ix_marcacoes_ponto_hora ON marcacoes (ponto_id, hora)"),
+    ("ix_usuarios_empresa_tipo", "CREATE INDEX ix_usuarios_empresa_tipo ON usuarios (empresa_id, tipo)"),
+    ("ix_ferias_funcionario_inicio", "CREATE INDEX ix_ferias_funcionario_inicio ON ferias (funcionario_id, inicio)"),
+    ("ix_logs_user_data_hora", "CREATE INDEX ix_logs_user_data_hora ON logs (user_id, data_hora)"),
+]
+
+def popular(funcionarios, dias):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(text("ALTER TABLE pontos DROP CONSTRAINT IF EXISTS uq_pontos_user_data"))
+
+    db.session.execute(text("""
+        INSERT INTO empresa (nome, cnpj, carga_mensal, endereco)
+        SELECT 'Empresa ' || e, lpad(e::text, 14, '0'), 220, 'Rua ' || e FROM generate_series(1, 10) e
+    """))
+    db.session.execute(text("""
+        INSERT INTO usuarios (nome, email, senha, cpf, tipo, salario_mensal, empresa_id, ativo)
+        SELECT 'Func ' || u, 'func' || u || '@bench', 'x', lpad(u::text, 11, '0'),
+               CASE WHEN u % 50 = 0 THEN 'admin' ELSE 'funcionario' END, 3000, (u % 10) + 1, true
+        FROM generate_series(1, :funcionarios) u
+    """), {"funcionarios": funcionarios})
+    db.session.execute(text("""
+        INSERT INTO pontos (user_id, data)
+        SELECT u.id, CURRENT_DATE - d FROM usuarios u, generate_series(0, :dias - 1) d
+    """), {"dias": dias})
+    db.session.execute(text("""
+        INSERT INTO marcacoes (ponto_id, data, hora, tipo)
+        SELECT p.id, p.data, t.hora, t.tipo FROM pontos p,
+            (VALUES (time '08:00', 'entrada'), (time '12:00', 'saida_almoco'),
+                    (time '13:00', 'retorno_almoco'), (time '17:00', 'saida_final')) AS t(hora, tipo)
+    """))
+    db.session.execute(text("""
+        INSERT INTO logs (acao, data_hora, user_id)
+        SELECT 'login', now() - (g || ' minutes')::interval, (g % :funcionarios) + 1 FROM generate_series(1, :funcionarios * 20) g
+    """), {"funcionarios": funcionarios})
+    db.session.commit()
+
+def consultas():
+    inicio_mes = date.today().replace(day=1)
+    horarios = consultar_horarios(Ponto.user_id == 42, Ponto.data >= inicio_mes).statement
+    return {
+        "pontos do mês (user_id, data)": f"SELECT * FROM pontos WHERE user_id = 42 AND data >= '{inicio_mes}'",
+        "marcações do ponto (ponto_id, hora)": "SELECT * FROM marcacoes WHERE ponto_id = 4242 ORDER BY hora",
+        "funcionários da empresa (empresa_id, tipo)": "SELECT * FROM usuarios WHERE empresa_id = 3 AND tipo = 'funcionario'",
+        "logs do usuário (user_id, data_hora)": "SELECT * FROM logs WHERE user_id = 42 ORDER BY data_hora DESC LIMIT 50",
+        "banco de horas do mês (agregado)": str(horarios.compile(db.engine, compile_kwargs={"literal_binds": True})),
+    }
+
+def explicar(titulo):
+    click.echo(f"\n=== {titulo} ===")
+    for nome, sql in consultas().items():
+        plano = [linha[0] for linha in db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))]
+        tempo = next((linha for linha in plano if linha.startswith("Execution Time")), "")
+        click.echo(f"{nome}: {plano[0].strip()} | {tempo}")
+
+@click.command()
+@click.option("--funcionarios", default=1000, help="Quantidade de usuários gerados.")
+@click.option("--dias", default=250, help="Dias de ponto por usuário (4 marcações por dia).")
+@click.option("--sem-popular", is_flag=True, help="Reaproveita os dados já gerados.")
+def main(funcionarios, dias, sem_popular):
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise click.UsageError("O benchmark precisa de um banco PostgreSQL.")
+
+        if not sem_popular:
+            popular(funcionarios, dias)
+        total = db.session.execute(text("SELECT count(*) FROM marcacoes")).scalar()
+        click.echo(f"{total} marcações geradas.")
+
+        for nome, _ in INDICES:
+            db.session.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+        db.session.execute(text("ANALYZE"))
+        explicar("Sem índices compostos")
+
+        for _, ddl in INDICES:
+            db.session.execute(text(ddl))
+        db.session.execute(text("ANALYZE"))
+        explicar("Com índices compostos")
+        db.session.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Benchmark da política de senhas: quanto cada método/custo de SENHA_METODO custa por login.
+# O login é dominado pela verificação do hash, então logins/s por worker ≈ 1 / tempo de verificação
+# (por núcleo: cada worker do gunicorn verifica uma senha por vez).
+#   python -m benchmarks.senha
+#   python -m benchmarks.senha --metodo scrypt:16384:8:1 --metodo pbkdf2:sha256:600000 --repeticoes 50
+import click
+import time
+from services.senha import PasswordHasher, gerar_hash, verificar
+
+METODOS = [
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:1000000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "argon2:2:19456:1",
+    "argon2:3:65536:4",
+]
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+@click.command()
+@click.option("--metodo", "metodos", multiple=True, help="Método no formato de SENHA_METODO (pode repetir).")
+@click.option("--repeticoes", default=20, help="Verificações medidas por método.")
+def main(metodos, repeticoes):
+    metodos = metodos or [m for m in METODOS if PasswordHasher or not m.startswith("argon2")]
+    senha = "Senha-de-teste-123"
+
+    click.echo(f"{'método':<26}{'hash (ms)':>12}{'verificação (ms)':>20}{'logins/s por worker':>22}")
+    for metodo in metodos:
+        hash_senha = gerar_hash(senha, metodo)
+        tempo_hash = medir(lambda: gerar_hash(senha, metodo), max(1, repeticoes // 4))
+        tempo_verificacao = medir(lambda: verificar(hash_senha, senha), repeticoes)
+        click.echo(f"{metodo:<26}{tempo_hash * 1000:>12.1f}{tempo_verificacao * 1000:>20.1f}{1 / tempo_verificacao:>22.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Benchmark da renovação da sessão: custo por resposta da renovação antiga (cookie reassinado em toda
+# requisição autenticada) contra a sessão deslizante de services.sessao. Não usa banco: só o ciclo de
+# requisição do Flask com uma sessão de usuário logado.
+#   python -m benchmarks.sessao --requisicoes 5000
+import click
+import os
+import time
+from flask import Flask, session
+from config import Config
+from services.sessao import renovar_sessao
+
+def renovacao_antiga():
+    if "_user_id" in session:
+        session.permanent = True
+        session.modified = True
+
+PASTA_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+def criar_app(renovacao, refresh_each_request):
+    app = Flask(__name__, static_folder=PASTA_STATIC)
+    app.config.from_object(Config)
+    app.config["SESSION_REFRESH_EACH_REQUEST"] = refresh_each_request
+    app.before_request(renovacao)
+
+    @app.route("/pagina")
+    def pagina():
+        return "ok"
+
+    @app.route("/entrar")
+    def entrar():
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+        return "ok"
+
+    return app
+
+def medir(app, requisicoes, url):
+    cliente = app.test_client()
+    cliente.get("/entrar")
+    cookies = 0
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        resposta = cliente.get(url)
+        cookies += "Set-Cookie" in resposta.headers
+    return (time.perf_counter() - inicio) / requisicoes, cookies
+
+@click.command()
+@click.option("--requisicoes", default=5000, help="Requisições medidas por cenário.")
+def main(requisicoes):
+    cenarios = [
+        ("antiga", criar_app(renovacao_antiga, True)),
+        ("deslizante", criar_app(renovar_sessao, False)),
+    ]
+
+    click.echo(f"{'renovação':<12}{'rota':<28}{'µs/resposta':>14}{'Set-Cookie':>12}")
+    for nome, app in cenarios:
+        for url in ("/pagina", "/static/custom_theme.css"):
+            tempo, cookies = medir(app, requisicoes, url)
+            click.echo(f"{nome:<12}{url:<28}{tempo * 1e6:>14.1f}{cookies:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,38 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 
-db= SQLAlchemy()
+## ROTEAMENTO PARA RÉPLICAS ##
+# Nas views marcadas com services.replicas.somente_leitura, g.replica é o engine de uma réplica e os SELECTs
+# vão para ela. Escritas, flush e qualquer leitura depois de uma escrita na mesma sessão ficam no primário.
+class SessaoRoteada(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None and clause.is_select and not self._flushing and not self.info.get("escreveu"):
+            replica = g.get("replica") if has_app_context() else None
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(SessaoRoteada, "after_flush")
+def _registrar_flush(sessao, contexto):
+    sessao.info["escreveu"] = True
+
+@event.listens_for(SessaoRoteada, "do_orm_execute")
+def _registrar_escrita(estado):
+    if not estado.is_select:
+        estado.session.info["escreveu"] = True
+
+db= SQLAlchemy(session_options={"class_": SessaoRoteada})
 migrate = Migrate()
 login_manager = LoginManager()
-login_manager.login_view = 'auth.login'
\ No newline at end of file
+login_manager.login_view = 'auth.login'
+
+# INSERT com suporte a ON CONFLICT no dialeto em uso (PostgreSQL em produção, SQLite em testes locais)
+def upsert(modelo):
+    if db.session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(modelo)
+    return postgresql.insert(modelo)
\ No newline at end of file
@@ -90,10 +90,21 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # uq_pontos_id_data só existe no modelo quando o banco é PostgreSQL: lá a chave primária já é (id, data)
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (
+            type_ == "unique_constraint" and name == "uq_pontos_id_data"
+            and connectable.dialect.name == "postgresql"
+        )
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
+    # Engine da aplicação: sem DB_PERFIL, `flask db upgrade` usa o perfil batch (sem statement_timeout).
+    # Migrações que copiam tabelas inteiras ainda fazem SET LOCAL statement_timeout = 0.
     connectable = get_engine()
 
     with connectable.connect() as connection:
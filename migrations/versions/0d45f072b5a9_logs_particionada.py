@@ -0,0 +1,98 @@
+"""Tabela logs particionada por mês em data_hora
+
+Revision ID: 0d45f072b5a9
+Revises: 1491bcec599d
+Create Date: 2026-10-18 16:05:41.220917
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d45f072b5a9'
+down_revision = '1491bcec599d'
+branch_labels = None
+depends_on = None
+
+MESES_A_FRENTE = 3
+
+
+def proximo_mes(data):
+    return date(data.year + data.month // 12, data.month % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.execute("UPDATE logs SET data_hora = CURRENT_TIMESTAMP WHERE data_hora IS NULL")
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('logs', schema=None) as batch_op:
+            batch_op.alter_column('data_hora', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    # A tabela é recriada como particionada e os dados copiados: em bases grandes, rodar fora do expediente
+    # A cópia passa do statement_timeout do perfil web; `flask db upgrade` já usa o perfil batch (sem limite)
+    # e o SET LOCAL cobre DB_PERFIL/DB_STATEMENT_TIMEOUT_MS definidos no ambiente
+    op.execute("SET LOCAL statement_timeout = 0")
+    op.execute("ALTER TABLE logs RENAME TO logs_antigo")
+    op.execute("ALTER INDEX IF EXISTS ix_logs_user_data_hora RENAME TO ix_logs_antigo_user_data_hora")
+    op.execute("ALTER INDEX IF EXISTS logs_pkey RENAME TO logs_antigo_pkey")
+    sequencia = bind.scalar(sa.text("SELECT pg_get_serial_sequence('logs_antigo', 'id')"))
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY NONE")
+    op.execute(f"ALTER SEQUENCE {sequencia} AS BIGINT")
+
+    # A chave da partição precisa estar na chave primária; o id continua único pela sequência
+    op.execute(f"""
+        CREATE TABLE logs (
+            id BIGINT NOT NULL DEFAULT nextval('{sequencia}'),
+            acao VARCHAR(255) NOT NULL,
+            data_hora TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER REFERENCES usuarios (id) ON DELETE SET NULL,
+            PRIMARY KEY (id, data_hora)
+        ) PARTITION BY RANGE (data_hora)
+    """)
+    op.execute("CREATE INDEX ix_logs_user_data_hora ON logs (user_id, data_hora)")
+    op.execute("CREATE TABLE logs_padrao PARTITION OF logs DEFAULT")
+
+    hoje = date.today().replace(day=1)
+    mes = bind.scalar(sa.text("SELECT date_trunc('month', min(data_hora))::date FROM logs_antigo")) or hoje
+    fim = hoje
+    for _ in range(MESES_A_FRENTE):
+        fim = proximo_mes(fim)
+    while mes <= fim:
+        op.execute(f"CREATE TABLE logs_p{mes:%Y%m} PARTITION OF logs FOR VALUES FROM ('{mes}') TO ('{proximo_mes(mes)}')")
+        mes = proximo_mes(mes)
+
+    op.execute("INSERT INTO logs (id, acao, data_hora, user_id) SELECT id, acao, data_hora, user_id FROM logs_antigo")
+    op.execute("DROP TABLE logs_antigo")
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY logs.id")
+    # Partições dos meses seguintes: `flask criar_particoes` (cron mensal)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('logs', schema=None) as batch_op:
+            batch_op.alter_column('data_hora', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute("ALTER TABLE logs RENAME TO logs_particionada")
+    op.execute("ALTER INDEX ix_logs_user_data_hora RENAME TO ix_logs_particionada_user_data_hora")
+    sequencia = bind.scalar(sa.text("SELECT pg_get_serial_sequence('logs_particionada', 'id')"))
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY NONE")
+
+    op.execute(f"""
+        CREATE TABLE logs (
+            id INTEGER NOT NULL DEFAULT nextval('{sequencia}') PRIMARY KEY,
+            acao VARCHAR(255) NOT NULL,
+            data_hora TIMESTAMP WITHOUT TIME ZONE,
+            user_id INTEGER REFERENCES usuarios (id)
+        )
+    """)
+    op.execute("INSERT INTO logs (id, acao, data_hora, user_id) SELECT id, acao, data_hora, user_id FROM logs_particionada")
+    op.execute("DROP TABLE logs_particionada")
+    op.execute(f"ALTER SEQUENCE {sequencia} AS INTEGER")
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY logs.id")
+    op.execute("CREATE INDEX ix_logs_user_data_hora ON logs (user_id, data_hora)")
@@ -0,0 +1,36 @@
+"""Tabela empresa_estatisticas (painel do superadmin)
+
+Revision ID: 1491bcec599d
+Revises: e2ddd90eea23
+Create Date: 2026-10-18 14:41:09.502318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1491bcec599d'
+down_revision = 'e2ddd90eea23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('empresa_estatisticas',
+        sa.Column('empresa_id', sa.Integer(), nullable=False),
+        sa.Column('total_admins', sa.Integer(), nullable=False),
+        sa.Column('total_funcionarios', sa.Integer(), nullable=False),
+        sa.Column('funcionarios_ativos', sa.Integer(), nullable=False),
+        sa.Column('mes_referencia', sa.Date(), nullable=False),
+        sa.Column('pontos_mes', sa.Integer(), nullable=False),
+        sa.Column('ultima_atividade', sa.Date(), nullable=True),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['empresa_id'], ['empresa.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('empresa_id')
+    )
+    # Preencher com `flask atualizar_estatisticas` e agendar o comando (ex.: a cada 10 minutos)
+
+
+def downgrade():
+    op.drop_table('empresa_estatisticas')
@@ -0,0 +1,40 @@
+"""Tabela resumo_mensal (fechamento mensal do banco de horas)
+
+Revision ID: 243b757dbfe1
+Revises: 5e3c6896cfb8
+Create Date: 2026-10-18 10:02:17.644120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '243b757dbfe1'
+down_revision = '5e3c6896cfb8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumo_mensal',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ano', sa.Integer(), nullable=False),
+        sa.Column('mes', sa.Integer(), nullable=False),
+        sa.Column('dias_trabalhados', sa.Integer(), nullable=False),
+        sa.Column('segundos_trabalhados', sa.Integer(), nullable=False),
+        sa.Column('saldo', sa.Integer(), nullable=False),
+        sa.Column('extras', sa.Integer(), nullable=False),
+        sa.Column('deficit', sa.Integer(), nullable=False),
+        sa.Column('fechado_em', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('empresa_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['empresa_id'], ['empresa.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['usuarios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'ano', 'mes', name='uq_resumo_mensal_user_mes')
+    )
+
+
+def downgrade():
+    op.drop_table('resumo_mensal')
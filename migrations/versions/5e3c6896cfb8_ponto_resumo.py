@@ -0,0 +1,48 @@
+"""Tabela ponto_resumo (resumo diário do banco de horas)
+
+Revision ID: 5e3c6896cfb8
+Revises: ba43a1bcf15f
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e3c6896cfb8'
+down_revision = 'ba43a1bcf15f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ponto_resumo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.Column('qtd_marcacoes', sa.Integer(), nullable=False),
+        sa.Column('primeira', sa.Time(), nullable=True),
+        sa.Column('ultima', sa.Time(), nullable=True),
+        sa.Column('segundos_trabalhados', sa.Integer(), nullable=False),
+        sa.Column('carga', sa.Integer(), nullable=False),
+        sa.Column('saldo', sa.Integer(), nullable=False),
+        sa.Column('extras', sa.Integer(), nullable=False),
+        sa.Column('deficit', sa.Integer(), nullable=False),
+        sa.Column('ponto_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ponto_id'], ['pontos.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['usuarios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ponto_id')
+    )
+    with op.batch_alter_table('ponto_resumo', schema=None) as batch_op:
+        batch_op.create_index('ix_ponto_resumo_user_data', ['user_id', 'data'], unique=False)
+
+    # Os dados históricos são preenchidos com `flask backfill_resumo`
+
+
+def downgrade():
+    with op.batch_alter_table('ponto_resumo', schema=None) as batch_op:
+        batch_op.drop_index('ix_ponto_resumo_user_data')
+
+    op.drop_table('ponto_resumo')
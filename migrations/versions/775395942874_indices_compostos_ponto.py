@@ -0,0 +1,61 @@
+"""Índices compostos dos acessos de ponto e unicidade de pontos(user_id, data)
+
+Revision ID: 775395942874
+Revises: 243b757dbfe1
+Create Date: 2026-10-18 11:20:05.904771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '775395942874'
+down_revision = '243b757dbfe1'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_marcacoes_ponto_hora', 'marcacoes', ['ponto_id', 'hora']),
+    ('ix_usuarios_empresa_tipo', 'usuarios', ['empresa_id', 'tipo']),
+    ('ix_ferias_funcionario_inicio', 'ferias', ['funcionario_id', 'inicio']),
+    ('ix_logs_user_data_hora', 'logs', ['user_id', 'data_hora']),
+]
+
+
+def upgrade():
+    # Junta pontos duplicados (mesmo usuário e dia) no de menor id antes de criar a restrição única
+    op.execute("""
+        UPDATE marcacoes SET ponto_id = (
+            SELECT MIN(p2.id) FROM pontos p1
+            JOIN pontos p2 ON p2.user_id = p1.user_id AND p2.data = p1.data
+            WHERE p1.id = marcacoes.ponto_id
+        )
+        WHERE ponto_id NOT IN (SELECT MIN(id) FROM pontos GROUP BY user_id, data)
+    """)
+    op.execute("DELETE FROM pontos WHERE id NOT IN (SELECT MIN(id) FROM pontos GROUP BY user_id, data)")
+
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    if postgres:
+        # Em tabelas grandes os índices são criados sem bloquear escritas
+        with op.get_context().autocommit_block():
+            op.create_index('uq_pontos_user_data', 'pontos', ['user_id', 'data'], unique=True, postgresql_concurrently=True)
+            for nome, tabela, colunas in INDICES:
+                op.create_index(nome, tabela, colunas, postgresql_concurrently=True)
+        op.execute('ALTER TABLE pontos ADD CONSTRAINT uq_pontos_user_data UNIQUE USING INDEX uq_pontos_user_data')
+    else:
+        with op.batch_alter_table('pontos', schema=None) as batch_op:
+            batch_op.create_unique_constraint('uq_pontos_user_data', ['user_id', 'data'])
+        for nome, tabela, colunas in INDICES:
+            op.create_index(nome, tabela, colunas)
+
+    # Pontos fundidos acima precisam de `flask backfill_resumo` para atualizar o ponto_resumo
+
+
+def downgrade():
+    for nome, tabela, colunas in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela)
+
+    with op.batch_alter_table('pontos', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_pontos_user_data', type_='unique')
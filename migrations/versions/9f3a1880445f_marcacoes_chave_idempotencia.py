@@ -0,0 +1,28 @@
+"""Chave de idempotência nas marcações
+
+Revision ID: 9f3a1880445f
+Revises: 775395942874
+Create Date: 2026-10-18 13:41:52.220487
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3a1880445f'
+down_revision = '775395942874'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('marcacoes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chave', sa.String(length=80), nullable=True))
+        batch_op.create_unique_constraint('marcacoes_chave_key', ['chave'])
+
+
+def downgrade():
+    with op.batch_alter_table('marcacoes', schema=None) as batch_op:
+        batch_op.drop_constraint('marcacoes_chave_key', type_='unique')
+        batch_op.drop_column('chave')
@@ -0,0 +1,51 @@
+"""Índices da listagem paginada e da busca de funcionários
+
+Revision ID: e2ddd90eea23
+Revises: 9f3a1880445f
+Create Date: 2026-10-18 14:02:37.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2ddd90eea23'
+down_revision = '9f3a1880445f'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_usuarios_empresa_tipo_nome', ['empresa_id', 'tipo', 'nome', 'id']),
+    ('ix_usuarios_empresa_tipo_email', ['empresa_id', 'tipo', 'email', 'id']),
+    ('ix_usuarios_empresa_tipo_cpf', ['empresa_id', 'tipo', 'cpf', 'id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # pg_trgm precisa de um usuário com permissão de criar extensões
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        with op.get_context().autocommit_block():
+            for nome, colunas in INDICES:
+                op.create_index(nome, 'usuarios', colunas, postgresql_concurrently=True)
+            op.create_index('ix_usuarios_nome_trgm', 'usuarios', ['nome'], postgresql_using='gin',
+                            postgresql_ops={'nome': 'gin_trgm_ops'}, postgresql_concurrently=True)
+            op.create_index('ix_usuarios_email_trgm', 'usuarios', ['email'], postgresql_using='gin',
+                            postgresql_ops={'email': 'gin_trgm_ops'}, postgresql_concurrently=True)
+            op.create_index('ix_usuarios_cpf_prefixo', 'usuarios', ['cpf'],
+                            postgresql_ops={'cpf': 'varchar_pattern_ops'}, postgresql_concurrently=True)
+    else:
+        for nome, colunas in INDICES:
+            op.create_index(nome, 'usuarios', colunas)
+        op.create_index('ix_usuarios_nome_trgm', 'usuarios', ['nome'])
+        op.create_index('ix_usuarios_email_trgm', 'usuarios', ['email'])
+        op.create_index('ix_usuarios_cpf_prefixo', 'usuarios', ['cpf'])
+
+
+def downgrade():
+    op.drop_index('ix_usuarios_cpf_prefixo', table_name='usuarios')
+    op.drop_index('ix_usuarios_email_trgm', table_name='usuarios')
+    op.drop_index('ix_usuarios_nome_trgm', table_name='usuarios')
+    for nome, colunas in reversed(INDICES):
+        op.drop_index(nome, table_name='usuarios')
@@ -0,0 +1,158 @@
+"""Tabelas pontos e marcacoes particionadas por mês em data
+
+Revision ID: fb3c3b820739
+Revises: 0d45f072b5a9
+Create Date: 2026-10-18 17:12:30.418533
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fb3c3b820739'
+down_revision = '0d45f072b5a9'
+branch_labels = None
+depends_on = None
+
+MESES_A_FRENTE = 3
+
+PONTOS_PARTICIONADA = """
+    CREATE TABLE pontos (
+        id INTEGER NOT NULL DEFAULT nextval('{sequencia}'),
+        data DATE NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+        PRIMARY KEY (id, data),
+        CONSTRAINT uq_pontos_user_data UNIQUE (user_id, data)
+    ) PARTITION BY RANGE (data)
+"""
+
+MARCACOES_PARTICIONADA = """
+    CREATE TABLE marcacoes (
+        id INTEGER NOT NULL DEFAULT nextval('{sequencia}'),
+        data DATE NOT NULL,
+        hora TIME WITHOUT TIME ZONE NOT NULL,
+        tipo VARCHAR(30),
+        chave VARCHAR(80),
+        ponto_id INTEGER NOT NULL,
+        PRIMARY KEY (id, data),
+        CONSTRAINT uq_marcacoes_chave_data UNIQUE (chave, data),
+        CONSTRAINT marcacoes_ponto_id_data_fkey FOREIGN KEY (ponto_id, data) REFERENCES pontos (id, data) ON DELETE CASCADE
+    ) PARTITION BY RANGE (data)
+"""
+
+PONTOS_COMUM = """
+    CREATE TABLE pontos (
+        id INTEGER NOT NULL DEFAULT nextval('{sequencia}'),
+        data DATE NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+        CONSTRAINT pontos_pkey PRIMARY KEY (id),
+        CONSTRAINT uq_pontos_user_data UNIQUE (user_id, data)
+    )
+"""
+
+MARCACOES_COMUM = """
+    CREATE TABLE marcacoes (
+        id INTEGER NOT NULL DEFAULT nextval('{sequencia}'),
+        data DATE NOT NULL,
+        hora TIME WITHOUT TIME ZONE NOT NULL,
+        tipo VARCHAR(30),
+        chave VARCHAR(80),
+        ponto_id INTEGER NOT NULL REFERENCES pontos (id) ON DELETE CASCADE,
+        CONSTRAINT marcacoes_pkey PRIMARY KEY (id),
+        CONSTRAINT marcacoes_chave_key UNIQUE (chave)
+    )
+"""
+
+
+def proximo_mes(data):
+    return date(data.year + data.month // 12, data.month % 12 + 1, 1)
+
+
+# Renomeia a tabela (e seus índices) para `sufixo` e solta a sequência do id, que passa para a nova tabela
+def renomear(tabela, sufixo, indices):
+    op.execute(f"ALTER TABLE {tabela} RENAME TO {tabela}_{sufixo}")
+    for indice in indices:
+        op.execute(f"ALTER INDEX IF EXISTS {indice} RENAME TO {indice.replace(tabela, f'{tabela}_{sufixo}', 1)}")
+    sequencia = op.get_bind().scalar(sa.text(f"SELECT pg_get_serial_sequence('{tabela}_{sufixo}', 'id')"))
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY NONE")
+    return sequencia
+
+
+def copiar(tabela, origem, colunas, sequencia):
+    op.execute(f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM {origem}")
+    op.execute(f"DROP TABLE {origem}")
+    op.execute(f"ALTER SEQUENCE {sequencia} OWNED BY {tabela}.id")
+
+
+def criar_particoes(tabela, inicio):
+    op.execute(f"CREATE TABLE {tabela}_padrao PARTITION OF {tabela} DEFAULT")
+    fim = date.today().replace(day=1)
+    for _ in range(MESES_A_FRENTE):
+        fim = proximo_mes(fim)
+    mes = inicio
+    while mes <= fim:
+        op.execute(f"CREATE TABLE {tabela}_p{mes:%Y%m} PARTITION OF {tabela} FOR VALUES FROM ('{mes}') TO ('{proximo_mes(mes)}')")
+        mes = proximo_mes(mes)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # A chave estrangeira composta exige que a marcação tenha a mesma data do ponto
+    op.execute("""
+        UPDATE marcacoes SET data = (SELECT pontos.data FROM pontos WHERE pontos.id = marcacoes.ponto_id)
+        WHERE data <> (SELECT pontos.data FROM pontos WHERE pontos.id = marcacoes.ponto_id)
+    """)
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('marcacoes', schema=None) as batch_op:
+            batch_op.drop_constraint('marcacoes_chave_key', type_='unique')
+            batch_op.create_unique_constraint('uq_marcacoes_chave_data', ['chave', 'data'])
+        return
+
+    # As tabelas são recriadas como particionadas e os dados copiados: em bases grandes, rodar fora do expediente.
+    # A cópia passa do statement_timeout do perfil web; `flask db upgrade` já usa o perfil batch (sem limite)
+    # e o SET LOCAL cobre DB_PERFIL/DB_STATEMENT_TIMEOUT_MS definidos no ambiente
+    op.execute("SET LOCAL statement_timeout = 0")
+    # ponto_resumo deixa de referenciar pontos para que partições antigas possam ser desanexadas.
+    op.execute("ALTER TABLE ponto_resumo DROP CONSTRAINT IF EXISTS ponto_resumo_ponto_id_fkey")
+    op.execute("ALTER TABLE marcacoes DROP CONSTRAINT IF EXISTS marcacoes_ponto_id_fkey")
+    seq_pontos = renomear('pontos', 'antigo', ['pontos_pkey', 'uq_pontos_user_data'])
+    seq_marcacoes = renomear('marcacoes', 'antigo', ['marcacoes_pkey', 'marcacoes_chave_key', 'ix_marcacoes_ponto_hora'])
+
+    op.execute(PONTOS_PARTICIONADA.format(sequencia=seq_pontos))
+    op.execute(MARCACOES_PARTICIONADA.format(sequencia=seq_marcacoes))
+    op.execute("CREATE INDEX ix_marcacoes_ponto_hora ON marcacoes (ponto_id, hora)")
+
+    inicio = bind.scalar(sa.text("SELECT date_trunc('month', min(data))::date FROM pontos_antigo")) or date.today().replace(day=1)
+    criar_particoes('pontos', inicio)
+    criar_particoes('marcacoes', inicio)
+
+    copiar('pontos', 'pontos_antigo', 'id, data, user_id', seq_pontos)
+    copiar('marcacoes', 'marcacoes_antigo', 'id, data, hora, tipo, chave, ponto_id', seq_marcacoes)
+    # Partições dos meses seguintes: `flask criar_particoes` (cron mensal)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('marcacoes', schema=None) as batch_op:
+            batch_op.drop_constraint('uq_marcacoes_chave_data', type_='unique')
+            batch_op.create_unique_constraint('marcacoes_chave_key', ['chave'])
+        return
+
+    # Partições já desanexadas (flask desanexar_particoes) não voltam para as tabelas
+    op.execute("ALTER TABLE marcacoes DROP CONSTRAINT marcacoes_ponto_id_data_fkey")
+    seq_marcacoes = renomear('marcacoes', 'particionada', ['marcacoes_pkey', 'uq_marcacoes_chave_data', 'ix_marcacoes_ponto_hora'])
+    seq_pontos = renomear('pontos', 'particionada', ['pontos_pkey', 'uq_pontos_user_data'])
+
+    op.execute(PONTOS_COMUM.format(sequencia=seq_pontos))
+    op.execute(MARCACOES_COMUM.format(sequencia=seq_marcacoes))
+
+    copiar('pontos', 'pontos_particionada', 'id, data, user_id', seq_pontos)
+    copiar('marcacoes', 'marcacoes_particionada', 'id, data, hora, tipo, chave, ponto_id', seq_marcacoes)
+    op.execute("CREATE INDEX ix_marcacoes_ponto_hora ON marcacoes (ponto_id, hora)")
+    op.execute("""
+        ALTER TABLE ponto_resumo ADD CONSTRAINT ponto_resumo_ponto_id_fkey
+        FOREIGN KEY (ponto_id) REFERENCES pontos (id) ON DELETE CASCADE
+    """)
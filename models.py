@@ -1,28 +1,37 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime, date, timedelta, timezone
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.senha import gerar_hash, verificar
+
+TIPOS_MARCACAO = ["entrada", "saida_almoco", "retorno_almoco", "saida_final", "extra_inicio", "extra_fim"]
+
+PARES_MARCACAO = {
+    "entrada": "saida_almoco",
+    "retorno_almoco": "saida_final",
+    "extra_inicio": "extra_fim"
+}
 
 def calcular_horas_ponto(ponto, carga=timedelta(hours=8), limite_extras=2):
     marcacoes = sorted(
         ponto.marcacoes,
         key=lambda m: m.hora)
-    total_trabalhado = timedelta()
-
-    pares = {
-        "entrada": "saida_almoco",
-        "retorno_almoco": "saida_final",
-        "extra_inicio": "extra_fim"
-    }
 
     tipos = {m.tipo: m.hora for m in marcacoes}
 
-    for inicio, fim in pares.items():
+    return calcular_horas(ponto.data, tipos, carga, limite_extras)
+
+def calcular_horas(data, tipos, carga=timedelta(hours=8), limite_extras=2):
+    total_trabalhado = timedelta()
+
+    for inicio, fim in PARES_MARCACAO.items():
         if inicio in tipos and fim in tipos:
-            h1 = datetime.combine(ponto.data, tipos[inicio])
-            h2 = datetime.combine(ponto.data, tipos[fim])
+            h1 = datetime.combine(data, tipos[inicio])
+            h2 = datetime.combine(data, tipos[fim])
             total_trabalhado += (h2 - h1)
 
+    return calcular_saldo(total_trabalhado, carga, limite_extras)
+
+def calcular_saldo(total_trabalhado, carga=timedelta(hours=8), limite_extras=2):
     saldo = total_trabalhado - carga
     limite = timedelta(hours=limite_extras)
     extras = saldo if saldo > timedelta() else timedelta()
@@ -90,23 +99,39 @@ class User(UserMixin, db.Model):
     empresa_id = db.Column(db.Integer, db.ForeignKey("empresa.id", name="fk_usuario_empresa"), nullable=True)  # Chave estrangeira para a empresa
     
     pontos = db.relationship("Ponto", backref="user", cascade="all, delete-orphan", passive_deletes=True)
-    logs = db.relationship("Log", backref="user", lazy=True)
+    logs = db.relationship("Log", backref="user", lazy=True, passive_deletes=True)
+
+    __table_args__ = (
+        db.Index("ix_usuarios_empresa_tipo", "empresa_id", "tipo"),
+        # Paginação por chave da listagem de funcionários (ordenação + id de desempate)
+        db.Index("ix_usuarios_empresa_tipo_nome", "empresa_id", "tipo", "nome", "id"),
+        db.Index("ix_usuarios_empresa_tipo_email", "empresa_id", "tipo", "email", "id"),
+        db.Index("ix_usuarios_empresa_tipo_cpf", "empresa_id", "tipo", "cpf", "id"),
+        # Busca: trigram (pg_trgm) para nome/email com ILIKE, prefixo para CPF
+        db.Index("ix_usuarios_nome_trgm", "nome", postgresql_using="gin", postgresql_ops={"nome": "gin_trgm_ops"}),
+        db.Index("ix_usuarios_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        db.Index("ix_usuarios_cpf_prefixo", "cpf", postgresql_ops={"cpf": "varchar_pattern_ops"}),
+    )
 
     def set_senha(self, senha):
-        self.senha = generate_password_hash(senha)
+        self.senha = gerar_hash(senha)
 
     def check_senha(self, senha):
-        return check_password_hash(self.senha, senha)
+        return verificar(self.senha, senha)
     
 # Modelo de Logs
+# No PostgreSQL a tabela é particionada por mês em data_hora (services.particoes) e a chave primária
+# no banco é (id, data_hora); o id continua único pela sequência. Gravação em lote: services.auditoria
 class Log(db.Model):
     __tablename__ = "logs"
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
     acao = db.Column(db.String(255), nullable=False)
-    data_hora = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    data_hora = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     
-    user_id = db.Column(db.Integer, db.ForeignKey("usuarios.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (db.Index("ix_logs_user_data_hora", "user_id", "data_hora"),)
 
 # Modelo de Aviso
 class Aviso(db.Model):
@@ -133,7 +158,11 @@ class Ferias(db.Model):
     
     funcionario = db.relationship("User", backref="ferias")
 
+    __table_args__ = (db.Index("ix_ferias_funcionario_inicio", "funcionario_id", "inicio"),)
+
 # Modelo de Ponto
+# No PostgreSQL pontos e marcacoes são particionadas por mês em data (services.particoes): as chaves
+# primárias no banco são (id, data) e marcacoes referencia pontos por (ponto_id, data)
 class Ponto(db.Model):
     __tablename__= "pontos"
 
@@ -141,7 +170,25 @@ class Ponto(db.Model):
     data = db.Column(db.Date, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
 
-    marcacoes = db.relationship("Marcacao", backref="ponto", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    # A data entra na junção para que o banco leia só a partição do dia
+    marcacoes = db.relationship(
+        "Marcacao", backref="ponto", lazy=True, cascade="all, delete-orphan", passive_deletes=True, order_by="Marcacao.hora",
+        primaryjoin="and_(Ponto.id == Marcacao.ponto_id, Ponto.data == Marcacao.data)",
+        foreign_keys="[Marcacao.ponto_id, Marcacao.data]"
+    )
+    # Sem chave estrangeira no banco: o resumo é apagado pelo ORM junto com o ponto
+    resumo = db.relationship(
+        "PontoResumo", backref="ponto", uselist=False, cascade="all, delete-orphan",
+        primaryjoin="Ponto.id == PontoResumo.ponto_id", foreign_keys="PontoResumo.ponto_id"
+    )
+
+    __table_args__ = (
+        # Um ponto por usuário por dia: impede duplicatas no find-or-create de registrar_ponto
+        db.UniqueConstraint("user_id", "data", name="uq_pontos_user_data"),
+        # Chave referenciada por marcacoes. No PostgreSQL é a própria chave primária (id, data) e a restrição
+        # só existe no modelo (migrations/env.py a ignora no autogenerate)
+        db.UniqueConstraint("id", "data", name="uq_pontos_id_data"),
+    )
 
 class Marcacao(db.Model):
     __tablename__= "marcacoes"
@@ -150,5 +197,89 @@ class Marcacao(db.Model):
     data = db.Column(db.Date, nullable=False)
     hora = db.Column(db.Time, nullable=False)
     tipo = db.Column(db.String(30))
+    chave = db.Column(db.String(80), nullable=True)  # Chave de idempotência enviada pelo cliente
     
-    ponto_id = db.Column(db.Integer, db.ForeignKey("pontos.id", ondelete="CASCADE"), nullable=False)
\ No newline at end of file
+    ponto_id = db.Column(db.Integer, nullable=False)
+
+    # A unicidade da chave inclui a data (exigência das tabelas particionadas); a repetição de uma batida tem a mesma data
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ["ponto_id", "data"], ["pontos.id", "pontos.data"], ondelete="CASCADE", name="marcacoes_ponto_id_data_fkey"
+        ),
+        db.Index("ix_marcacoes_ponto_hora", "ponto_id", "hora"),
+        db.UniqueConstraint("chave", "data", name="uq_marcacoes_chave_data"),
+    )
+
+# Modelo de Resumo diário do ponto (mantido a cada marcação)
+class PontoResumo(db.Model):
+    __tablename__ = "ponto_resumo"
+
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    qtd_marcacoes = db.Column(db.Integer, nullable=False, default=0)
+    primeira = db.Column(db.Time)
+    ultima = db.Column(db.Time)
+
+    # Valores em segundos
+    segundos_trabalhados = db.Column(db.Integer, nullable=False, default=0)
+    carga = db.Column(db.Integer, nullable=False, default=0)
+    saldo = db.Column(db.Integer, nullable=False, default=0)
+    extras = db.Column(db.Integer, nullable=False, default=0)
+    deficit = db.Column(db.Integer, nullable=False, default=0)
+
+    # Sem chave estrangeira (como no banco migrado): o resumo continua valendo depois que a partição do ponto é desanexada
+    ponto_id = db.Column(db.Integer, nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (db.Index("ix_ponto_resumo_user_data", "user_id", "data"),)
+
+# Modelo de Fechamento mensal do banco de horas (totais congelados por usuário/mês)
+class ResumoMensal(db.Model):
+    __tablename__ = "resumo_mensal"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    dias_trabalhados = db.Column(db.Integer, nullable=False, default=0)
+
+    # Valores em segundos
+    segundos_trabalhados = db.Column(db.Integer, nullable=False, default=0)
+    saldo = db.Column(db.Integer, nullable=False, default=0)
+    extras = db.Column(db.Integer, nullable=False, default=0)
+    deficit = db.Column(db.Integer, nullable=False, default=0)
+
+    fechado_em = db.Column(db.DateTime, nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey("empresa.id", ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (db.UniqueConstraint("user_id", "ano", "mes", name="uq_resumo_mensal_user_mes"),)
+
+# Estatísticas por empresa para o painel do superadmin, recalculadas por `flask atualizar_estatisticas`
+class EmpresaEstatistica(db.Model):
+    __tablename__ = "empresa_estatisticas"
+
+    empresa_id = db.Column(db.Integer, db.ForeignKey("empresa.id", ondelete="CASCADE"), primary_key=True)
+
+    total_admins = db.Column(db.Integer, nullable=False, default=0)
+    total_funcionarios = db.Column(db.Integer, nullable=False, default=0)
+    funcionarios_ativos = db.Column(db.Integer, nullable=False, default=0)
+
+    mes_referencia = db.Column(db.Date, nullable=False)  # Primeiro dia do mês de pontos_mes
+    pontos_mes = db.Column(db.Integer, nullable=False, default=0)
+    ultima_atividade = db.Column(db.Date, nullable=True)  # Data do ponto mais recente
+
+    atualizado_em = db.Column(db.DateTime, nullable=False)
+
+    empresa = db.relationship(
+        "Empresa",
+        backref=db.backref("estatisticas", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    )
+
+    # pontos_mes vale só para mes_referencia: depois da virada do mês, até o próximo recálculo, é zero
+    @property
+    def pontos_mes_atual(self):
+        return self.pontos_mes if self.mes_referencia == mes_corrente() else 0
+
+def mes_corrente():
+    return datetime.now(timezone.utc).date().replace(day=1)
\ No newline at end of file
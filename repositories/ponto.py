@@ -0,0 +1,63 @@
+from sqlalchemy.orm import selectinload
+from extensions import db
+from models import Ponto, Marcacao, PontoResumo, TIPOS_MARCACAO
+
+## CONSULTAS DE PONTO ##
+# Pontos já com as marcações carregadas (ordenadas por hora) em uma única consulta extra,
+# em vez de um Marcacao.query por ponto dentro dos loops das views.
+def pontos_com_marcacoes(*filtros):
+    return (
+        Ponto.query
+        .options(selectinload(Ponto.marcacoes))
+        .filter(*filtros)
+        .order_by(Ponto.data.asc())
+        .all()
+    )
+
+def ponto_do_dia(user_id, data):
+    return (
+        Ponto.query
+        .options(selectinload(Ponto.marcacoes.and_(Marcacao.data == data)))
+        .filter_by(user_id=user_id, data=data)
+        .first()
+    )
+
+# Marcações pivotadas por tipo, uma linha por ponto (base do motor do banco de horas).
+# O período [inicio, fim) filtra pontos e marcações: no PostgreSQL as duas tabelas são particionadas por
+# mês em data, e o filtro em Marcacao.data é o que restringe a leitura às partições do período.
+def consultar_horarios(*filtros, inicio=None, fim=None):
+    horarios = [db.func.max(db.case((Marcacao.tipo == tipo, Marcacao.hora))).label(tipo) for tipo in TIPOS_MARCACAO]
+
+    juncao = [Marcacao.ponto_id == Ponto.id, Marcacao.data == Ponto.data]
+    filtros = list(filtros)
+    if inicio:
+        juncao.append(Marcacao.data >= inicio)
+        filtros.append(Ponto.data >= inicio)
+    if fim:
+        juncao.append(Marcacao.data < fim)
+        filtros.append(Ponto.data < fim)
+
+    return (
+        db.session.query(
+            Ponto.id.label("ponto_id"),
+            Ponto.data,
+            Ponto.user_id,
+            db.func.count(Marcacao.id).label("qtd_marcacoes"),
+            db.func.min(Marcacao.hora).label("primeira"),
+            db.func.max(Marcacao.hora).label("ultima"),
+            *horarios
+        )
+        .outerjoin(Marcacao, db.and_(*juncao))
+        .filter(*filtros)
+        .group_by(Ponto.id, Ponto.data, Ponto.user_id)
+        .order_by(Ponto.data.asc())
+    )
+
+# Resumo diário já calculado (uma linha por dia, sem marcações)
+def consultar_resumos(*filtros):
+    return (
+        PontoResumo.query
+        .filter(*filtros)
+        .order_by(PontoResumo.data.asc())
+        .all()
+    )
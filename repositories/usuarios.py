@@ -0,0 +1,127 @@
+import base64
+import json
+from datetime import date
+from extensions import db
+from models import User
+
+## LISTAGEM DE FUNCIONÁRIOS ##
+# Colunas ordenáveis da listagem; o id entra sempre como desempate para a paginação por chave (keyset)
+ORDENACOES = {
+    "nome": User.nome,
+    "email": User.email,
+    "cpf": User.cpf,
+    "admissao": User.data_admissao,
+}
+
+POR_PAGINA = 50
+POR_PAGINA_MAX = 200
+
+def codificar_cursor(valor, id):
+    if isinstance(valor, date):
+        valor = valor.isoformat()
+    bruto = json.dumps([valor, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+def decodificar_cursor(cursor, ordem):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valor, id = json.loads(bruto)
+        if ordem == "admissao" and valor is not None:
+            valor = date.fromisoformat(valor)
+        return valor, int(id)
+    except (ValueError, TypeError):
+        return None
+
+def filtro_busca(busca):
+    termo = (busca or "").strip()
+    if not termo:
+        return None
+
+    # nome por trecho e email por prefixo (índices trigram no PostgreSQL), CPF por prefixo
+    condicoes = [
+        User.nome.icontains(termo, autoescape=True),
+        User.email.istartswith(termo, autoescape=True),
+    ]
+    # CPF pode estar gravado só com números ou com a máscara 000.000.000-00
+    digitos = "".join(c for c in termo if c.isdigit())
+    if digitos:
+        condicoes.append(User.cpf.startswith(digitos, autoescape=True))
+        if mascara_cpf(digitos) != digitos:
+            condicoes.append(User.cpf.startswith(mascara_cpf(digitos), autoescape=True))
+    return db.or_(*condicoes)
+
+def mascara_cpf(digitos):
+    partes = [digitos[0:3], digitos[3:6], digitos[6:9], digitos[9:11]]
+    mascara = ""
+    for separador, parte in zip(["", ".", ".", "-"], partes):
+        if not parte:
+            break
+        mascara += separador + parte
+    return mascara
+
+def filtro_cursor(coluna, valor, id, desc):
+    # Colunas obrigatórias usam a comparação de tupla, que o PostgreSQL resolve direto no índice
+    if not coluna.nullable:
+        if desc:
+            return db.tuple_(coluna, User.id) < db.tuple_(valor, id)
+        return db.tuple_(coluna, User.id) > db.tuple_(valor, id)
+
+    # Data de admissão pode ser nula, e nulos vão sempre para o fim da listagem
+    if valor is None:
+        return db.and_(coluna.is_(None), User.id < id if desc else User.id > id)
+
+    if desc:
+        depois = db.or_(coluna < valor, db.and_(coluna == valor, User.id < id))
+    else:
+        depois = db.or_(coluna > valor, db.and_(coluna == valor, User.id > id))
+    return db.or_(depois, coluna.is_(None))
+
+def ordenacao(coluna, desc):
+    if desc:
+        ordem = [coluna.desc(), User.id.desc()]
+    else:
+        ordem = [coluna.asc(), User.id.asc()]
+    if coluna.nullable:
+        ordem[0] = ordem[0].nulls_last()
+    return ordem
+
+def listar_funcionarios(*filtros, busca=None, ordem="nome", direcao="asc", cursor=None, por_pagina=POR_PAGINA):
+    if ordem not in ORDENACOES:
+        ordem = "nome"
+    desc = direcao == "desc"
+    coluna = ORDENACOES[ordem]
+    por_pagina = max(1, min(por_pagina or POR_PAGINA, POR_PAGINA_MAX))
+
+    consulta = User.query.filter(*filtros)
+
+    condicao = filtro_busca(busca)
+    if condicao is not None:
+        consulta = consulta.filter(condicao)
+
+    posicao = decodificar_cursor(cursor, ordem) if cursor else None
+    if posicao:
+        consulta = consulta.filter(filtro_cursor(coluna, *posicao, desc))
+
+    consulta = consulta.order_by(*ordenacao(coluna, desc))
+
+    # Uma linha a mais só para saber se existe próxima página, sem COUNT(*)
+    itens = consulta.limit(por_pagina + 1).all()
+    proximo = None
+    if len(itens) > por_pagina:
+        itens = itens[:por_pagina]
+        ultimo = itens[-1]
+        proximo = codificar_cursor(getattr(ultimo, coluna.key), ultimo.id)
+
+    return itens, proximo
+
+def funcionario_json(funcionario):
+    return {
+        "id": funcionario.id,
+        "nome": funcionario.nome,
+        "email": funcionario.email,
+        "cpf": funcionario.cpf,
+        "cargo": funcionario.cargo,
+        "ativo": funcionario.ativo,
+        "data_admissao": funcionario.data_admissao.isoformat() if funcionario.data_admissao else None,
+        "data_demissao": funcionario.data_demissao.isoformat() if funcionario.data_demissao else None,
+    }
@@ -4,7 +4,7 @@ from flask_login import login_required
 from extensions import db
 from models import User, Ferias
 from utils import calcular_pagamento_ferias, admin_required
-import pdfkit
+from routes.common.pdf_utils import gerar_pdf
 from . import admin_bp
 
 # Módulo férias
@@ -84,17 +84,17 @@ def aprovar_ferias(usuario_id, ferias_id):
 
     if ferias.aprovado:
         flash("Férias já aprovadas.", "info")
-        return redirect("admin.ferias_funcionario", usuario_id=usuario_id)
+        return redirect(url_for("admin.ferias_funcionario", usuario_id=usuario_id))
     
     ferias.aprovado = True
     ferias.status = "APROVADO"
     db.session.commit()
 
-    dias_ferias = (ferias.data_fim - ferias.data_inicio).days + 1
+    dias_ferias = (ferias.fim - ferias.inicio).days + 1
     ferias_calc = calcular_pagamento_ferias(funcionario, dias_ferias, ferias.adiantamento_decimo)
 
-    rendered = render_template(
-        "ferias_pdf.html",
+    pdf = gerar_pdf(
+        "documentos/ferias_pdf.html",
         funcionario=funcionario,
         ferias=ferias,
         ferias_calc=ferias_calc,
@@ -107,16 +107,11 @@ def aprovar_ferias(usuario_id, ferias_id):
         ),
     )
 
-    config = pdfkit.configuration(
-        wkhtmltopdf=r"C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe"
-    )
-    pdf = pdfkit.from_string(rendered, False, configuration=config)
-
     response = make_response(pdf)
     response.headers["Content-Type"] = "application/pdf"
     response.headers[
         "Content-Disposition"
-    ] = f'inline; filename="ferias_{funcionario.nome}_{ferias.data_inicio.strftime("%Y-%m-%d")}.pdf"'
+    ] = f'inline; filename="ferias_{funcionario.nome}_{ferias.inicio.strftime("%Y-%m-%d")}.pdf"'
 
     flash("Férias aprovadas e recibo gerado com sucesso!!", "success")
     return response
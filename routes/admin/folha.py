@@ -0,0 +1,56 @@
+import os
+from datetime import date
+from flask import abort, flash, jsonify, redirect, request, render_template, send_file, url_for
+from flask_login import current_user, login_required
+from services.folha import ProcessamentoFolha, iniciar_folha_em_segundo_plano
+from utils import admin_required
+from . import admin_bp
+
+def competencia():
+    hoje = date.today()
+    ano = request.values.get("ano", hoje.year, type=int)
+    mes = request.values.get("mes", hoje.month, type=int)
+    if not 1 <= mes <= 12 or not 2000 <= ano <= 2100:
+        abort(400)
+    return ano, mes
+
+# Folha de pagamento em lote: gera os holerites de todos os funcionários da empresa no mês
+@admin_bp.route('/folha', methods=["GET", "POST"])
+@login_required
+@admin_required
+def folha():
+    ano, mes = competencia()
+
+    if request.method == "POST":
+        if iniciar_folha_em_segundo_plano(current_user.empresa_id, ano, mes):
+            flash(f"Geração da folha {mes:02d}/{ano} iniciada.", "info")
+        else:
+            flash(f"A folha {mes:02d}/{ano} já está sendo gerada.", "warning")
+        return redirect(url_for("admin.folha", ano=ano, mes=mes))
+
+    processamento = ProcessamentoFolha(current_user.empresa_id, ano, mes)
+    return render_template(
+        "admin/folha.html",
+        ano=ano,
+        mes=mes,
+        status=processamento.status(),
+        disponivel=os.path.exists(processamento.arquivo_zip)
+    )
+
+@admin_bp.route('/folha/status')
+@login_required
+@admin_required
+def folha_status():
+    ano, mes = competencia()
+    processamento = ProcessamentoFolha(current_user.empresa_id, ano, mes)
+    return jsonify(status=processamento.status(), disponivel=os.path.exists(processamento.arquivo_zip))
+
+@admin_bp.route('/folha/download')
+@login_required
+@admin_required
+def folha_download():
+    ano, mes = competencia()
+    processamento = ProcessamentoFolha(current_user.empresa_id, ano, mes)
+    if not os.path.exists(processamento.arquivo_zip):
+        abort(404)
+    return send_file(processamento.arquivo_zip, as_attachment=True, download_name=f"folha_{ano}-{mes:02d}.zip")
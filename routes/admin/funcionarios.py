@@ -1,10 +1,14 @@
 from datetime import datetime, timezone
-from flask import abort, render_template, url_for, redirect, flash, request
+from flask import abort, jsonify, render_template, url_for, redirect, flash, request
 from flask_login import current_user, login_required
+from sqlalchemy.exc import SQLAlchemyError
 from extensions import db
 from models import User
-from utils import validar_cpf, admin_required
-from werkzeug.security import generate_password_hash
+from repositories.usuarios import listar_funcionarios, funcionario_json
+from services.conexoes import operacao_longa
+from services.importacao import OBRIGATORIAS, OPCIONAIS, importar_funcionarios
+from services.senha import gerar_hash
+from utils import validar_cpf, admin_required, log_action
 from . import admin_bp
 
 # Módulo de funcionários
@@ -12,8 +16,41 @@ from . import admin_bp
 @login_required
 @admin_required
 def funcionarios():
-    funcionarios = User.query.filter_by(empresa_id=current_user.empresa_id, tipo="funcionario").all()
-    return render_template('admin/admin_funcionario.html', funcionarios=funcionarios)
+    busca = request.args.get("busca", "")
+    ordem = request.args.get("ordem", "nome")
+    direcao = request.args.get("direcao", "asc")
+
+    funcionarios, proximo = listar_funcionarios(
+        User.empresa_id == current_user.empresa_id,
+        User.tipo == "funcionario",
+        busca=busca,
+        ordem=ordem,
+        direcao=direcao,
+        cursor=request.args.get("cursor"),
+    )
+    return render_template(
+        'admin/admin_funcionario.html',
+        funcionarios=funcionarios,
+        proximo=proximo,
+        busca=busca,
+        ordem=ordem,
+        direcao=direcao
+    )
+
+@admin_bp.route('/api/funcionarios')
+@login_required
+@admin_required
+def funcionarios_api():
+    funcionarios, proximo = listar_funcionarios(
+        User.empresa_id == current_user.empresa_id,
+        User.tipo == "funcionario",
+        busca=request.args.get("busca"),
+        ordem=request.args.get("ordem", "nome"),
+        direcao=request.args.get("direcao", "asc"),
+        cursor=request.args.get("cursor"),
+        por_pagina=request.args.get("por_pagina", type=int),
+    )
+    return jsonify(funcionarios=[funcionario_json(f) for f in funcionarios], proximo=proximo)
 
 @admin_bp.route("/funcionarios/novo", methods=['GET', 'POST'])
 @login_required
@@ -62,7 +99,7 @@ def novo_funcionario():
             cargo = dados['cargo'],
             salario_mensal = salario,
             email = dados['email'],
-            senha = generate_password_hash(dados['senha'], method='pbkdf2:sha256'),
+            senha = gerar_hash(dados['senha']),
             data_admissao = datetime.now(timezone.utc),
             tipo = "funcionario",
             empresa_id = current_user.empresa_id,
@@ -75,6 +112,27 @@ def novo_funcionario():
     
     return render_template('admin/novo_funcionario.html')
 
+# Importação em lote (CSV); o relatório mostra o que entrou e o erro de cada linha recusada
+@admin_bp.route("/funcionarios/importar", methods=['GET', 'POST'])
+@login_required
+@admin_required
+@operacao_longa
+def importar_funcionarios_csv():
+    relatorio = None
+    if request.method == 'POST':
+        arquivo = request.files.get("arquivo")
+        if not arquivo or not arquivo.filename:
+            flash("Selecione um arquivo CSV.", "danger")
+            return redirect(url_for("admin.importar_funcionarios_csv"))
+
+        relatorio = importar_funcionarios(arquivo.stream, current_user.empresa_id)
+        if relatorio["importados"]:
+            flash(f"{relatorio['importados']} funcionários importados.", "success")
+        if relatorio["erros"]:
+            flash(f"{len(relatorio['erros'])} linhas não foram importadas.", "warning")
+
+    return render_template('admin/importar_funcionarios.html', relatorio=relatorio, obrigatorias=OBRIGATORIAS, opcionais=OPCIONAIS)
+
 @admin_bp.route('/funcionario/<int:id>/desligar', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -86,7 +144,14 @@ def desligar_funcionario(id):
     if request.method == 'POST':
         funcionario.ativo = False
         funcionario.data_demissao = datetime.now(timezone.utc).date()
-        db.session.commit()
+        # Registro de auditoria na mesma transação: sem ele o desligamento não é gravado
+        try:
+            log_action(current_user, f"Desligou o funcionário {funcionario.nome} (id {funcionario.id})", sincrono=True)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            flash('Não foi possível desligar o funcionário. Tente novamente.', 'danger')
+            return redirect(url_for('admin.funcionarios'))
         flash(f'Funcionário {funcionario.nome} desligado.', 'warning')
         return redirect(url_for('admin.funcionarios'))
     
@@ -123,7 +188,14 @@ def excluir_funcionario(id):
     if funcionario.empresa_id != current_user.empresa_id:
         abort(403)
 
-    db.session.delete(funcionario)
-    db.session.commit()
+    nome = funcionario.nome
+    try:
+        log_action(current_user, f"Excluiu o funcionário {nome} (id {id})", sincrono=True)
+        db.session.delete(funcionario)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        flash('Não foi possível excluir o funcionário. Tente novamente.', 'danger')
+        return redirect(url_for('admin.funcionarios'))
     flash('Funcionário excluído com sucesso.', 'success')
     return redirect(url_for('admin.funcionarios'))
@@ -1,8 +1,12 @@
 from datetime import date, datetime, timedelta, timezone
-from extensions import db
-from flask import flash, redirect, url_for, render_template
+from flask import Response, current_app, flash, jsonify, redirect, request, stream_with_context, url_for, render_template
 from flask_login import current_user, login_required
-from models import User, Ponto, Marcacao, calcular_horas_ponto
+from models import User, Ponto, PontoResumo
+from services.banco_horas import calcular_banco_horas, calcular_banco_horas_resumo, calcular_banco_horas_acumulado, totalizar, jornada_diaria
+from services.conexoes import operacao_longa
+from services import exportacao
+from services.ponto import registrar_marcacao, sincronizar_batidas
+from services.replicas import fixar_primario, somente_leitura
 from utils import admin_required
 from . import admin_bp
 
@@ -10,157 +14,148 @@ from . import admin_bp
 @admin_bp.route('/registrar_ponto', methods=["GET", "POST"])
 @login_required
 def registrar_ponto():
-    hoje = datetime.now(timezone.utc).date()
-    agora = datetime.now(timezone.utc).time()
+    tipo = registrar_marcacao(current_user)
+    fixar_primario()  # aceita GET: o after_request não cobre
 
-    ponto = Ponto.query.filter_by(user_id=current_user.id, data=hoje).first()
-
-    # Verificação de entradas ou saídas existentes
-    if not ponto:
-        ponto = Ponto(user_id=current_user.id, data=hoje)
-        db.session.add(ponto)
-        db.session.commit()
-
-    qtd_pontos = Marcacao.query.filter_by(ponto_id=ponto.id).count()
-
-    tipos = ["entrada", "saida_almoco", "retorno_almoco", "saida_final", "extra_inicio", "extra_fim"]
-
-    if qtd_pontos < len(tipos):
-        tipo = tipos[qtd_pontos]
-        marcacao = Marcacao(data=hoje, hora=agora, tipo=tipo, ponto=ponto)
-        db.session.add(marcacao)
-        db.session.commit()
+    if tipo:
         flash(f"{tipo.replace('_',' ').title()} registrada com sucesso!", "success")
     else:
         flash("Você já registrou todos os pontos hoje.", "warning")
 
     return redirect(url_for("admin.dashboard"))
 
+# Sincronização em lote dos terminais das filiais (batidas coletadas offline)
+@admin_bp.route('/api/marcacoes/sincronizar', methods=["POST"])
+@login_required
+@admin_required
+def sincronizar_marcacoes():
+    dados = request.get_json(silent=True) or {}
+    itens = dados.get("batidas")
+
+    if not isinstance(itens, list):
+        return jsonify(erro="Envie as batidas em uma lista no campo 'batidas'."), 400
+    if len(itens) > current_app.config["PONTO_SINCRONIZACAO_MAX"]:
+        return jsonify(erro=f"Máximo de {current_app.config['PONTO_SINCRONIZACAO_MAX']} batidas por requisição."), 413
+
+    relatorio = sincronizar_batidas(itens, current_user.empresa_id)
+    resumo = {}
+    for item in relatorio:
+        resumo[item["status"]] = resumo.get(item["status"], 0) + 1
+
+    return jsonify(resumo=resumo, itens=relatorio)
+
 @admin_bp.route('/banco_horas/mensal/<int:usuario_id>')
 @login_required
+@somente_leitura
 def banco_horas_mensal(usuario_id):
     funcionario = User.query.get_or_404(usuario_id)
 
     hoje = datetime.today().date()
     inicio_mes = date(hoje.year, hoje.month, 1)
 
-    pontos = (
-        Ponto.query
-        .filter(Ponto.usuario_id == usuario_id, Ponto.data >= inicio_mes)
-        .order_by(Ponto.data.asc())
-        .all()
-    )
-
-    saldo_total = timedelta()
-    extras_total = timedelta()
-    deficit_total = timedelta()
-
-    resultados = []
-
-    for ponto in pontos:
-        resultado = calcular_horas_ponto(ponto, carga_diaria=timedelta(hours=8))
-
-        saldo_total += resultado["saldo"]
-        extras_total += resultado["extras"]
-        deficit_total += resultado["deficit"]
-
-        resultados.append({
-            "data": ponto.data,
-            "total_trabalhado": resultado["total_trabalhado"],
-            "saldo": resultado["saldo"],
-            "extras": resultado["extras"],
-            "deficit": resultado["deficit"],
-        })
+    resultados = calcular_banco_horas_resumo(PontoResumo.user_id == usuario_id, PontoResumo.data >= inicio_mes, carga=jornada_diaria(funcionario.empresa))
+    totais = totalizar(resultados)
 
     return render_template(
         "admin/banco_horas_mensal.html",
         funcionario=funcionario,
         resultados=resultados,
-        saldo_total=saldo_total,
-        extras_total=extras_total,
-        deficit_total=deficit_total
+        saldo_total=totais["saldo"],
+        extras_total=totais["extras"],
+        deficit_total=totais["deficit"]
     )
 
 @admin_bp.route('/banco_horas/acumulado/<int:usuario_id>')
 @login_required
+@somente_leitura
 def banco_horas_acumulado(usuario_id):
     funcionario = User.query.get_or_404(usuario_id)
 
-    pontos = (
-        Ponto.query
-        .filter(Ponto.usuario_id == usuario_id)
-        .order_by(Ponto.data.asc())
-        .all()
-    )
-
-    saldo_total = timedelta()
-    extras_total = timedelta()
-    deficit_total = timedelta()
-
-    resultados = []
-
-    for ponto in pontos:
-        resultado = calcular_horas_ponto(ponto, carga_diaria=timedelta(hours=8))
-
-        saldo_total += resultado["saldo"]
-        extras_total += resultado["extras"]
-        deficit_total += resultado["deficit"]
-
-        resultados.append({
-            "data": ponto.data,
-            "total_trabalhado": resultado["total_trabalhado"],
-            "saldo": resultado["saldo"],
-            "extras": resultado["extras"],
-            "deficit": resultado["deficit"],
-        })
+    meses, resultados, totais = calcular_banco_horas_acumulado(usuario_id, carga=jornada_diaria(funcionario.empresa))
 
     return render_template(
         "admin/banco_horas_acumulado.html",
         funcionario=funcionario,
+        meses=meses,
         resultados=resultados,
-        saldo_total=saldo_total,
-        extras_total=extras_total,
-        deficit_total=deficit_total
+        saldo_total=totais["saldo"],
+        extras_total=totais["extras"],
+        deficit_total=totais["deficit"]
     )
 
 @admin_bp.route('/funcionario/<int:id>/historico')
 @login_required
 @admin_required
+@somente_leitura
 def historico_funcionario(id):
     funcionario = User.query.get_or_404(id)
     
     hoje = datetime.today().date()
     ano, mes = hoje.year, hoje.month
     inicio = datetime(ano, mes, 1).date()
-    
-    registros = Ponto.query.filter(Ponto.user_id == id, Ponto.data >= inicio).order_by(Ponto.data.asc()).all()
 
-    jornada_padrao = timedelta(hours=funcionario.empresa.carga_mensal / 22 / 5)
+    jornada_padrao = jornada_diaria(funcionario.empresa)
 
-    saldo_total = timedelta()
-    extras_total = timedelta()
-    deficit_total = timedelta()
+    resultados = calcular_banco_horas(Ponto.user_id == id, inicio=inicio, carga=jornada_padrao)
+    totais = totalizar(resultados, minimo_marcacoes=2)
     lista = []
     
-    for r in registros:
-        marcacoes = Marcacao.query.filter_by(ponto_id=r.id).order_by(Marcacao.hora).all()
-        resultado = calcular_horas_ponto(r, carga=jornada_padrao)
-
-        if len(marcacoes) >= 2:
-            saldo_total += resultado["saldo"]
-            extras_total += resultado["extras"]
-            deficit_total += resultado["deficit"]
-
+    for r in resultados:
+        horarios = r["horarios"]
         lista.append({
-            'data': r.data,
-            'entrada': r.marcacoes[0].hora.strftime("%H:%M") if len(marcacoes) > 0 else None,
-            'saida_almoco': r.marcacoes[1].hora.strftime("%H:%M") if len(marcacoes) > 1 else None,
-            'retorno_almoco': r.marcacoes[2].hora.strftime("%H:%M") if len(marcacoes) > 2 else None,
-            'saida': r.marcacoes[-1].hora.strftime("%H:%M") if len(marcacoes) > 3 else None,
-            'horas_trabalhadas': resultado["total_trabalhado"],
-            'saldo': resultado["saldo"], 
-            'extras': resultado["extras"],
-            'deficit': resultado["deficit"]
+            'data': r["data"],
+            'entrada': horarios["entrada"].strftime("%H:%M") if "entrada" in horarios else None,
+            'saida_almoco': horarios["saida_almoco"].strftime("%H:%M") if "saida_almoco" in horarios else None,
+            'retorno_almoco': horarios["retorno_almoco"].strftime("%H:%M") if "retorno_almoco" in horarios else None,
+            'saida': r["ultima"].strftime("%H:%M") if r["qtd_marcacoes"] > 3 else None,
+            'horas_trabalhadas': r["total_trabalhado"],
+            'saldo': r["saldo"], 
+            'extras': r["extras"],
+            'deficit': r["deficit"]
         })
 
-    return render_template('admin/historico_funcionario.html', funcionario=funcionario.nome, registros=lista, saldo_total=saldo_total, extras_total=extras_total, deficit_total=deficit_total, mes_atual=f"{ano}-{mes:02d}")
\ No newline at end of file
+    return render_template('admin/historico_funcionario.html', funcionario=funcionario.nome, registros=lista, saldo_total=totais["saldo"], extras_total=totais["extras"], deficit_total=totais["deficit"], mes_atual=f"{ano}-{mes:02d}")
+
+# Exportação das marcações da empresa (contabilidade): a resposta é gerada enquanto a consulta
+# é lida, sem montar o arquivo inteiro em memória
+@admin_bp.route('/exportar/marcacoes')
+@login_required
+@admin_required
+@somente_leitura
+@operacao_longa
+def exportar_marcacoes():
+    hoje = datetime.today().date()
+    if "inicio" not in request.args:
+        return render_template(
+            "admin/exportar_marcacoes.html",
+            inicio=hoje.replace(day=1),
+            fim=hoje,
+            xlsx_disponivel=exportacao.xlsxwriter is not None
+        )
+
+    try:
+        inicio = date.fromisoformat(request.args["inicio"])
+        fim = date.fromisoformat(request.args.get("fim") or hoje.isoformat())
+    except ValueError:
+        flash("Informe datas válidas.", "danger")
+        return redirect(url_for("admin.exportar_marcacoes"))
+    if fim < inicio:
+        flash("A data final deve ser posterior à inicial.", "danger")
+        return redirect(url_for("admin.exportar_marcacoes"))
+
+    formato = request.args.get("formato", "csv")
+    if formato == "xlsx" and exportacao.xlsxwriter is None:
+        flash("Exportação em XLSX indisponível neste servidor.", "warning")
+        return redirect(url_for("admin.exportar_marcacoes"))
+
+    linhas = exportacao.linhas_marcacoes(current_user.empresa_id, inicio, fim)
+    if formato == "xlsx":
+        gerador = exportacao.gerar_xlsx(linhas)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        formato, gerador, mimetype = "csv", exportacao.gerar_csv(linhas), "text/csv"
+
+    response = Response(stream_with_context(gerador), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=marcacoes_{inicio}_{fim}.{formato}"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
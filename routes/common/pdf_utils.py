@@ -1,8 +1,28 @@
-from flask import render_template
-import pdfkit
+from services.pdf import renderizador_pdf, cache_pdf
+from flask import render_template, make_response, request
 
 ## FUNÇÃO GLOBAL PDF ##
+# A conversão roda no pool de services.pdf (backend configurável, com fila e timeout)
 def gerar_pdf(template_name, **kwargs):
     rendered = render_template(template_name, **kwargs)
-    config = pdfkit.configuration(wkhtmltopdf=r'C:/Arquivos de Programas/wkhtmltopdf/bin/wkhtmltopdf.exe')
-    return pdfkit.from_string(rendered, False, configuration=config)
\ No newline at end of file
+    return renderizador_pdf.converter(rendered)
+
+# Resposta de PDF com cache em disco e ETag: o navegador revalida com If-None-Match e,
+# se nada mudou, recebe 304 sem que o documento seja lido ou gerado de novo
+def responder_pdf(template_name, nome_arquivo, **kwargs):
+    chave = cache_pdf.chave(template_name, kwargs)
+
+    if request.if_none_match.contains(chave):
+        response = make_response("", 304)
+    else:
+        pdf = cache_pdf.obter(chave)
+        if pdf is None:
+            pdf = gerar_pdf(template_name, **kwargs)
+            cache_pdf.guardar(chave, pdf)
+        response = make_response(pdf)
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = f'inline; filename={nome_arquivo}'
+
+    response.set_etag(chave)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -2,6 +2,7 @@ from flask import render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from extensions import db
 from models import Empresa, User
+from repositories.usuarios import listar_funcionarios
 from utils import superadmin_required, admin_required
 from . import empresas_bp
 
@@ -48,8 +49,31 @@ def gerenciar_funcionarios(empresa_id):
             flash(f"{funcionario.nome} associado à {empresa.nome}", "success")
         return redirect(url_for("empresas.gerenciar_funcionarios", empresa_id=empresa.id))
     
-    funcionarios = User.query.filter_by(tipo="funcionario").all()
-    return render_template("empresa_funcionarios.html", empresa=empresa, funcionarios=funcionarios)
+    # Vinculados paginados por chave; candidatos de outras empresas só aparecem a partir de uma busca
+    vinculados, proximo = listar_funcionarios(
+        User.empresa_id == empresa.id,
+        User.tipo == "funcionario",
+        cursor=request.args.get("cursor"),
+    )
+
+    busca = request.args.get("busca", "").strip()
+    candidatos = []
+    if busca:
+        candidatos, _ = listar_funcionarios(
+            db.or_(User.empresa_id.is_(None), User.empresa_id != empresa.id),
+            User.tipo == "funcionario",
+            busca=busca,
+            por_pagina=20,
+        )
+
+    return render_template(
+        "empresas/empresa_funcionarios.html",
+        empresa=empresa,
+        vinculados=vinculados,
+        proximo=proximo,
+        candidatos=candidatos,
+        busca=busca
+    )
 
 @empresas_bp.route("/<int:empresa_id>/remover_funcionario/<int:user_id>")
 @login_required
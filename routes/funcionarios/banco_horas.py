@@ -1,32 +1,13 @@
-from datetime import timedelta
 from flask import render_template
 from flask_login import current_user, login_required
-from models import Ponto, calcular_horas_ponto
+from services.banco_horas import calcular_banco_horas_acumulado, jornada_diaria
+from services.replicas import somente_leitura
 from . import funcionarios_bp
 
 @funcionarios_bp.route('/banco_horas_acumulado')
 @login_required
+@somente_leitura
 def banco_horas_acumulado():
-    pontos = Ponto.query.filter(Ponto.user_id == current_user.id).order_by(Ponto.data.asc()).all()
+    meses, resultados, totais = calcular_banco_horas_acumulado(current_user.id, carga=jornada_diaria(current_user.empresa))
 
-    saldo_total = timedelta()
-    extras_total = timedelta()
-    deficit_total = timedelta()
-
-    resultados = []
-
-    for ponto in pontos:
-        resultado = calcular_horas_ponto(ponto, carga_diaria=timedelta(hours=current_user.empresa.carga_mensal / 22 / 5))
-        saldo_total += resultado['saldo']
-        extras_total += resultado['extras']
-        deficit_total += resultado['deficit']
-
-        resultados.append({
-            'data': ponto.data,
-            'total_trabalhado': resultado['total_trabalhado'],
-            'saldo': resultado['saldo'],
-            'extras': resultado['extras'],
-            'deficit': resultado['deficit']
-        })
-
-    return render_template("funcionarios/banco_horas_acumulado.html", funcionario=current_user,resultados=resultados, saldo_total=saldo_total, extras_total=extras_total, deficit_total=deficit_total)
\ No newline at end of file
+    return render_template("funcionarios/banco_horas_acumulado.html", funcionario=current_user, meses=meses, resultados=resultados, saldo_total=totais['saldo'], extras_total=totais['extras'], deficit_total=totais['deficit'])
\ No newline at end of file
@@ -1,62 +1,67 @@
-from flask import render_template
+from datetime import date
+from flask import jsonify, render_template, request, url_for
 from flask_login import current_user, login_required
-from models import Ponto, Marcacao, calcular_horas_ponto
-from collections import defaultdict
+from services.banco_horas import jornada_diaria
+from services.dashboard import painel_funcionario, historico_funcionario, mes_anterior_com_registros, HISTORICO_MESES
+from services.replicas import somente_leitura
+from utils import format_timedelta
 from . import funcionarios_bp
 
+def primeiro_dia_meses_atras(data, meses):
+    indice = data.year * 12 + data.month - 1 - meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
 @funcionarios_bp.route('/dashboard')
 @login_required
+@somente_leitura
 def dashboard():
-    registros = Ponto.query.filter_by(user_id=current_user.id).all()
-
-    total_trabalhado = sum(
-        [calcular_horas_ponto(r)["total_trabalhado"].seconds / 3600 for r in registros], 0
-    )
+    painel = painel_funcionario(current_user.id, jornada_diaria(current_user.empresa))
 
-    total_extras = sum(
-        [calcular_horas_ponto(r)["extras"].seconds / 3600 for r in registros], 0
-    )
-
-    banco_horas = total_trabalhado + total_extras - (current_user.empresa.carga_mensal or 220)
+    banco_horas = painel["horas_trabalhadas"] + painel["horas_extras"] - (current_user.empresa.carga_mensal or 220)
     proximo_pagamento = current_user.salario_mensal
 
-    horas_semanais = defaultdict(float)
-    extras_semanais = defaultdict(float)
-
-    for r in registros:
-        if r.data:
-            semana = r.data.isocalendar()[1]
-            resultado = calcular_horas_ponto(r)
-            horas_semanais[semana] += resultado["total_trabalhado"].seconds / 3600
-            extras_semanais[semana] += resultado["extras"].seconds / 3600
-    
-    semanas = sorted(horas_semanais.keys())
-    horas_semanais_list = [horas_semanais[s] for s in semanas]
-    extras_semanais_list = [extras_semanais[s] for s in semanas]
-
-    historico = []
-    for r in registros:
-        marcacoes = Marcacao.query.filter_by(ponto_id=r.id).order_by(Marcacao.hora).all()
-        resultado = calcular_horas_ponto(r)
-        horarios = "-".join([m.hora.strftime("%Hh%M") for m in marcacoes])
-
-        historico.append({
-            "data": r.data,
-            "horarios": horarios,
-            "total_trabalhado": resultado["total_trabalhado"],
-            "saldo": resultado["saldo"],
-            "extras": resultado["extras"],
-            "deficit": resultado["deficit"]
-        })
+    hoje = date.today()
+    inicio = primeiro_dia_meses_atras(hoje, HISTORICO_MESES - 1)
+    historico = historico_funcionario(current_user.id, inicio, empresa=current_user.empresa)
+    anterior = mes_anterior_com_registros(current_user.id, inicio)
 
     return render_template(
         "funcionarios/funcionario_dashboard.jinja2",
-        horas_trabalhadas=round(total_trabalhado, 2),
-        horas_extras=round(total_extras, 2),
+        horas_trabalhadas=painel["horas_trabalhadas"],
+        horas_extras=painel["horas_extras"],
         banco_horas=round(banco_horas, 2),
         proximo_pagamento=proximo_pagamento,
-        semanas=semanas,
-        horas_semanais=horas_semanais_list,
-        extras_semanais=extras_semanais_list,
-        registros=historico
-    )
\ No newline at end of file
+        semanas=painel["semanas"],
+        horas_semanais=painel["horas_semanais"],
+        extras_semanais=painel["extras_semanais"],
+        registros=historico,
+        mais_historico=url_for('funcionarios.dashboard_historico', mes=anterior.strftime("%Y-%m")) if anterior else None
+    )
+
+# Carregamento sob demanda do histórico, um mês por vez
+@funcionarios_bp.route('/dashboard/historico')
+@login_required
+@somente_leitura
+def dashboard_historico():
+    try:
+        inicio = date.fromisoformat(request.args.get("mes", "") + "-01")
+    except ValueError:
+        return jsonify(erro="Informe o mês no formato AAAA-MM."), 400
+
+    historico = historico_funcionario(current_user.id, inicio, primeiro_dia_meses_atras(inicio, -1), empresa=current_user.empresa)
+    anterior = mes_anterior_com_registros(current_user.id, inicio)
+
+    return jsonify(
+        registros=[
+            {
+                "data": r["data"].strftime("%d/%m/%Y"),
+                "horarios": r["horarios"] or "-",
+                "total_trabalhado": format_timedelta(r["total_trabalhado"]),
+                "saldo": format_timedelta(r["saldo"]),
+                "extras": format_timedelta(r["extras"]),
+                "deficit": format_timedelta(r["deficit"])
+            }
+            for r in historico
+        ],
+        proximo=url_for('funcionarios.dashboard_historico', mes=anterior.strftime("%Y-%m")) if anterior else None
+    )
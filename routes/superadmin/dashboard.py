@@ -1,18 +1,50 @@
-from flask import render_template
+from flask import render_template, request
 from flask_login import login_required
-from models import Empresa, User, Ponto
+from sqlalchemy.orm import joinedload
+from models import Empresa, EmpresaEstatistica, mes_corrente
 from extensions import db
+from services.replicas import somente_leitura
 from utils import superadmin_required
 from . import superadmin_bp
 
+EMPRESAS_POR_PAGINA = 12
+
+# Empresas com as estatísticas já carregadas, paginadas por nome
+def empresas_paginadas():
+    return (
+        Empresa.query
+        .options(joinedload(Empresa.estatisticas))
+        .order_by(Empresa.nome, Empresa.id)
+        .paginate(page=request.args.get("page", 1, type=int), per_page=EMPRESAS_POR_PAGINA, error_out=False)
+    )
+
 @superadmin_bp.route("/dashboard")
 @login_required
 @superadmin_required
+@somente_leitura
 def dashboard():
-    total_empresas = Empresa.query.count()
-    total_admins = User.query.filter_by(tipo="admin").count()
-    total_funcionarios = User.query.filter_by(tipo="funcionario").count()
-    total_horas = db.session.query(Ponto).count()
-    
-    empresas = Empresa.query.all()
-    return render_template("superadmin/super_dashboard.html", total_empresas=total_empresas, total_admins=total_admins, total_funcionarios=total_funcionarios, total_horas=total_horas, empresas=empresas)
\ No newline at end of file
+    # Totais somados da tabela de estatísticas (uma linha por empresa), sem varrer usuários e pontos
+    totais = db.session.execute(
+        db.select(
+            db.func.count(Empresa.id),
+            db.func.coalesce(db.func.sum(EmpresaEstatistica.total_admins), 0),
+            db.func.coalesce(db.func.sum(EmpresaEstatistica.total_funcionarios), 0),
+            # Linhas ainda do mês anterior (antes do recálculo) não somam pontos ao mês atual
+            db.func.coalesce(db.func.sum(
+                db.case((EmpresaEstatistica.mes_referencia == mes_corrente(), EmpresaEstatistica.pontos_mes), else_=0)
+            ), 0),
+            db.func.min(EmpresaEstatistica.atualizado_em),
+        )
+        .outerjoin(EmpresaEstatistica, EmpresaEstatistica.empresa_id == Empresa.id)
+    ).one()
+    total_empresas, total_admins, total_funcionarios, total_pontos_mes, atualizado_em = totais
+
+    return render_template(
+        "superadmin/super_dashboard.html",
+        total_empresas=total_empresas,
+        total_admins=total_admins,
+        total_funcionarios=total_funcionarios,
+        total_pontos_mes=total_pontos_mes,
+        atualizado_em=atualizado_em,
+        empresas=empresas_paginadas()
+    )
@@ -4,7 +4,9 @@ from models import Empresa, User
 from extensions import db
 from utils import superadmin_required, validar_cnpj
 from datetime import datetime, timezone
+from services.estatisticas import atualizar_estatisticas
 from . import superadmin_bp
+from .dashboard import empresas_paginadas
 
 @superadmin_bp.route("/empresas/novo", methods=["GET", "POST"])
 @login_required
@@ -36,6 +38,7 @@ def nova_empresa():
         )
         db.session.add(empresa)
         db.session.commit()
+        atualizar_estatisticas(empresa.id)
         flash("Empresa criada com sucesso!", "success")
         return redirect(url_for("superadmin.dashboard"))
 
@@ -86,6 +89,7 @@ def definir_admin(id):
                 empresa.admin_id = admin.id
                 admin.tipo = "admin"
                 db.session.commit()
+                atualizar_estatisticas(empresa.id)
                 flash(f"{admin.nome} agora é o admin da empresa {empresa.nome}", "success")
                 return redirect(url_for("superadmin.dashboard"))
             else:
@@ -98,5 +102,4 @@ def definir_admin(id):
 @login_required
 @superadmin_required
 def listar_empresas():
-    empresas = Empresa.query.all()
-    return render_template("superadmin/listar_empresas.html", empresas=empresas)
\ No newline at end of file
+    return render_template("superadmin/listar_empresas.html", empresas=empresas_paginadas())
\ No newline at end of file
@@ -0,0 +1,26 @@
+import hmac
+from flask import Response, abort, current_app, jsonify, request
+from flask_login import current_user
+from services.conexoes import monitor_conexoes
+from . import superadmin_bp
+
+# Estado do pool deste processo (cada worker do gunicorn responde pelo seu). Acesso com login de
+# superadmin ou, para o coletor de monitoramento, com "Authorization: Bearer <METRICAS_TOKEN>".
+@superadmin_bp.route("/metricas/pool")
+def metricas_pool():
+    token = current_app.config["METRICAS_TOKEN"]
+    por_token = bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not por_token and not (current_user.is_authenticated and current_user.tipo == "superadmin"):
+        abort(403)
+
+    metricas = monitor_conexoes.metricas()
+    if request.args.get("formato") != "prometheus":
+        return jsonify(metricas)
+
+    # Formato de exposição do Prometheus
+    linhas = []
+    for nome, valores in metricas["engines"].items():
+        for campo, valor in valores.items():
+            if valor is not None:
+                linhas.append(f'portal_pool_{campo}{{engine="{nome}",pid="{metricas["pid"]}"}} {valor}')
+    return Response("\n".join(linhas) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,222 @@
+import heapq
+import os
+import tempfile
+from bisect import bisect_left
+import click
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from extensions import db
+from models import User, Empresa, Ponto, Marcacao, PontoResumo, ResumoMensal, TIPOS_MARCACAO
+from repositories.ponto import consultar_horarios
+from services.banco_horas import resultado_da_linha, jornada_diaria, CAMPOS_MENSAIS, TAMANHO_LOTE
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional; sem ele não há arquivamento nem leitura de anos arquivados
+    pa = None
+
+COLUNAS = ["ponto_id", "user_id", "data", "qtd_marcacoes", "primeira", "ultima", *TIPOS_MARCACAO]
+
+# Mesmos campos das linhas de consultar_horarios, então resultado_da_linha serve para as duas
+LinhaArquivada = namedtuple("LinhaArquivada", COLUNAS)
+
+## ARQUIVO FRIO ##
+# Anos encerrados e fora da janela online (ARQUIVO_ANOS_ONLINE) saem das tabelas de ponto para um Parquet
+# por empresa e ano: ARQUIVO_DIR/empresa_<id>/marcacoes_<ano>.parquet, uma linha por dia no formato de
+# consultar_horarios, ordenado por usuário e data em grupos de TAMANHO_LOTE linhas. O ResumoMensal continua no banco: banco de horas acumulado e navegação do histórico
+# não dependem do arquivo. Pontos, marcações e resumos diários do ano são apagados só depois que o arquivo
+# está gravado e conferido e que os meses com dias novos foram fechados de novo a partir dele.
+def esquema():
+    return pa.schema([
+        ("ponto_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("data", pa.date32()),
+        ("qtd_marcacoes", pa.int32()),
+        ("primeira", pa.time64("us")),
+        ("ultima", pa.time64("us")),
+        *[(tipo, pa.time64("us")) for tipo in TIPOS_MARCACAO],
+    ])
+
+def caminho_arquivo(empresa_id, ano):
+    return os.path.join(current_app.config["ARQUIVO_DIR"], f"empresa_{empresa_id}", f"marcacoes_{ano}.parquet")
+
+def arquivar_ano(empresa_id, ano):
+    inicio, fim = date(ano, 1, 1), date(ano + 1, 1, 1)
+    caminho = caminho_arquivo(empresa_id, ano)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    os.close(descritor)
+
+    usuarios = db.select(User.id).where(User.empresa_id == empresa_id)
+    consulta = (
+        consultar_horarios(Ponto.user_id.in_(usuarios), inicio=inicio, fim=fim)
+        .order_by(None)
+        .order_by(Ponto.user_id, Ponto.data)
+        .yield_per(TAMANHO_LOTE)
+    )
+    arquivados = []
+
+    def novas():
+        for linha in consulta:
+            arquivados.append(linha.ponto_id)
+            yield dict(linha._mapping)
+
+    try:
+        with pq.ParquetWriter(temporario, esquema(), compression="zstd") as escritor:
+            # Ano já arquivado antes (batidas tardias): as linhas novas são intercaladas nas do arquivo,
+            # que continua ordenado por usuário e data
+            anteriores = 0
+            linhas = novas()
+            if os.path.exists(caminho):
+                anteriores = pq.read_metadata(caminho).num_rows
+                linhas = heapq.merge(linhas_do_arquivo(caminho), linhas, key=lambda linha: (linha["user_id"], linha["data"]))
+
+            lote = []
+            for linha in linhas:
+                lote.append(linha)
+                if len(lote) >= TAMANHO_LOTE:
+                    escritor.write_table(pa.Table.from_pylist(lote, schema=esquema()), row_group_size=TAMANHO_LOTE)
+                    lote = []
+            if lote:
+                escritor.write_table(pa.Table.from_pylist(lote, schema=esquema()), row_group_size=TAMANHO_LOTE)
+            total = anteriores + len(arquivados)
+
+        if pq.read_metadata(temporario).num_rows != total:
+            raise RuntimeError(f"Arquivo de {ano} da empresa {empresa_id} incompleto.")
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+    if not arquivados:
+        os.remove(temporario)
+        return 0
+    os.replace(temporario, caminho)
+
+    # Na mesma transação dos deletes: um fechamento antigo não pode perder as batidas tardias
+    refazer_fechamentos(caminho, empresa_id, ano, arquivados)
+
+    # Apaga exatamente os pontos gravados no arquivo
+    for posicao in range(0, len(arquivados), TAMANHO_LOTE):
+        ids = arquivados[posicao:posicao + TAMANHO_LOTE]
+        db.session.execute(db.delete(Marcacao).where(Marcacao.ponto_id.in_(ids), Marcacao.data >= inicio, Marcacao.data < fim))
+        db.session.execute(db.delete(PontoResumo).where(PontoResumo.ponto_id.in_(ids)))
+        db.session.execute(db.delete(Ponto).where(Ponto.id.in_(ids), Ponto.data >= inicio, Ponto.data < fim))
+    db.session.commit()
+    return len(arquivados)
+
+# Refaz o ResumoMensal dos usuários com dias novos a partir do arquivo completo do ano: em uma nova
+# execução os dias arquivados antes já não estão no resumo diário, então fechar_mes não serviria.
+def refazer_fechamentos(caminho, empresa_id, ano, ponto_ids):
+    usuarios = set()
+    for posicao in range(0, len(ponto_ids), TAMANHO_LOTE):
+        ids = ponto_ids[posicao:posicao + TAMANHO_LOTE]
+        usuarios.update(db.session.scalars(db.select(Ponto.user_id).where(Ponto.id.in_(ids)).distinct()))
+
+    carga = jornada_diaria(db.session.get(Empresa, empresa_id))
+    somas = {}
+    for lote in pq.ParquetFile(caminho).iter_batches(TAMANHO_LOTE):
+        for linha in lote.filter(pc.is_in(lote["user_id"], value_set=pa.array(usuarios, pa.int64()))).to_pylist():
+            resultado = resultado_da_linha(LinhaArquivada(**linha), carga)
+            soma = somas.setdefault((linha["user_id"], linha["data"].month), dict.fromkeys(CAMPOS_MENSAIS, 0))
+            soma["dias_trabalhados"] += linha["qtd_marcacoes"] >= 2
+            soma["segundos_trabalhados"] += int(resultado["total_trabalhado"].total_seconds())
+            for campo in CAMPOS_MENSAIS[2:]:
+                soma[campo] += int(resultado[campo].total_seconds())
+
+    db.session.execute(db.delete(ResumoMensal).where(ResumoMensal.ano == ano, db.tuple_(ResumoMensal.user_id, ResumoMensal.mes).in_(list(somas))))
+    agora = datetime.now(timezone.utc)
+    linhas = [
+        {"user_id": user_id, "empresa_id": empresa_id, "ano": ano, "mes": mes, "fechado_em": agora, **soma}
+        for (user_id, mes), soma in somas.items()
+    ]
+    if linhas:
+        db.session.execute(insert(ResumoMensal), linhas)
+
+## LEITURA DO ARQUIVO ##
+def arquivos(empresa_id, inicio, fim=None):
+    if pa is None or empresa_id is None:
+        return []
+    ultimo_ano = (fim - timedelta(days=1)).year if fim else date.today().year
+    caminhos = (caminho_arquivo(empresa_id, ano) for ano in range(inicio.year, ultimo_ano + 1))
+    return [caminho for caminho in caminhos if os.path.exists(caminho)]
+
+def linhas_do_arquivo(caminho):
+    for lote in pq.ParquetFile(caminho).iter_batches(TAMANHO_LOTE):
+        yield from lote.to_pylist()
+
+# Faixa de usuários e de datas de cada grupo de linhas, pelas estatísticas do Parquet: só os grupos que podem
+# conter o usuário e o período são lidos, um por vez. Arquivos gravados antes da ordenação ainda são lidos
+# (todos os grupos com o usuário na faixa), só que sem a busca binária.
+class LeitorArquivo:
+    def __init__(self, caminho):
+        self.parquet = pq.ParquetFile(caminho, memory_map=True)
+        metadados = self.parquet.metadata
+        coluna_usuario = self.parquet.schema_arrow.get_field_index("user_id")
+        coluna_data = self.parquet.schema_arrow.get_field_index("data")
+        self.grupos = []
+        for indice in range(metadados.num_row_groups):
+            grupo = metadados.row_group(indice)
+            usuario, data = grupo.column(coluna_usuario).statistics, grupo.column(coluna_data).statistics
+            self.grupos.append((usuario.min, usuario.max, data.min, data.max))
+        self.maiores = [grupo[1] for grupo in self.grupos]
+        self.ordenado = all(anterior[1] <= grupo[0] for anterior, grupo in zip(self.grupos, self.grupos[1:]))
+        self._lido = (None, None)
+
+    def grupo(self, indice):
+        if self._lido[0] != indice:
+            self._lido = (indice, self.parquet.read_row_group(indice))
+        return self._lido[1]
+
+    def linhas(self, user_id, inicio, fim=None):
+        primeiro = bisect_left(self.maiores, user_id) if self.ordenado else 0
+        linhas = []
+        for indice in range(primeiro, len(self.grupos)):
+            menor, maior, primeira, ultima = self.grupos[indice]
+            if self.ordenado and menor > user_id:
+                break
+            if not menor <= user_id <= maior or ultima < inicio or (fim and primeira >= fim):
+                continue
+            tabela = self.grupo(indice)
+            filtro = pc.and_(pc.equal(tabela["user_id"], user_id), pc.greater_equal(tabela["data"], pa.scalar(inicio, pa.date32())))
+            if fim:
+                filtro = pc.and_(filtro, pc.less(tabela["data"], pa.scalar(fim, pa.date32())))
+            linhas.extend(tabela.filter(filtro).to_pylist())
+        # No máximo um ano de dias do usuário
+        return sorted(linhas, key=lambda linha: linha["data"])
+
+# Dias arquivados do período [inicio, fim) de cada usuário, na ordem de `usuarios` e por data.
+# Memória limitada a um grupo de linhas por arquivo, seja qual for o período.
+def linhas_arquivadas(empresa_id, inicio, fim=None, usuarios=()):
+    leitores = [LeitorArquivo(caminho) for caminho in arquivos(empresa_id, inicio, fim)]
+    if not leitores:
+        return
+    for user_id in usuarios:
+        for leitor in leitores:
+            for linha in leitor.linhas(user_id, inicio, fim):
+                yield LinhaArquivada(**linha)
+
+@click.command("arquivar_ano")
+@click.option("--ano", type=int, default=None, help="Padrão: o ano que acabou de sair da janela online.")
+@click.option("--empresa-id", type=int, default=None, help="Arquiva apenas uma empresa.")
+@with_appcontext
+def arquivar_ano_command(ano, empresa_id):
+    if pa is None:
+        raise click.ClickException("O arquivamento requer o pacote pyarrow.")
+
+    limite = date.today().year - current_app.config["ARQUIVO_ANOS_ONLINE"]
+    ano = ano or limite
+    if ano > limite:
+        raise click.BadParameter(
+            f"Só anos até {limite} podem ser arquivados (ARQUIVO_ANOS_ONLINE={current_app.config['ARQUIVO_ANOS_ONLINE']}).",
+            param_hint="--ano"
+        )
+
+    empresas = Empresa.query.filter_by(id=empresa_id).all() if empresa_id else Empresa.query.order_by(Empresa.id).all()
+    for empresa in empresas:
+        total = arquivar_ano(empresa.id, ano)
+        click.echo(f"{empresa.nome}: {total} dias de {ano} arquivados em {caminho_arquivo(empresa.id, ano)}.")
@@ -0,0 +1,128 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from extensions import db
+from models import Log
+
+logger = logging.getLogger(__name__)
+
+## TRILHA DE AUDITORIA ##
+# registrar() só põe o evento num buffer em memória; uma thread por processo grava os eventos em lote
+# (um INSERT executemany numa conexão própria, fora da transação da requisição) a cada
+# AUDITORIA_INTERVALO_MS ou quando AUDITORIA_LOTE eventos se acumulam.
+# Contrapressão: com AUDITORIA_FILA_MAX eventos pendentes, quem registra espera até AUDITORIA_ESPERA_MS
+# pela thread e, se o buffer continuar cheio, grava o lote ele mesmo.
+# Com o banco fora do ar o buffer guarda só os AUDITORIA_FILA_MAX eventos mais recentes: os mais antigos são
+# descartados e contados no log, com o total acumulado do processo em `descartados`.
+# Ações sensíveis usam sincrono=True antes do commit da ação: o evento vai para a transação da sessão
+# (db.session) e é gravado junto com a ação; se o registro falhar, a ação também não é gravada.
+# Eventos assíncronos ainda no buffer se perdem se o processo morrer sem passar pelo atexit.
+class FilaAuditoria:
+    def __init__(self, app=None):
+        self.app = None
+        self._condicao = threading.Condition()
+        self._pendentes = []
+        self._pid = None
+        self._encerrando = False
+        self._thread = None
+        self.descartados = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.intervalo = app.config["AUDITORIA_INTERVALO_MS"] / 1000
+        self.tamanho_lote = app.config["AUDITORIA_LOTE"]
+        self.maximo = app.config["AUDITORIA_FILA_MAX"]
+        self.espera = app.config["AUDITORIA_ESPERA_MS"] / 1000
+        app.extensions["auditoria"] = self
+
+    def registrar(self, user_id, acao, sincrono=False):
+        evento = {
+            "user_id": user_id,
+            "acao": acao[:255],
+            # Horário do evento, não da gravação (UTC, como as batidas)
+            "data_hora": datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+
+        if sincrono:
+            db.session.execute(Log.__table__.insert(), [evento])
+            return
+
+        with self._condicao:
+            self._iniciar()
+            if len(self._pendentes) >= self.maximo:
+                self._condicao.notify_all()
+                self._condicao.wait_for(lambda: len(self._pendentes) < self.maximo, timeout=self.espera)
+            self._pendentes.append(evento)
+            if len(self._pendentes) <= self.maximo:
+                if len(self._pendentes) >= self.tamanho_lote:
+                    self._condicao.notify_all()
+                return
+            lote, self._pendentes = self._pendentes, []
+            self._condicao.notify_all()
+
+        try:
+            self._gravar(lote)
+        except Exception:
+            logger.exception("Buffer de auditoria cheio e gravação falhou.")
+            with self._condicao:
+                self._devolver(lote)
+
+    # A thread é criada no primeiro uso de cada processo (os workers do gunicorn nascem por fork)
+    def _iniciar(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._pendentes = []
+        self._thread = threading.Thread(target=self._executar, name="auditoria", daemon=True)
+        self._thread.start()
+        atexit.register(self.encerrar)
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                if len(self._pendentes) < self.tamanho_lote and not self._encerrando:
+                    self._condicao.wait(self.intervalo)
+                if not self._pendentes:
+                    if self._encerrando:
+                        return
+                    continue
+                lote, self._pendentes = self._pendentes, []
+                self._condicao.notify_all()
+
+            try:
+                self._gravar(lote)
+            except Exception:
+                logger.exception("Falha ao gravar %d eventos de auditoria; nova tentativa no próximo ciclo.", len(lote))
+                with self._condicao:
+                    self._devolver(lote)
+                    if self._encerrando:
+                        return
+
+    # Devolve ao buffer um lote não gravado sem estourar o limite: com o banco fora, os mais antigos são
+    # descartados. Chamado com a trava da fila.
+    def _devolver(self, lote):
+        pendentes = lote + self._pendentes
+        excedentes = len(pendentes) - self.maximo
+        if excedentes > 0:
+            self.descartados += excedentes
+            logger.error("%d eventos de auditoria descartados (%d desde o início do processo).", excedentes, self.descartados)
+        self._pendentes = pendentes[-self.maximo:]
+
+    def _gravar(self, lote):
+        with self.app.app_context():
+            with db.engine.begin() as conexao:
+                conexao.execute(Log.__table__.insert(), lote)
+
+    # Grava o que restar antes de o processo terminar
+    def encerrar(self, timeout=10):
+        with self._condicao:
+            self._encerrando = True
+            self._condicao.notify_all()
+        if self._thread and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+auditoria = FilaAuditoria()
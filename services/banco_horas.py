@@ -0,0 +1,260 @@
+import click
+from datetime import date, datetime, timedelta, timezone
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from extensions import db, upsert
+from models import User, Empresa, Ponto, PontoResumo, ResumoMensal, TIPOS_MARCACAO, calcular_horas, calcular_saldo
+from repositories.ponto import consultar_horarios, consultar_resumos
+from utils import month_range
+
+TAMANHO_LOTE = 1000
+CAMPOS_MENSAIS = ["dias_trabalhados", "segundos_trabalhados", "saldo", "extras", "deficit"]
+
+## MOTOR DO BANCO DE HORAS ##
+# Calcula o banco de horas a partir das linhas agregadas de consultar_horarios (uma consulta por conjunto de pontos)
+def calcular_banco_horas(*filtros, carga=timedelta(hours=8), limite_extras=2, inicio=None, fim=None):
+    return [resultado_da_linha(linha, carga, limite_extras) for linha in consultar_horarios(*filtros, inicio=inicio, fim=fim)]
+
+def resultado_da_linha(linha, carga, limite_extras=2):
+    tipos = {tipo: getattr(linha, tipo) for tipo in TIPOS_MARCACAO if getattr(linha, tipo) is not None}
+    resultado = calcular_horas(linha.data, tipos, carga, limite_extras)
+    resultado.update({
+        "ponto_id": linha.ponto_id,
+        "data": linha.data,
+        "user_id": linha.user_id,
+        "qtd_marcacoes": linha.qtd_marcacoes,
+        "primeira": linha.primeira,
+        "ultima": linha.ultima,
+        "horarios": tipos
+    })
+    return resultado
+
+# Mesmo formato de calcular_banco_horas, mas lido do resumo diário (sem tocar nas marcações)
+def calcular_banco_horas_resumo(*filtros, carga=timedelta(hours=8), limite_extras=2):
+    resultados = []
+
+    for resumo in consultar_resumos(*filtros):
+        resultado = calcular_saldo(timedelta(seconds=resumo.segundos_trabalhados), carga, limite_extras)
+        resultado.update({
+            "ponto_id": resumo.ponto_id,
+            "data": resumo.data,
+            "user_id": resumo.user_id,
+            "qtd_marcacoes": resumo.qtd_marcacoes,
+            "primeira": resumo.primeira,
+            "ultima": resumo.ultima
+        })
+        resultados.append(resultado)
+
+    return resultados
+
+def totalizar(resultados, minimo_marcacoes=0):
+    totais = {
+        "total_trabalhado": timedelta(),
+        "saldo": timedelta(),
+        "extras": timedelta(),
+        "deficit": timedelta()
+    }
+
+    for resultado in resultados:
+        if resultado["qtd_marcacoes"] >= minimo_marcacoes:
+            for chave in totais:
+                totais[chave] += resultado[chave]
+
+    return totais
+
+def jornada_diaria(empresa):
+    carga_mensal = (empresa.carga_mensal if empresa else None) or 220
+    return timedelta(hours=carga_mensal / 22 / 5)
+
+## RESUMO DIÁRIO ##
+# Chamado na mesma transação das novas marcações, antes do commit: recalcula os dias afetados
+# com uma consulta agregada e grava o resumo com um único upsert
+def atualizar_resumos(ponto_ids, carga, limite_extras=2):
+    linhas = [linha_resumo(linha, carga, limite_extras) for linha in consultar_horarios(Ponto.id.in_(ponto_ids))]
+    if not linhas:
+        return
+
+    # Batidas sincronizadas depois do fechamento: a diferença vai para o mês já fechado
+    mes_atual = date.today().replace(day=1)
+    tardias = [linha for linha in linhas if linha["data"] < mes_atual]
+    if tardias:
+        ajustar_meses_fechados(tardias)
+
+    stmt = upsert(PontoResumo).values(linhas)
+    campos = {campo: stmt.excluded[campo] for campo in linhas[0] if campo != "ponto_id"}
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[PontoResumo.ponto_id], set_=campos))
+
+def ajustar_meses_fechados(linhas):
+    colunas = [PontoResumo.ponto_id, PontoResumo.qtd_marcacoes, *[getattr(PontoResumo, campo) for campo in CAMPOS_MENSAIS[1:]]]
+    anteriores = {
+        resumo.ponto_id: resumo
+        for resumo in db.session.execute(db.select(*colunas).where(PontoResumo.ponto_id.in_([linha["ponto_id"] for linha in linhas])))
+    }
+
+    diferencas = {}
+    for linha in linhas:
+        anterior = anteriores.get(linha["ponto_id"])
+        chave = (linha["user_id"], linha["data"].year, linha["data"].month)
+        soma = diferencas.setdefault(chave, dict.fromkeys(CAMPOS_MENSAIS, 0))
+        soma["dias_trabalhados"] += (linha["qtd_marcacoes"] >= 2) - (anterior is not None and anterior.qtd_marcacoes >= 2)
+        for campo in CAMPOS_MENSAIS[1:]:
+            soma[campo] += linha[campo] - (getattr(anterior, campo) if anterior else 0)
+
+    # Meses ainda abertos não têm linha no ResumoMensal e o UPDATE não afeta nada
+    for (user_id, ano, mes), soma in diferencas.items():
+        if any(soma.values()):
+            db.session.execute(
+                db.update(ResumoMensal)
+                .where(ResumoMensal.user_id == user_id, ResumoMensal.ano == ano, ResumoMensal.mes == mes)
+                .values({campo: getattr(ResumoMensal, campo) + valor for campo, valor in soma.items()})
+            )
+
+def linha_resumo(linha, carga, limite_extras=2):
+    resultado = resultado_da_linha(linha, carga, limite_extras)
+    return {
+        "ponto_id": linha.ponto_id,
+        "user_id": linha.user_id,
+        "data": linha.data,
+        "primeira": linha.primeira,
+        "ultima": linha.ultima,
+        "qtd_marcacoes": linha.qtd_marcacoes,
+        "segundos_trabalhados": int(resultado["total_trabalhado"].total_seconds()),
+        "carga": int(resultado["carga"].total_seconds()),
+        "saldo": int(resultado["saldo"].total_seconds()),
+        "extras": int(resultado["extras"].total_seconds()),
+        "deficit": int(resultado["deficit"].total_seconds())
+    }
+
+@click.command("backfill_resumo")
+@click.option("--empresa-id", type=int, default=None, help="Reprocessa apenas uma empresa.")
+@with_appcontext
+def backfill_resumo(empresa_id):
+    empresas = Empresa.query.filter_by(id=empresa_id).all() if empresa_id else Empresa.query.all() + [None]
+
+    for empresa in empresas:
+        filtro_empresa = User.empresa_id == empresa.id if empresa else User.empresa_id.is_(None)
+        usuarios = db.select(User.id).where(filtro_empresa)
+        carga = jornada_diaria(empresa)
+
+        PontoResumo.query.filter(PontoResumo.user_id.in_(usuarios)).delete(synchronize_session=False)
+
+        lote = []
+        total = 0
+        for linha in consultar_horarios(Ponto.user_id.in_(usuarios)).yield_per(TAMANHO_LOTE):
+            lote.append(linha_resumo(linha, carga))
+            if len(lote) >= TAMANHO_LOTE:
+                db.session.execute(insert(PontoResumo), lote)
+                total += len(lote)
+                lote = []
+
+        if lote:
+            db.session.execute(insert(PontoResumo), lote)
+            total += len(lote)
+
+        db.session.commit()
+        click.echo(f"{empresa.nome if empresa else 'Sem empresa'}: {total} dias resumidos.")
+
+## FECHAMENTO MENSAL ##
+# Saldo acumulado = soma dos meses fechados + resumo diário dos meses ainda abertos
+def calcular_banco_horas_acumulado(user_id, carga, limite_extras=2):
+    meses = [
+        {
+            "ano": m.ano,
+            "mes": m.mes,
+            "dias_trabalhados": m.dias_trabalhados,
+            "total_trabalhado": timedelta(seconds=m.segundos_trabalhados),
+            "saldo": timedelta(seconds=m.saldo),
+            "extras": timedelta(seconds=m.extras),
+            "deficit": timedelta(seconds=m.deficit)
+        }
+        for m in ResumoMensal.query.filter_by(user_id=user_id).order_by(ResumoMensal.ano, ResumoMensal.mes)
+    ]
+
+    # Dias dos meses sem fechamento, em qualquer ponto do histórico (não só depois do último fechado)
+    dias = calcular_banco_horas_resumo(
+        PontoResumo.user_id == user_id,
+        ~db.exists().where(
+            ResumoMensal.user_id == PontoResumo.user_id,
+            ResumoMensal.ano == db.extract("year", PontoResumo.data),
+            ResumoMensal.mes == db.extract("month", PontoResumo.data)
+        ),
+        carga=carga,
+        limite_extras=limite_extras
+    )
+
+    totais = totalizar(dias)
+    for mes in meses:
+        for chave in totais:
+            totais[chave] += mes[chave]
+
+    return meses, dias, totais
+
+def fechar_mes(ano, mes, empresa_id=None, refazer=False):
+    inicio, fim = month_range(ano, mes)
+
+    fechados = ResumoMensal.query.filter_by(ano=ano, mes=mes)
+    if empresa_id:
+        fechados = fechados.filter_by(empresa_id=empresa_id)
+    if refazer:
+        fechados.delete(synchronize_session=False)
+
+    consulta = (
+        db.session.query(
+            PontoResumo.user_id,
+            User.empresa_id,
+            db.func.count(db.case((PontoResumo.qtd_marcacoes >= 2, 1))).label("dias_trabalhados"),
+            db.func.sum(PontoResumo.segundos_trabalhados).label("segundos_trabalhados"),
+            db.func.sum(PontoResumo.saldo).label("saldo"),
+            db.func.sum(PontoResumo.extras).label("extras"),
+            db.func.sum(PontoResumo.deficit).label("deficit")
+        )
+        .join(User, User.id == PontoResumo.user_id)
+        .filter(PontoResumo.data >= inicio, PontoResumo.data <= fim)
+        .filter(~db.exists().where(
+            ResumoMensal.user_id == PontoResumo.user_id,
+            ResumoMensal.ano == ano,
+            ResumoMensal.mes == mes
+        ))
+        .group_by(PontoResumo.user_id, User.empresa_id)
+    )
+    if empresa_id:
+        consulta = consulta.filter(User.empresa_id == empresa_id)
+
+    agora = datetime.now(timezone.utc)
+    linhas = [
+        {
+            "user_id": linha.user_id,
+            "empresa_id": linha.empresa_id,
+            "ano": ano,
+            "mes": mes,
+            "dias_trabalhados": linha.dias_trabalhados,
+            "segundos_trabalhados": linha.segundos_trabalhados,
+            "saldo": linha.saldo,
+            "extras": linha.extras,
+            "deficit": linha.deficit,
+            "fechado_em": agora
+        }
+        for linha in consulta
+    ]
+
+    if linhas:
+        db.session.execute(insert(ResumoMensal), linhas)
+    db.session.commit()
+    return len(linhas)
+
+@click.command("fechar-mes")
+@click.option("--ano", type=int, default=None, help="Padrão: ano do mês anterior.")
+@click.option("--mes", type=int, default=None, help="Padrão: mês anterior.")
+@click.option("--empresa-id", type=int, default=None, help="Fecha apenas uma empresa.")
+@click.option("--refazer", is_flag=True, help="Recalcula meses que já estavam fechados.")
+@with_appcontext
+def fechar_mes_command(ano, mes, empresa_id, refazer):
+    if not ano or not mes:
+        anterior = date.today().replace(day=1) - timedelta(days=1)
+        ano, mes = ano or anterior.year, mes or anterior.month
+
+    if date(ano, mes, 1) >= date.today().replace(day=1):
+        raise click.BadParameter("Só é possível fechar meses já encerrados.")
+
+    total = fechar_mes(ano, mes, empresa_id, refazer)
+    click.echo(f"{mes:02d}/{ano}: {total} usuário(s) fechado(s).")
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+## CACHE EM MEMÓRIA ##
+# Cache por processo com validade (TTL) e limite de entradas (descarta as usadas há mais tempo).
+# Cada worker tem o seu: a invalidação só alcança o processo que a fez, então o TTL é o teto de
+# defasagem entre workers.
+# A versão por chave evita que um cálculo iniciado antes de uma invalidação grave o valor antigo; só as
+# chaves com cálculo em andamento têm versão, então o dicionário não cresce com as invalidações.
+class CacheTTL:
+    def __init__(self, ttl=60, maximo=1024):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._dados = OrderedDict()
+        self._versoes = {}
+        self._calculando = {}
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular, ttl=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._dados.get(chave)
+            if item and item[0] > agora:
+                self._dados.move_to_end(chave)
+                return item[1]
+            versao = (self._geracao, self._versoes.get(chave, 0))
+            self._calculando[chave] = self._calculando.get(chave, 0) + 1
+
+        try:
+            valor = calcular()
+        except BaseException:
+            with self._lock:
+                self._terminar(chave)
+            raise
+
+        with self._lock:
+            if (self._geracao, self._versoes.get(chave, 0)) == versao:
+                self._dados[chave] = (agora + (self.ttl if ttl is None else ttl), valor)
+                self._dados.move_to_end(chave)
+                while len(self._dados) > self.maximo:
+                    self._dados.popitem(last=False)
+            self._terminar(chave)
+        return valor
+
+    def _terminar(self, chave):
+        restantes = self._calculando.get(chave, 0) - 1
+        if restantes > 0:
+            self._calculando[chave] = restantes
+        else:
+            self._calculando.pop(chave, None)
+            self._versoes.pop(chave, None)
+
+    def invalidar(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._dados.pop(chave, None)
+                if chave in self._calculando:
+                    self._versoes[chave] = self._versoes.get(chave, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._dados.clear()
+            self._versoes.clear()
@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+from functools import wraps
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from extensions import db
+
+## PERFIS DE CONEXÃO ##
+# Cada processo escolhe um perfil (DB_PERFIL) e as opções do engine saem dele; DB_POOL_SIZE, DB_MAX_OVERFLOW,
+# DB_POOL_RECYCLE e DB_STATEMENT_TIMEOUT_MS sobrepõem o perfil. Vale para o primário e para as réplicas.
+#   web:    workers do gunicorn; threads do worker (4) + fila de batidas + auditoria
+#   worker: processos de segundo plano (folha, importação), poucas conexões e consultas longas
+#   batch:  comandos flask do cron (fechamento, backfill, arquivamento), sem limite de tempo por comando
+# Rotas web que normalmente passam do limite do perfil web (exportação em streaming, importação de CSV)
+# usam @operacao_longa: as transações da requisição rodam com DB_STATEMENT_TIMEOUT_LONGO_MS.
+PERFIS = {
+    "web": {"pool_size": 6, "max_overflow": 4, "pool_timeout": 5, "pool_recycle": 1800, "statement_timeout_ms": 15000},
+    "worker": {"pool_size": 2, "max_overflow": 2, "pool_timeout": 30, "pool_recycle": 1800, "statement_timeout_ms": 300000},
+    "batch": {"pool_size": 1, "max_overflow": 1, "pool_timeout": 60, "pool_recycle": 3600, "statement_timeout_ms": 0},
+}
+
+SOBREPOSICOES = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "statement_timeout_ms": "DB_STATEMENT_TIMEOUT_MS",
+}
+
+# Sem pool_pre_ping (um SELECT 1 a cada checkout). Conexões quebradas são tratadas assim:
+#   - pool_recycle abaixo do timeout de ociosidade do servidor/pgbouncer/firewall descarta conexões velhas;
+#   - keepalive de TCP derruba conexões mortas enquanto estão paradas no pool;
+#   - pool_use_lifo reaproveita sempre as mesmas conexões e deixa as ociosas envelhecerem até o recycle;
+#   - num erro de desconexão o SQLAlchemy invalida a conexão e todas as abertas antes dela (só a
+#     requisição em curso falha; as seguintes recebem conexões novas).
+# Com DB_PGBOUNCER (modo transação) nada é fixado na sessão do servidor: o statement_timeout vai por
+# SET LOCAL em cada transação (prefira ALTER ROLE ... SET statement_timeout e DB_STATEMENT_TIMEOUT_MS=0)
+# e prepared statements no servidor ficam desligados (psycopg 3; o psycopg2 nunca os usa).
+# Sem DB_PERFIL: comandos `flask ...` (cron, `flask db upgrade`) usam o batch, que não tem statement_timeout;
+# `flask run` e o gunicorn usam o web
+def nome_perfil(config):
+    if config["DB_PERFIL"]:
+        return config["DB_PERFIL"]
+    programa = os.path.basename(sys.argv[0]) if sys.argv else ""
+    linha_de_comando = programa in ("flask", "flask.exe") or sys.argv[0].endswith(os.path.join("flask", "__main__.py"))
+    return "batch" if linha_de_comando and "run" not in sys.argv[1:] else "web"
+
+def perfil_configurado(config):
+    nome = nome_perfil(config)
+    if nome not in PERFIS:
+        raise ValueError(f"DB_PERFIL inválido: {nome!r} (use {', '.join(PERFIS)}).")
+
+    perfil = dict(PERFIS[nome])
+    for chave, variavel in SOBREPOSICOES.items():
+        if config.get(variavel) not in (None, ""):
+            perfil[chave] = int(config[variavel])
+    return perfil
+
+def opcoes_engine(config):
+    perfil = perfil_configurado(config)
+    opcoes = {
+        "pool_size": perfil["pool_size"],
+        "max_overflow": perfil["max_overflow"],
+        "pool_timeout": perfil["pool_timeout"],
+        "pool_recycle": perfil["pool_recycle"],
+        "pool_use_lifo": True,
+    }
+
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}  # banco em memória: pool de conexão única
+    if url.get_backend_name() != "postgresql":
+        return opcoes
+
+    argumentos = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+    if config["DB_PGBOUNCER"]:
+        if url.get_driver_name() == "psycopg":
+            argumentos["prepare_threshold"] = None
+    elif perfil["statement_timeout_ms"]:
+        # Enviado na abertura da conexão: nenhum comando a mais por requisição
+        argumentos["options"] = f"-c statement_timeout={perfil['statement_timeout_ms']}"
+    opcoes["connect_args"] = argumentos
+    return opcoes
+
+## TEMPO LIMITE POR ROTA ##
+# SET LOCAL na transação do primário já aberta (carga do usuário logado) e, pelo evento "begin" dos engines,
+# em cada transação que começar durante a requisição, inclusive na resposta gerada com stream_with_context.
+def operacao_longa(f):
+    @wraps(f)
+    def funcao_decorada(*args, **kwargs):
+        g.statement_timeout_ms = current_app.config["DB_STATEMENT_TIMEOUT_LONGO_MS"]
+        if db.session().in_transaction() and db.engine.dialect.name == "postgresql":
+            db.session.connection().exec_driver_sql(f"SET LOCAL statement_timeout = {int(g.statement_timeout_ms)}")
+        return f(*args, **kwargs)
+    return funcao_decorada
+
+## MÉTRICAS DO POOL ##
+# Contadores por engine (primário e réplicas) neste processo; o estado atual vem do próprio pool.
+# Expostos em /superadmin/metricas/pool.
+class MonitorConexoes:
+    def __init__(self, app=None):
+        self.app = None
+        self._trava = threading.Lock()
+        self._contadores = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        perfil = perfil_configurado(app.config)
+        with app.app_context():
+            for chave, engine in db.engines.items():
+                nome = chave or "primario"
+                self._contadores[nome] = {"conexoes_abertas": 0, "checkouts": 0, "invalidacoes": 0}
+                self._instrumentar(nome, engine)
+                if engine.dialect.name == "postgresql":
+                    padrao = perfil["statement_timeout_ms"] if app.config["DB_PGBOUNCER"] else None
+                    self._timeout_por_transacao(engine, padrao or None)
+        app.extensions["monitor_conexoes"] = self
+
+    def _contar(self, nome, contador):
+        with self._trava:
+            self._contadores[nome][contador] += 1
+
+    def _instrumentar(self, nome, engine):
+        event.listen(engine.pool, "connect", lambda *args: self._contar(nome, "conexoes_abertas"))
+        event.listen(engine.pool, "checkout", lambda *args: self._contar(nome, "checkouts"))
+        event.listen(engine.pool, "invalidate", lambda *args: self._contar(nome, "invalidacoes"))
+
+    # Com pgbouncer, o limite do perfil em toda transação; em qualquer modo, o de @operacao_longa
+    def _timeout_por_transacao(self, engine, milissegundos):
+        @event.listens_for(engine, "begin")
+        def definir_timeout(conexao):
+            valor = g.get("statement_timeout_ms") if has_app_context() else None
+            if valor is None:
+                valor = milissegundos
+            if valor is not None:
+                conexao.exec_driver_sql(f"SET LOCAL statement_timeout = {int(valor)}")
+
+    def metricas(self):
+        resultado = {"pid": os.getpid(), "perfil": nome_perfil(self.app.config), "engines": {}}
+        with self.app.app_context():
+            for chave, engine in db.engines.items():
+                nome = chave or "primario"
+                pool = engine.pool
+                with self._trava:
+                    contadores = dict(self._contadores.get(nome, {}))
+                resultado["engines"][nome] = {
+                    "tamanho": pool.size() if hasattr(pool, "size") else None,
+                    "em_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                    "livres": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                    "excedentes": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,  # negativo = vagas no pool
+                    **contadores,
+                }
+        return resultado
+
+monitor_conexoes = MonitorConexoes()
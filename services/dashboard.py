@@ -0,0 +1,166 @@
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from extensions import db
+from models import Ponto, User, PontoResumo, ResumoMensal, TIPOS_MARCACAO
+from services.arquivo import linhas_arquivadas
+from services.banco_horas import calcular_banco_horas, jornada_diaria, resultado_da_linha
+from services.cache import CacheTTL
+from services.replicas import do_primario
+
+cache_dashboard = CacheTTL()
+
+PENDENTES_MAX = 50
+
+## PAINEL DO ADMINISTRADOR ##
+# Só agregados (COUNT/SUM) sobre o ponto_resumo do mês corrente: o custo não cresce com o histórico.
+# O resultado fica em cache por empresa e é invalidado a cada batida (services.ponto / services.ingestao);
+# por isso é calculado no primário, não na réplica da view.
+def painel_admin(empresa_id):
+    return cache_dashboard.obter(
+        ("admin", empresa_id),
+        lambda: do_primario(calcular_painel_admin, empresa_id),
+        ttl=current_app.config["DASHBOARD_CACHE_TTL"]
+    )
+
+def calcular_painel_admin(empresa_id, hoje=None):
+    # Mesmo referencial (UTC) usado no registro das batidas
+    hoje = hoje or datetime.now(timezone.utc).date()
+    inicio_mes = hoje.replace(day=1)
+
+    total_funcionarios = db.session.scalar(
+        db.select(db.func.count(User.id)).where(User.empresa_id == empresa_id, User.tipo == "funcionario")
+    )
+
+    total_registros, segundos = db.session.execute(
+        db.select(db.func.count(PontoResumo.id), db.func.coalesce(db.func.sum(PontoResumo.segundos_trabalhados), 0))
+        .join(User, User.id == PontoResumo.user_id)
+        .where(User.empresa_id == empresa_id, PontoResumo.data >= inicio_mes)
+    ).one()
+
+    # Ainda no expediente: batidas ímpares hoje (entrou e não saiu); a lista é limitada, o total não
+    no_expediente = (
+        db.select(User.id, User.nome, PontoResumo.ultima)
+        .join(User, User.id == PontoResumo.user_id)
+        .where(User.empresa_id == empresa_id, PontoResumo.data == hoje, PontoResumo.qtd_marcacoes % 2 == 1)
+    )
+    total_pendentes = db.session.scalar(db.select(db.func.count()).select_from(no_expediente.subquery()))
+    pendentes = db.session.execute(no_expediente.order_by(User.nome).limit(PENDENTES_MAX)).all()
+
+    return {
+        "total_funcionarios": total_funcionarios,
+        "total_registros": total_registros,
+        "total_horas": timedelta(seconds=int(segundos)),
+        "pendentes": [{"user_id": p.id, "nome": p.nome, "ultima": p.ultima} for p in pendentes],
+        "total_pendentes": total_pendentes,
+    }
+
+## PAINEL DO FUNCIONÁRIO ##
+# Totais e série semanal numa única consulta agregada ao resumo diário do usuário, em cache por usuário.
+# As extras são recalculadas no banco com a jornada da empresa (a mesma das telas do admin); a série cobre
+# as últimas PAINEL_SEMANAS semanas, agrupadas por dia no banco e por (ano, semana ISO) aqui.
+PAINEL_SEMANAS = 12
+
+def painel_funcionario(user_id, carga):
+    return cache_dashboard.obter(
+        ("funcionario", user_id),
+        lambda: do_primario(calcular_painel_funcionario, user_id, carga),
+        ttl=current_app.config["DASHBOARD_CACHE_TTL"]
+    )
+
+def calcular_painel_funcionario(user_id, carga, limite_extras=2, hoje=None):
+    hoje = hoje or date.today()
+    inicio = hoje - timedelta(days=hoje.weekday(), weeks=PAINEL_SEMANAS - 1)
+
+    excedente = PontoResumo.segundos_trabalhados - int(carga.total_seconds())
+    limite = limite_extras * 3600
+    dias = (
+        db.select(
+            db.case((PontoResumo.data >= inicio, PontoResumo.data)).label("dia"),
+            PontoResumo.segundos_trabalhados.label("segundos"),
+            db.case((excedente <= 0, 0), (excedente > limite, limite), else_=excedente).label("extras"),
+        )
+        .where(PontoResumo.user_id == user_id)
+        .subquery()
+    )
+    # Uma linha por dia da janela e uma só (dia nulo) para todo o histórico anterior
+    linhas = db.session.execute(
+        db.select(dias.c.dia, db.func.sum(dias.c.segundos), db.func.sum(dias.c.extras))
+        .group_by(dias.c.dia)
+        .order_by(dias.c.dia)
+    )
+
+    total_trabalhado = total_extras = 0
+    semanas = {}
+    for dia, segundos, extras in linhas:
+        total_trabalhado += segundos
+        total_extras += extras
+        if dia is None:
+            continue
+        ano, semana, _ = dia.isocalendar()
+        horas, horas_extras = semanas.get((ano, semana), (0, 0))
+        semanas[(ano, semana)] = (horas + segundos, horas_extras + extras)
+    semanas = dict(sorted(semanas.items()))
+
+    return {
+        "horas_trabalhadas": round(total_trabalhado / 3600, 2),
+        "horas_extras": round(total_extras / 3600, 2),
+        "semanas": [f"{semana:02d}/{ano}" for ano, semana in semanas],
+        "horas_semanais": [round(horas / 3600, 2) for horas, _ in semanas.values()],
+        "extras_semanais": [round(extras / 3600, 2) for _, extras in semanas.values()],
+    }
+
+# Histórico de um intervalo [inicio, fim), mais recente primeiro; o painel abre com HISTORICO_MESES
+# e os meses anteriores são carregados sob demanda. Com a empresa informada, anos já arquivados
+# (services.arquivo) vêm dos arquivos Parquet.
+HISTORICO_MESES = 2
+
+def historico_funcionario(user_id, inicio, fim=None, empresa=None):
+    empresa_id = empresa.id if empresa else None
+    carga = jornada_diaria(empresa)
+    resultados = [resultado_da_linha(linha, carga) for linha in linhas_arquivadas(empresa_id, inicio, fim, usuarios=[user_id])]
+    resultados += calcular_banco_horas(Ponto.user_id == user_id, carga=carga, inicio=inicio, fim=fim)
+
+    historico = []
+    for r in reversed(resultados):
+        historico.append({
+            "data": r["data"],
+            "horarios": "-".join(r["horarios"][tipo].strftime("%Hh%M") for tipo in TIPOS_MARCACAO if tipo in r["horarios"]),
+            "total_trabalhado": r["total_trabalhado"],
+            "saldo": r["saldo"],
+            "extras": r["extras"],
+            "deficit": r["deficit"]
+        })
+    return historico
+
+# Primeiro dia do mês anterior com registros (antes de `data`), ou None se não houver mais histórico
+def mes_anterior_com_registros(user_id, data):
+    anterior = db.session.scalar(
+        db.select(db.func.max(PontoResumo.data)).where(PontoResumo.user_id == user_id, PontoResumo.data < data)
+    )
+    if anterior:
+        return anterior.replace(day=1)
+
+    # Anos arquivados não têm resumo diário no banco, só o fechamento mensal
+    fechado = db.session.execute(
+        db.select(ResumoMensal.ano, ResumoMensal.mes)
+        .where(
+            ResumoMensal.user_id == user_id,
+            db.or_(ResumoMensal.ano < data.year, db.and_(ResumoMensal.ano == data.year, ResumoMensal.mes < data.month))
+        )
+        .order_by(ResumoMensal.ano.desc(), ResumoMensal.mes.desc())
+        .limit(1)
+    ).first()
+    return date(fechado.ano, fechado.mes, 1) if fechado else None
+
+def invalidar_empresas(*empresa_ids):
+    cache_dashboard.invalidar(*[("admin", empresa_id) for empresa_id in empresa_ids])
+
+def invalidar_usuarios(*user_ids):
+    cache_dashboard.invalidar(*[("funcionario", user_id) for user_id in user_ids])
+
+def invalidar_por_usuarios(user_ids):
+    if not user_ids:
+        return
+    invalidar_usuarios(*user_ids)
+    empresas = db.session.scalars(db.select(User.empresa_id).where(User.id.in_(user_ids)).distinct())
+    invalidar_empresas(*empresas)
@@ -0,0 +1,90 @@
+import click
+from datetime import datetime, timezone
+from flask.cli import with_appcontext
+from extensions import db, upsert
+from models import Empresa, EmpresaEstatistica, Ponto, User
+
+## ESTATÍSTICAS POR EMPRESA ##
+# O painel do superadmin lê só a tabela empresa_estatisticas; a contagem pesada roda aqui,
+# num job periódico (cron: `flask atualizar_estatisticas`) em vez de a cada visita.
+# Pontos são varridos só no mês corrente: a última atividade anterior ao mês fica na própria tabela
+# e o histórico inteiro só é consultado para empresas que ainda não têm essa informação.
+def atualizar_estatisticas(empresa_id=None, agora=None):
+    agora = agora or datetime.now(timezone.utc)
+    inicio_mes = agora.date().replace(day=1)
+
+    empresas = db.select(Empresa.id)
+    if empresa_id:
+        empresas = empresas.where(Empresa.id == empresa_id)
+    ids = list(db.session.scalars(empresas))
+    if not ids:
+        return 0
+
+    usuarios = {
+        linha.empresa_id: linha
+        for linha in db.session.execute(
+            db.select(
+                User.empresa_id,
+                db.func.count().filter(User.tipo == "admin").label("admins"),
+                db.func.count().filter(User.tipo == "funcionario").label("funcionarios"),
+                db.func.count().filter(User.tipo == "funcionario", User.ativo.is_(True)).label("ativos"),
+            )
+            .where(User.empresa_id.in_(ids))
+            .group_by(User.empresa_id)
+        )
+    }
+
+    pontos = {
+        linha.empresa_id: linha
+        for linha in db.session.execute(
+            db.select(User.empresa_id, db.func.count(Ponto.id).label("pontos"), db.func.max(Ponto.data).label("ultima"))
+            .join(User, User.id == Ponto.user_id)
+            .where(User.empresa_id.in_(ids), Ponto.data >= inicio_mes)
+            .group_by(User.empresa_id)
+        )
+    }
+
+    anteriores = dict(db.session.execute(
+        db.select(EmpresaEstatistica.empresa_id, EmpresaEstatistica.ultima_atividade)
+        .where(EmpresaEstatistica.empresa_id.in_(ids))
+    ).all())
+
+    sem_atividade = [id for id in ids if id not in pontos and anteriores.get(id) is None]
+    if sem_atividade:
+        anteriores.update(db.session.execute(
+            db.select(User.empresa_id, db.func.max(Ponto.data))
+            .join(User, User.id == Ponto.user_id)
+            .where(User.empresa_id.in_(sem_atividade))
+            .group_by(User.empresa_id)
+        ).all())
+
+    linhas = []
+    for id in ids:
+        u = usuarios.get(id)
+        p = pontos.get(id)
+        linhas.append({
+            "empresa_id": id,
+            "total_admins": u.admins if u else 0,
+            "total_funcionarios": u.funcionarios if u else 0,
+            "funcionarios_ativos": u.ativos if u else 0,
+            "mes_referencia": inicio_mes,
+            "pontos_mes": p.pontos if p else 0,
+            "ultima_atividade": p.ultima if p else anteriores.get(id),
+            "atualizado_em": agora.replace(tzinfo=None),
+        })
+
+    stmt = upsert(EmpresaEstatistica).values(linhas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EmpresaEstatistica.empresa_id],
+        set_={campo: stmt.excluded[campo] for campo in linhas[0] if campo != "empresa_id"}
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+    return len(linhas)
+
+@click.command("atualizar_estatisticas")
+@click.option("--empresa-id", type=int, default=None, help="Atualiza apenas uma empresa.")
+@with_appcontext
+def atualizar_estatisticas_command(empresa_id):
+    total = atualizar_estatisticas(empresa_id)
+    click.echo(f"Estatísticas atualizadas para {total} empresa(s).")
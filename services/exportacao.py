@@ -0,0 +1,113 @@
+import csv
+import heapq
+import io
+import os
+import tempfile
+from datetime import timedelta
+from extensions import db
+from models import User, Empresa, Ponto, TIPOS_MARCACAO
+from repositories.ponto import consultar_horarios
+from services import arquivo
+from services.banco_horas import jornada_diaria, resultado_da_linha
+
+try:
+    import xlsxwriter
+except ImportError:  # XLSX é opcional; sem o pacote só o CSV fica disponível
+    xlsxwriter = None
+
+TAMANHO_LOTE = 1000
+LINHAS_POR_ABA = 1048575  # limite do Excel, menos o cabeçalho
+
+CABECALHO = ["CPF", "Nome", "Data", *[tipo.replace("_", " ").title() for tipo in TIPOS_MARCACAO],
+             "Total Trabalhado", "Carga", "Saldo", "Extras", "Déficit"]
+
+## EXPORTAÇÃO DE MARCAÇÕES ##
+# Uma linha por funcionário/dia, com as marcações pivotadas por tipo e os totais calculados como em
+# calcular_horas_ponto (mesma jornada da empresa usada no banco de horas).
+# A consulta usa cursor no servidor (yield_per): nada além de um lote fica em memória, seja qual for o período.
+# Anos arquivados (services.arquivo) vêm dos arquivos Parquet, intercalados na mesma ordem de funcionário e data.
+def linhas_marcacoes(empresa_id, inicio, fim):
+    carga = jornada_diaria(db.session.get(Empresa, empresa_id))
+    fim = fim + timedelta(days=1)
+    consulta = (
+        consultar_horarios(User.empresa_id == empresa_id, inicio=inicio, fim=fim)
+        .join(User, User.id == Ponto.user_id)
+        .add_columns(User.nome, User.cpf)
+        .group_by(User.nome, User.cpf)
+        .order_by(None)
+        .order_by(User.nome, Ponto.user_id, Ponto.data)
+        .yield_per(TAMANHO_LOTE)
+    )
+
+    linhas = ((linha, linha.nome, linha.cpf) for linha in consulta)
+
+    if arquivo.arquivos(empresa_id, inicio, fim):
+        usuarios = db.session.execute(
+            db.select(User.id, User.nome, User.cpf).where(User.empresa_id == empresa_id).order_by(User.nome, User.id)
+        ).all()
+        ordem = {usuario.id: posicao for posicao, usuario in enumerate(usuarios)}
+        dados = {usuario.id: (usuario.nome, usuario.cpf) for usuario in usuarios}
+        arquivadas = (
+            (linha, *dados[linha.user_id])
+            for linha in arquivo.linhas_arquivadas(empresa_id, inicio, fim, usuarios=list(ordem))
+        )
+        linhas = heapq.merge(arquivadas, linhas, key=lambda item: (ordem.get(item[0].user_id, len(ordem)), item[0].data))
+
+    for linha, nome, cpf in linhas:
+        resultado = resultado_da_linha(linha, carga)
+        yield [
+            cpf,
+            nome,
+            linha.data,
+            *[hora.strftime("%H:%M") if hora else "" for hora in (getattr(linha, tipo) for tipo in TIPOS_MARCACAO)],
+            *[duracao(resultado[campo]) for campo in ("total_trabalhado", "carga", "saldo", "extras", "deficit")],
+        ]
+
+# HH:MM com sinal (format_timedelta não trata saldo negativo)
+def duracao(td):
+    segundos = int(td.total_seconds())
+    sinal = "-" if segundos < 0 else ""
+    horas, resto = divmod(abs(segundos), 3600)
+    return f"{sinal}{horas:02d}:{resto // 60:02d}"
+
+# CSV no padrão do Excel em português (; e BOM), enviado em blocos de TAMANHO_LOTE linhas
+def gerar_csv(linhas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+
+    buffer.write("\ufeff")
+    escritor.writerow(CABECALHO)
+    for numero, linha in enumerate(linhas, 1):
+        linha[2] = linha[2].strftime("%d/%m/%Y")
+        escritor.writerow(linha)
+        if numero % TAMANHO_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# XLSX em modo constant_memory: cada linha vai direto para o arquivo temporário do xlsxwriter.
+# O formato só pode ser enviado depois de fechado, então o arquivo é montado em disco e transmitido em blocos.
+def gerar_xlsx(linhas):
+    descritor, caminho = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descritor)
+    try:
+        livro = xlsxwriter.Workbook(caminho, {"constant_memory": True, "default_date_format": "dd/mm/yyyy"})
+        negrito = livro.add_format({"bold": True})
+        aba, linha_atual = None, LINHAS_POR_ABA
+        for linha in linhas:
+            if linha_atual >= LINHAS_POR_ABA:
+                aba = livro.add_worksheet(f"Marcações {len(livro.worksheets()) + 1}")
+                aba.write_row(0, 0, CABECALHO, negrito)
+                linha_atual = 0
+            linha_atual += 1
+            aba.write_row(linha_atual, 0, linha)
+        if aba is None:
+            livro.add_worksheet("Marcações 1").write_row(0, 0, CABECALHO, negrito)
+        livro.close()
+
+        with open(caminho, "rb") as arquivo:
+            while bloco := arquivo.read(64 * 1024):
+                yield bloco
+    finally:
+        os.remove(caminho)
@@ -0,0 +1,249 @@
+import click
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import zipfile
+from calendar import monthrange
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app, render_template
+from flask.cli import with_appcontext
+from sqlalchemy.orm import joinedload
+from werkzeug.utils import secure_filename
+from extensions import db
+from models import User, PontoResumo
+from services.pdf import renderizador_pdf, cache_pdf
+from utils import calcular_holerite
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, só dentro do mesmo processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_HOLERITE = "documentos/holerite_pdf.html"
+
+# Horas de cada dia (da primeira à última batida), a partir do resumo diário
+def horas_por_dia(resumos):
+    horas = []
+    for r in resumos:
+        if r.qtd_marcacoes >= 2:
+            horas.append((datetime.combine(r.data, r.ultima) - datetime.combine(r.data, r.primeira)).total_seconds() / 3600)
+    return horas
+
+## FOLHA DE PAGAMENTO EM LOTE ##
+# Holerites de todos os funcionários de uma empresa no mês: uma consulta para os funcionários (com a
+# empresa) e uma para os resumos diários do mês inteiro; o cálculo é o mesmo do holerite individual.
+def holerites_da_empresa(empresa_id, ano, mes):
+    inicio = date(ano, mes, 1)
+    fim = date(ano, mes, monthrange(ano, mes)[1])
+
+    funcionarios = (
+        User.query
+        .options(joinedload(User.empresa))
+        .filter(User.empresa_id == empresa_id, User.tipo == "funcionario")
+        .order_by(User.id)
+        .all()
+    )
+
+    resumos = defaultdict(list)
+    for r in db.session.execute(
+        db.select(PontoResumo.user_id, PontoResumo.data, PontoResumo.primeira, PontoResumo.ultima, PontoResumo.qtd_marcacoes)
+        .join(User, User.id == PontoResumo.user_id)
+        .where(User.empresa_id == empresa_id, PontoResumo.data >= inicio, PontoResumo.data <= fim)
+    ):
+        resumos[r.user_id].append(r)
+
+    holerites = []
+    for funcionario in funcionarios:
+        # Desligados antes do mês não entram na folha
+        if funcionario.data_demissao and funcionario.data_demissao < inicio:
+            continue
+        contexto = {"funcionario": funcionario, "mes": f"{ano}-{mes:02d}"}
+        contexto.update(calcular_holerite(funcionario, horas_por_dia(resumos[funcionario.id])))
+        holerites.append(contexto)
+    return holerites
+
+# Cada holerite é gravado em <PDF_FOLHA_DIR>/<empresa>/<ano-mes>/ com o hash do conteúdo no nome:
+# rodar de novo só gera o que falta ou o que mudou (retomada após falha ou novo fechamento).
+# O andamento fica em status.json, lido pela tela do admin em qualquer processo web. Enquanto processa,
+# o status leva o pid e o host de quem gera e é regravado pelo menos a cada INTERVALO_SINAL segundos:
+# se o processo morreu ou o sinal passou de PDF_FOLHA_EXPIRA, a geração aparece como interrompida e pode
+# ser retomada pela tela.
+INTERVALO_SINAL = 15
+
+class ProcessamentoFolha:
+    def __init__(self, empresa_id, ano, mes):
+        self.empresa_id, self.ano, self.mes = empresa_id, ano, mes
+        base = os.path.join(current_app.config["PDF_FOLHA_DIR"], str(empresa_id))
+        self.diretorio = os.path.join(base, f"{ano}-{mes:02d}")
+        self.arquivo_zip = os.path.join(base, f"folha_{ano}-{mes:02d}.zip")
+        self.arquivo_status = os.path.join(self.diretorio, "status.json")
+        self.expira = timedelta(seconds=current_app.config["PDF_FOLHA_EXPIRA"])
+        self._ultimo_sinal = 0
+
+    def status(self):
+        try:
+            with open(self.arquivo_status, encoding="utf-8") as arquivo:
+                status = json.load(arquivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if status.get("estado") == "processando" and not self._ativo(status):
+            status.update(estado="erro", erro="a geração foi interrompida")
+        return status
+
+    def _ativo(self, status):
+        atualizado_em = datetime.fromisoformat(status["atualizado_em"])
+        if datetime.now(timezone.utc) - atualizado_em > self.expira:
+            return False
+        if status.get("host") == socket.gethostname() and os.name == "posix":
+            try:
+                os.kill(status["pid"], 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        return True
+
+    def _gravar_status(self, **status):
+        status.update(atualizado_em=datetime.now(timezone.utc).isoformat(), pid=os.getpid(), host=socket.gethostname())
+        gravar_atomico(self.arquivo_status, json.dumps(status).encode())
+        self._ultimo_sinal = time.monotonic()
+
+    # Chamado antes de a thread começar, para a tela já abrir acompanhando; False se outra geração está ativa
+    def marcar_inicio(self):
+        status = self.status()
+        if status and status["estado"] == "processando":
+            return False
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._gravar_status(estado="processando", total=None, gerados=status.get("gerados", 0) if status else 0)
+        return True
+
+    def executar(self, progresso=None):
+        os.makedirs(self.diretorio, exist_ok=True)
+        with trava(os.path.join(self.diretorio, ".trava")) as obtida:
+            if not obtida:
+                raise FolhaEmAndamento(f"Folha {self.mes:02d}/{self.ano} já está sendo gerada.")
+            try:
+                return self._executar(progresso)
+            except Exception as erro:
+                self._gravar_status(estado="erro", erro=str(erro))
+                raise
+
+    def _executar(self, progresso):
+        holerites = holerites_da_empresa(self.empresa_id, self.ano, self.mes)
+        arquivos = {}
+        for contexto in holerites:
+            funcionario = contexto["funcionario"]
+            chave = cache_pdf.chave(TEMPLATE_HOLERITE, contexto)
+            arquivos[funcionario.id] = (os.path.join(self.diretorio, f"holerite_{funcionario.id}_{chave[:16]}.pdf"), funcionario.nome)
+
+        pendentes = [c for c in holerites if not os.path.exists(arquivos[c["funcionario"].id][0])]
+        total, gerados = len(holerites), len(holerites) - len(pendentes)
+        self._gravar_status(estado="processando", total=total, gerados=gerados)
+        if progresso:
+            progresso(gerados, total)
+
+        lote = ((c["funcionario"].id, render_template(TEMPLATE_HOLERITE, **c)) for c in pendentes)
+        for user_id, pdf in renderizador_pdf.converter_lote(lote):
+            gravar_atomico(arquivos[user_id][0], pdf)
+            gerados += 1
+            if progresso:
+                progresso(gerados, total)
+            if gerados % 25 == 0 or time.monotonic() - self._ultimo_sinal >= INTERVALO_SINAL:
+                self._gravar_status(estado="processando", total=total, gerados=gerados)
+
+        # ZIP só com as versões atuais (arquivos de execuções anteriores com outro conteúdo ficam de fora)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(self.arquivo_zip), suffix=".tmp")
+        with os.fdopen(descritor, "wb") as destino, zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zip:
+            for user_id, (caminho, nome) in arquivos.items():
+                zip.write(caminho, secure_filename(f"holerite_{self.ano}-{self.mes:02d}_{user_id}_{nome}.pdf"))
+        os.replace(temporario, self.arquivo_zip)
+
+        atuais = {os.path.basename(caminho) for caminho, _ in arquivos.values()}
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith("holerite_") and nome not in atuais:
+                os.remove(os.path.join(self.diretorio, nome))
+
+        self._gravar_status(estado="concluido", total=total, gerados=gerados)
+        return self.arquivo_zip
+
+class FolhaEmAndamento(Exception):
+    pass
+
+_travas_locais = defaultdict(threading.Lock)
+
+# Uma geração por empresa-mês: trava local (threads do mesmo processo) e lockf entre processos.
+# lockf e não flock: o flock seria herdado pelos processos do pool de PDF criados durante a geração.
+@contextmanager
+def trava(caminho):
+    local = _travas_locais[caminho]
+    if not local.acquire(blocking=False):
+        yield False
+        return
+    arquivo = open(caminho, "w")
+    try:
+        if fcntl:
+            try:
+                fcntl.lockf(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+        yield True
+    finally:
+        arquivo.close()
+        local.release()
+
+def gravar_atomico(caminho, conteudo):
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    with os.fdopen(descritor, "wb") as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+# Ação do admin: roda numa thread do processo web; a tela acompanha pelo status.json.
+# Retorna False se a folha já está sendo gerada.
+def iniciar_folha_em_segundo_plano(empresa_id, ano, mes):
+    app = current_app._get_current_object()
+    if not ProcessamentoFolha(empresa_id, ano, mes).marcar_inicio():
+        return False
+
+    def executar():
+        with app.app_context():
+            try:
+                ProcessamentoFolha(empresa_id, ano, mes).executar()
+            except FolhaEmAndamento:
+                pass
+            except Exception:
+                logger.exception("Falha ao gerar a folha %02d/%d da empresa %s", mes, ano, empresa_id)
+
+    threading.Thread(target=executar, name=f"folha-{empresa_id}-{ano}-{mes:02d}", daemon=True).start()
+    return True
+
+@click.command("gerar_folha")
+@click.option("--empresa-id", type=int, required=True)
+@click.option("--ano", type=int, default=None, help="Padrão: ano corrente.")
+@click.option("--mes", type=int, default=None, help="Padrão: mês corrente.")
+@with_appcontext
+def gerar_folha_command(empresa_id, ano, mes):
+    hoje = date.today()
+    ano, mes = ano or hoje.year, mes or hoje.month
+    processamento = ProcessamentoFolha(empresa_id, ano, mes)
+
+    with click.progressbar(length=0, label=f"Holerites {mes:02d}/{ano}") as barra:
+        def progresso(gerados, total):
+            barra.length = total
+            barra.update(gerados - barra.pos)
+
+        try:
+            arquivo = processamento.executar(progresso)
+        except FolhaEmAndamento as erro:
+            raise click.ClickException(str(erro))
+
+    click.echo(f"Folha gerada em {arquivo}")
@@ -0,0 +1,86 @@
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from extensions import db
+from models import Empresa, User
+from services.cache import CacheTTL
+
+cache_identidades = CacheTTL(ttl=30, maximo=10000)
+
+# O hash da senha não entra no cache: na instância anexada a coluna fica sem carregar e, se alguém a ler
+# (troca de senha), vem do banco. O login e o rehash usam o usuário da consulta por email.
+FORA_DO_CACHE = {"senha"}
+
+## USUÁRIO DA SESSÃO (user_loader) ##
+# O Flask-Login carrega o usuário a cada requisição. As colunas do usuário e da empresa ficam num cache
+# curto (USUARIO_CACHE_TTL) e viram instâncias anexadas à sessão sem SELECT (merge com load=False):
+# current_user continua sendo um User completo, e current_user.empresa sai do identity map.
+# Alterações via ORM em usuários e empresas invalidam o cache após o commit; INSERT/UPDATE em massa
+# (db.update, insert(User)) não passam pelos eventos e chamam invalidar_usuarios/invalidar_empresas.
+# Entre processos, o TTL é o teto.
+def carregar_usuario(user_id):
+    user_id = int(user_id)
+    ttl = current_app.config["USUARIO_CACHE_TTL"]
+
+    # Na falta, usuário e empresa vêm numa única consulta
+    carregados = {}
+    def buscar_usuario():
+        usuario = db.session.get(User, user_id, options=[joinedload(User.empresa)])
+        carregados["empresa"] = usuario.empresa if usuario else None
+        return colunas(usuario)
+
+    dados = cache_identidades.obter(("usuario", user_id), buscar_usuario, ttl=ttl)
+    if dados is None:
+        return None
+    usuario = anexar(User, dados)
+
+    empresa_id = dados["empresa_id"]
+    if empresa_id is not None:
+        empresa = cache_identidades.obter(
+            ("empresa", empresa_id),
+            lambda: colunas(carregados.get("empresa") or db.session.get(Empresa, empresa_id)),
+            ttl=ttl
+        )
+        # O identity map guarda referências fracas: a empresa fica presa ao usuário
+        if empresa is not None:
+            set_committed_value(usuario, "empresa", anexar(Empresa, empresa))
+    return usuario
+
+def colunas(objeto):
+    if objeto is None:
+        return None
+    return {
+        atributo.key: getattr(objeto, atributo.key)
+        for atributo in inspect(objeto).mapper.column_attrs
+        if atributo.key not in FORA_DO_CACHE
+    }
+
+def anexar(modelo, dados):
+    objeto = modelo(**dados)
+    make_transient_to_detached(objeto)
+    return db.session.merge(objeto, load=False)
+
+def invalidar_usuarios(*user_ids):
+    cache_identidades.invalidar(*[("usuario", user_id) for user_id in user_ids])
+
+def invalidar_empresas(*empresa_ids):
+    cache_identidades.invalidar(*[("empresa", empresa_id) for empresa_id in empresa_ids])
+
+# Edições e exclusões pelo ORM (formulários de admin/superadmin, rehash de senha no login...)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+@event.listens_for(Empresa, "after_update")
+@event.listens_for(Empresa, "after_delete")
+def _registrar_alteracao(mapper, connection, alvo):
+    sessao = inspect(alvo).session
+    if sessao is not None:
+        sessao.info.setdefault("identidades_alteradas", set()).add((mapper.class_, alvo.id))
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_alterados(sessao):
+    for modelo, id in sessao.info.pop("identidades_alteradas", ()):
+        if modelo is User:
+            invalidar_usuarios(id)
+        else:
+            invalidar_empresas(id)
@@ -0,0 +1,214 @@
+import click
+import csv
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Empresa, User
+from repositories.usuarios import mascara_cpf
+from services.dashboard import invalidar_empresas
+from services.estatisticas import atualizar_estatisticas
+from services.identidade import invalidar_usuarios
+from services.senha import gerar_hash, metodo_configurado
+from utils import validar_cpf
+
+OBRIGATORIAS = ["nome", "cpf", "email", "cargo", "senha"]
+OPCIONAIS = ["data_nascimento", "telefone", "rua", "numero", "complemento", "bairro", "cidade", "uf",
+             "salario_mensal", "data_admissao"]
+
+MILHAR = re.compile(r"\d{1,3}(\.\d{3})+(,\d+)?")
+VIRGULA = re.compile(r"\d+,\d+")
+PONTO = re.compile(r"\d+(\.\d+)?")
+ERRO_CODIFICACAO = "Arquivo fora do padrão UTF-8; a importação parou nesta linha. Salve a planilha como \"CSV UTF-8\" e envie as linhas restantes."
+
+class ErroLinha(ValueError):
+    pass
+
+## IMPORTAÇÃO DE FUNCIONÁRIOS ##
+# O CSV é lido em lotes de IMPORTACAO_LOTE linhas: cada lote é validado, confrontado com usuarios numa
+# única consulta (CPF/email já cadastrados), tem as senhas geradas em paralelo no pool e é gravado num
+# insert executemany com commit próprio. Erros não interrompem a importação: viram uma linha no relatório.
+def importar_funcionarios(arquivo, empresa_id):
+    tamanho_lote = current_app.config["IMPORTACAO_LOTE"]
+    workers = current_app.config["IMPORTACAO_WORKERS"]
+    relatorio = {"importados": 0, "erros": []}
+    vistos = {"cpf": set(), "email": set()}
+
+    try:
+        leitor = leitor_csv(arquivo)
+    except UnicodeDecodeError:
+        relatorio["erros"].append({"linha": 1, "mensagem": ERRO_CODIFICACAO})
+        return relatorio
+    faltando = [coluna for coluna in OBRIGATORIAS if coluna not in (leitor.fieldnames or [])]
+    if faltando:
+        relatorio["erros"].append({"linha": 1, "mensagem": f"Colunas obrigatórias ausentes: {', '.join(faltando)}."})
+        return relatorio
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        lote = []
+        try:
+            for numero, linha in enumerate(leitor, 2):
+                lote.append((numero, linha))
+                if len(lote) >= tamanho_lote:
+                    importar_lote(lote, empresa_id, vistos, relatorio, pool)
+                    lote = []
+        except UnicodeDecodeError:
+            # As linhas anteriores seguem para o banco; o restante do arquivo não é lido
+            relatorio["erros"].append({"linha": leitor.line_num + 2, "mensagem": ERRO_CODIFICACAO})
+        if lote:
+            importar_lote(lote, empresa_id, vistos, relatorio, pool)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    relatorio["erros"].sort(key=lambda erro: erro["linha"])
+    if relatorio["importados"]:
+        atualizar_estatisticas(empresa_id)
+        invalidar_empresas(empresa_id)
+    return relatorio
+
+# Aceita ; (Excel em português) ou , e o BOM do UTF-8
+def leitor_csv(arquivo):
+    linhas = linhas_utf8(arquivo) if isinstance(arquivo.read(0), bytes) else iter(arquivo)
+    cabecalho = next(linhas, "")
+    delimitador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    colunas = [coluna.strip().lower() for coluna in next(csv.reader([cabecalho], delimiter=delimitador), [])]
+    return csv.DictReader(linhas, fieldnames=colunas, delimiter=delimitador)
+
+# Decodifica linha a linha para que um erro de codificação aponte a linha (o cabeçalho é lido fora do leitor)
+def linhas_utf8(arquivo):
+    for numero, linha in enumerate(arquivo):
+        yield linha.decode("utf-8-sig" if numero == 0 else "utf-8")
+
+def importar_lote(lote, empresa_id, vistos, relatorio, pool):
+    validos = []
+    for numero, linha in lote:
+        try:
+            dados = validar_linha(linha)
+        except ErroLinha as erro:
+            relatorio["erros"].append({"linha": numero, "mensagem": str(erro)})
+            continue
+        if dados["cpf"] in vistos["cpf"] or dados["email"] in vistos["email"]:
+            relatorio["erros"].append({"linha": numero, "mensagem": "CPF ou email repetido no arquivo."})
+            continue
+        vistos["cpf"].add(dados["cpf"])
+        vistos["email"].add(dados["email"])
+        validos.append((numero, dados))
+    if not validos:
+        return
+
+    # CPF pode estar gravado com ou sem máscara
+    cpfs = {dados["cpf"] for _, dados in validos} | {mascara_cpf(dados["cpf"]) for _, dados in validos}
+    emails = {dados["email"] for _, dados in validos}
+    existentes = db.session.execute(
+        db.select(User.cpf, User.email).where(db.or_(User.cpf.in_(cpfs), User.email.in_(emails)))
+    ).all()
+    cpfs_existentes = {"".join(c for c in cpf if c.isdigit()) for cpf, _ in existentes}
+    emails_existentes = {email.lower() for _, email in existentes}
+
+    novos = []
+    for numero, dados in validos:
+        if dados["cpf"] in cpfs_existentes:
+            relatorio["erros"].append({"linha": numero, "mensagem": "CPF já cadastrado."})
+        elif dados["email"] in emails_existentes:
+            relatorio["erros"].append({"linha": numero, "mensagem": "Email já cadastrado."})
+        else:
+            novos.append((numero, dados))
+    if not novos:
+        return
+
+    # Os processos do pool não têm contexto da aplicação: o método vai junto
+    senhas = [dados.pop("senha") for _, dados in novos]
+    hashear = partial(gerar_hash, metodo=metodo_configurado())
+    hashes = pool.map(hashear, senhas, chunksize=16) if pool else map(hashear, senhas)
+    for (_, dados), senha in zip(novos, hashes):
+        dados.update(senha=senha, tipo="funcionario", empresa_id=empresa_id, ativo=True)
+
+    # O insert em massa não passa pelos eventos do ORM: o cache de identidades é invalidado aqui
+    try:
+        ids = db.session.scalars(insert(User).returning(User.id), [dados for _, dados in novos]).all()
+        db.session.commit()
+        relatorio["importados"] += len(novos)
+    except IntegrityError:
+        # Outro cadastro entrou entre a checagem e o insert: refaz o lote linha a linha
+        db.session.rollback()
+        ids = []
+        for numero, dados in novos:
+            try:
+                with db.session.begin_nested():
+                    ids.append(db.session.scalar(insert(User).values(dados).returning(User.id)))
+                relatorio["importados"] += 1
+            except IntegrityError:
+                relatorio["erros"].append({"linha": numero, "mensagem": "CPF ou email já cadastrado."})
+        db.session.commit()
+    invalidar_usuarios(*ids)
+
+def validar_linha(linha):
+    dados = {coluna: (linha.get(coluna) or "").strip() for coluna in OBRIGATORIAS + OPCIONAIS}
+
+    vazias = [coluna for coluna in OBRIGATORIAS if not dados[coluna]]
+    if vazias:
+        raise ErroLinha(f"Campos obrigatórios vazios: {', '.join(vazias)}.")
+
+    dados["cpf"] = dados["cpf"].replace(".", "").replace("-", "")
+    if not validar_cpf(dados["cpf"]):
+        raise ErroLinha("CPF inválido. Use exatamente 11 números.")
+
+    dados["email"] = dados["email"].lower()
+    if "@" not in dados["email"]:
+        raise ErroLinha("Email inválido.")
+
+    for campo, valor in dados.items():
+        tamanho = getattr(User.__table__.columns[campo].type, "length", None)
+        if tamanho and len(valor) > tamanho:
+            raise ErroLinha(f"Campo {campo} com mais de {tamanho} caracteres.")
+    dados["uf"] = dados["uf"].upper()
+
+    dados["salario_mensal"] = ler_salario(dados["salario_mensal"])
+
+    for campo in ("data_nascimento", "data_admissao"):
+        dados[campo] = ler_data(dados[campo], campo)
+    dados["data_admissao"] = dados["data_admissao"] or date.today()
+
+    # Campos opcionais vazios ficam nulos
+    return {campo: (valor if valor != "" else None) for campo, valor in dados.items()}
+
+# 3.500,00 e 3500,00 (vírgula decimal), 3.500 (milhar) ou 3500.00 (ponto decimal)
+def ler_salario(valor):
+    valor = valor.replace("R$", "").replace(" ", "")
+    if not valor:
+        return 0.0
+    if MILHAR.fullmatch(valor) or VIRGULA.fullmatch(valor):
+        valor = valor.replace(".", "").replace(",", ".")
+    elif not PONTO.fullmatch(valor):
+        raise ErroLinha("Salário inválido. Use 3500,00 ou 3.500,00.")
+    return float(valor)
+
+def ler_data(valor, campo):
+    if not valor:
+        return None
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise ErroLinha(f"{campo.replace('_', ' ').capitalize()} inválida. Use DD/MM/AAAA.")
+
+@click.command("importar_funcionarios")
+@click.argument("arquivo", type=click.File("rb"))
+@click.option("--empresa-id", type=int, required=True)
+@with_appcontext
+def importar_funcionarios_command(arquivo, empresa_id):
+    if not db.session.get(Empresa, empresa_id):
+        raise click.ClickException(f"Empresa {empresa_id} não encontrada.")
+
+    relatorio = importar_funcionarios(arquivo, empresa_id)
+    for erro in relatorio["erros"]:
+        click.echo(f"Linha {erro['linha']}: {erro['mensagem']}", err=True)
+    click.echo(f"{relatorio['importados']} funcionários importados, {len(relatorio['erros'])} linhas com erro.")
@@ -0,0 +1,196 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+from datetime import date, time
+from sqlalchemy.exc import InterfaceError, OperationalError
+from extensions import db
+from services.dashboard import invalidar_por_usuarios
+from services.ponto import inserir_marcacoes
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava de arquivo, spools órfãos não são recuperados automaticamente
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Banco fora do ar, conexão perdida, deadlock: o lote inteiro volta para a fila sem contar tentativa
+TRANSITORIOS = (OperationalError, InterfaceError)
+
+## FILA DE BATIDAS (WRITE-BEHIND) ##
+# A API de ponto confirma a batida assim que ela está no spool local (append + fsync) e a grava
+# no banco em lote, a cada PONTO_FILA_INTERVALO_MS ou quando PONTO_FILA_LOTE batidas se acumulam.
+# Cada processo tem o seu spool; a cada gravação o arquivo corrente é rotacionado e só é apagado
+# depois do commit. Ao subir, o processo regrava os spools órfãos de processos que morreram.
+# A gravação é idempotente pela chave da batida, então reprocessar um spool nunca duplica marcações.
+# Se o lote falha por outro motivo, as batidas são gravadas uma a uma: as que falharem voltam para o
+# spool corrente com a contagem de tentativas e, após PONTO_FILA_TENTATIVAS, vão para rejeitadas.jsonl
+# (no mesmo diretório, fora da recuperação), para que uma batida inválida não trave as seguintes.
+class FilaMarcacoes:
+    def __init__(self, app=None):
+        self.app = None
+        self._condicao = threading.Condition()
+        self._pendentes = []
+        self._arquivos_pendentes = []
+        self._spool = None
+        self._pid = None
+        self._sequencia = 0
+        self._encerrando = False
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.intervalo = app.config["PONTO_FILA_INTERVALO_MS"] / 1000
+        self.tamanho_lote = app.config["PONTO_FILA_LOTE"]
+        self.diretorio = app.config["PONTO_SPOOL_DIR"]
+        self.tentativas = app.config["PONTO_FILA_TENTATIVAS"]
+        app.extensions["fila_marcacoes"] = self
+
+    def enfileirar(self, batida):
+        with self._condicao:
+            self._iniciar()
+            self._spool.write(json.dumps(batida) + "\n")
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._pendentes.append(batida)
+            if len(self._pendentes) >= self.tamanho_lote:
+                self._condicao.notify()
+
+    # A thread é criada no primeiro uso de cada processo (os workers do gunicorn nascem por fork)
+    def _iniciar(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._pendentes, self._arquivos_pendentes = [], []
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._recuperar_orfaos()
+        self._abrir_spool()
+        self._thread = threading.Thread(target=self._executar, name="fila-marcacoes", daemon=True)
+        self._thread.start()
+        atexit.register(self.encerrar)
+
+    def _abrir_spool(self):
+        self._sequencia += 1
+        caminho = os.path.join(self.diretorio, f"marcacoes-{self._pid}-{self._sequencia}.jsonl")
+        self._spool = open(caminho, "a", encoding="utf-8")
+        if fcntl:
+            fcntl.flock(self._spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _recuperar_orfaos(self):
+        if not fcntl:
+            return
+        for caminho in sorted(glob.glob(os.path.join(self.diretorio, "marcacoes-*.jsonl"))):
+            with open(caminho, "a+", encoding="utf-8") as arquivo:
+                try:
+                    fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # spool de um processo vivo
+                arquivo.seek(0)
+                self._pendentes.extend(json.loads(linha) for linha in arquivo if linha.strip())
+                self._arquivos_pendentes.append(caminho)
+        if self._pendentes:
+            logger.warning("Recuperando %d batidas de spools órfãos.", len(self._pendentes))
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                if len(self._pendentes) < self.tamanho_lote and not self._encerrando:
+                    self._condicao.wait(self.intervalo)
+                if not self._pendentes:
+                    if self._encerrando:
+                        self._spool.close()
+                        os.remove(self._spool.name)
+                        return
+                    continue
+                lote, self._pendentes = self._pendentes, []
+                arquivos = self._arquivos_pendentes + [self._spool.name]
+                self._spool.close()
+                self._abrir_spool()
+
+            repetir = []
+            for batida, erro in self._gravar(lote):
+                if erro is not None:
+                    batida["tentativas"] = batida.get("tentativas", 0) + 1
+                    if batida["tentativas"] >= self.tentativas:
+                        self._rejeitar(batida, erro)
+                        continue
+                repetir.append(batida)
+
+            with self._condicao:
+                # As batidas a repetir passam para o spool corrente antes de os arquivos do lote serem apagados
+                if repetir:
+                    self._spool.write("".join(json.dumps(batida) + "\n" for batida in repetir))
+                    self._spool.flush()
+                    os.fsync(self._spool.fileno())
+                    self._pendentes = repetir + self._pendentes
+                self._arquivos_pendentes = [c for c in self._arquivos_pendentes if c not in arquivos]
+            for caminho in arquivos:
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            if repetir:
+                if self._encerrando:
+                    return
+                with self._condicao:
+                    self._condicao.wait(self.intervalo)
+
+    # Devolve as batidas que não foram gravadas, cada uma com o erro (None quando transitório)
+    def _gravar(self, lote):
+        try:
+            self._inserir(lote)
+            return []
+        except TRANSITORIOS:
+            logger.warning("Banco indisponível ao gravar %d batidas; nova tentativa no próximo ciclo.", len(lote), exc_info=True)
+            return [(batida, None) for batida in lote]
+        except Exception:
+            logger.exception("Falha ao gravar lote de %d batidas; gravando uma a uma.", len(lote))
+
+        falhas = []
+        for batida in lote:
+            try:
+                self._inserir([batida])
+            except TRANSITORIOS:
+                falhas.append((batida, None))
+            except Exception as erro:
+                falhas.append((batida, erro))
+        return falhas
+
+    def _inserir(self, lote):
+        with self.app.app_context():
+            try:
+                batidas = [
+                    {
+                        "chave": b["chave"],
+                        "user_id": b["user_id"],
+                        "data": date.fromisoformat(b["data"]),
+                        "hora": time.fromisoformat(b["hora"])
+                    }
+                    for b in lote
+                ]
+                inserir_marcacoes(batidas)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            invalidar_por_usuarios({b["user_id"] for b in batidas})
+
+    def _rejeitar(self, batida, erro):
+        logger.error("Batida %s rejeitada após %d tentativas: %s", batida.get("chave"), batida["tentativas"], erro)
+        with open(os.path.join(self.diretorio, "rejeitadas.jsonl"), "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps({**batida, "erro": str(erro)}) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    # Grava o que restar antes de o processo terminar
+    def encerrar(self, timeout=10):
+        with self._condicao:
+            self._encerrando = True
+            self._condicao.notify()
+        if self._thread and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+fila_marcacoes = FilaMarcacoes()
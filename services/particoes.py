@@ -0,0 +1,152 @@
+import os
+import click
+from datetime import date, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from extensions import db
+from services.arquivo import caminho_arquivo
+
+# Tabelas particionadas por mês (PostgreSQL) e a coluna da partição.
+# marcacoes referencia pontos, então vem depois na criação e antes na desanexação.
+PARTICIONADAS = {
+    "logs": "data_hora",
+    "pontos": "data",
+    "marcacoes": "data",
+}
+
+## PARTIÇÕES MENSAIS ##
+# Cada tabela tem uma partição por mês (<tabela>_pAAAAMM) e uma partição padrão (<tabela>_padrao)
+# que recebe o que cair fora delas, então uma inserção nunca falha por falta de partição.
+# As partições dos próximos meses são criadas com antecedência por `flask criar_particoes` (cron mensal);
+# as antigas saem da tabela com `flask desanexar_particoes` e ficam no banco como tabelas avulsas.
+# Meses de pontos/marcacoes só saem depois de arquivados (services.arquivo): o histórico e a exportação
+# leem os anos fora da janela online do Parquet, não das partições desanexadas.
+def primeiro_dia(data):
+    return date(data.year, data.month, 1)
+
+def proximo_mes(data):
+    return date(data.year + data.month // 12, data.month % 12 + 1, 1)
+
+def nome_particao(tabela, inicio):
+    return f"{tabela}_p{inicio:%Y%m}"
+
+def particionada(tabela):
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return bool(db.session.scalar(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:tabela)"),
+        {"tabela": tabela}
+    ))
+
+def particoes_existentes(tabela):
+    return set(db.session.scalars(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:tabela)"),
+        {"tabela": tabela}
+    ))
+
+# Cria as partições mensais de `inicio` até `fim` (inclusive) que ainda não existem; devolve os nomes criados
+def criar_particoes(tabela, inicio, fim):
+    existentes = particoes_existentes(tabela)
+    criadas = []
+    mes = primeiro_dia(inicio)
+    while mes <= fim:
+        nome = nome_particao(tabela, mes)
+        if nome not in existentes:
+            db.session.execute(text(
+                f"CREATE TABLE {nome} PARTITION OF {tabela} FOR VALUES FROM ('{mes}') TO ('{proximo_mes(mes)}')"
+            ))
+            criadas.append(nome)
+        mes = proximo_mes(mes)
+    db.session.commit()
+    return criadas
+
+# Partições mensais anteriores a `antes`, da mais antiga para a mais nova
+def particoes_anteriores(tabela, antes):
+    limite = nome_particao(tabela, primeiro_dia(antes))
+    prefixo = f"{tabela}_p"
+    return sorted(
+        nome for nome in particoes_existentes(tabela)
+        if nome.startswith(prefixo) and nome[len(prefixo):].isdigit() and nome < limite
+    )
+
+# Desanexa a partição, que passa a ser uma tabela comum com os mesmos dados. As chaves estrangeiras dela são
+# removidas: o arquivo não pode impedir a exclusão de usuários nem a desanexação das partições de pontos.
+def desanexar_particao(tabela, nome):
+    db.session.execute(text(f"ALTER TABLE {tabela} DETACH PARTITION {nome}"))
+    restricoes = db.session.scalars(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:nome) AND contype = 'f'"),
+        {"nome": nome}
+    ).all()
+    for restricao in restricoes:
+        db.session.execute(text(f'ALTER TABLE {nome} DROP CONSTRAINT "{restricao}"'))
+    db.session.commit()
+
+# Empresas com dias na partição de pontos e sem o arquivo do ano (flask arquivar_ano)
+def empresas_sem_arquivo(nome):
+    ano = int(nome[-6:-2])
+    empresas = db.session.scalars(text(f"SELECT DISTINCT u.empresa_id FROM {nome} p JOIN usuarios u ON u.id = p.user_id"))
+    return [empresa_id for empresa_id in empresas if empresa_id is None or not os.path.exists(caminho_arquivo(empresa_id, ano))]
+
+@click.command("criar_particoes")
+@click.option("--meses", type=int, default=3, help="Meses à frente do atual.")
+@with_appcontext
+def criar_particoes_command(meses):
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Particionamento só existe no PostgreSQL.")
+
+    hoje = date.today()
+    fim = primeiro_dia(hoje)
+    for _ in range(meses):
+        fim = proximo_mes(fim)
+
+    for tabela in PARTICIONADAS:
+        if not particionada(tabela):
+            click.echo(f"{tabela}: não particionada (rode `flask db upgrade`).")
+            continue
+        criadas = criar_particoes(tabela, hoje, fim)
+        click.echo(f"{tabela}: {len(criadas)} partições criadas{': ' + ', '.join(criadas) if criadas else ''}.")
+
+@click.command("desanexar_particoes")
+@click.option("--meses", type=int, default=None,
+              help="Meses mantidos na tabela, contando o atual. Padrão: os anos online do arquivo (ARQUIVO_ANOS_ONLINE).")
+@click.option("--tabela", type=click.Choice(list(PARTICIONADAS)), multiple=True, help="Padrão: todas.")
+@with_appcontext
+def desanexar_particoes_command(meses, tabela):
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Particionamento só existe no PostgreSQL.")
+    if meses is None:
+        meses = (current_app.config["ARQUIVO_ANOS_ONLINE"] - 1) * 12 + date.today().month
+    if meses < 1:
+        raise click.BadParameter("O mês atual nunca é desanexado.", param_hint="--meses")
+
+    # As partições de marcacoes referenciam as de pontos (chave composta): pontos nunca sai sozinha
+    if "pontos" in tabela and "marcacoes" not in tabela:
+        tabela = (*tabela, "marcacoes")
+        click.echo("marcacoes incluída: suas partições referenciam as de pontos.")
+
+    antes = primeiro_dia(date.today())
+    for _ in range(meses - 1):
+        antes = primeiro_dia(antes - timedelta(days=1))
+
+    # Meses com dias ainda não arquivados ficam nas duas tabelas: desanexados, sumiriam do histórico e da exportação
+    pendentes = set()
+    if (not tabela or {"pontos", "marcacoes"} & set(tabela)) and particionada("pontos"):
+        for nome in particoes_anteriores("pontos", antes):
+            empresas = empresas_sem_arquivo(nome)
+            if empresas:
+                pendentes.add(nome[-6:])
+                click.echo(f"{nome}: mantida, {len(empresas)} empresa(s) sem o arquivo de {nome[-6:-2]} (rode `flask arquivar_ano`).")
+
+    for nome_tabela in reversed(list(PARTICIONADAS)):
+        if tabela and nome_tabela not in tabela:
+            continue
+        if not particionada(nome_tabela):
+            click.echo(f"{nome_tabela}: não particionada (rode `flask db upgrade`).")
+            continue
+        desanexadas = particoes_anteriores(nome_tabela, antes)
+        if nome_tabela in ("pontos", "marcacoes"):
+            desanexadas = [nome for nome in desanexadas if nome[-6:] not in pendentes]
+        for nome in desanexadas:
+            desanexar_particao(nome_tabela, nome)
+        click.echo(f"{nome_tabela}: {len(desanexadas)} partições desanexadas{': ' + ', '.join(desanexadas) if desanexadas else ''}.")
@@ -0,0 +1,287 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError as FuturoTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import MANYTOONE
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+class ErroPDF(Exception):
+    pass
+
+## RENDERIZAÇÃO DE PDF ##
+# O HTML é montado pelo Jinja no processo web (precisa do contexto da aplicação) e só a conversão
+# HTML -> PDF vai para um pool de processos limitado. Cada processo do pool carrega o backend uma vez
+# e reaproveita o cache de fontes/CSS entre documentos.
+# Backends: "weasyprint" (no próprio processo, padrão) ou "pdfkit" (wkhtmltopdf, PDF_WKHTMLTOPDF).
+# PDF_WORKERS = 0 converte no próprio processo web, sem pool (desenvolvimento).
+# A fila de espera é limitada (PDF_FILA_MAX); quem não consegue lugar ou passa de PDF_TIMEOUT
+# recebe ErroPDF, que vira 503 para o usuário.
+class RenderizadorPDF:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.backend = app.config["PDF_BACKEND"]
+        self.workers = app.config["PDF_WORKERS"]
+        self.timeout = app.config["PDF_TIMEOUT"]
+        self.opcoes = {"wkhtmltopdf": app.config["PDF_WKHTMLTOPDF"], "static": app.static_folder}
+        self._vagas = threading.BoundedSemaphore(self.workers + app.config["PDF_FILA_MAX"])
+        app.extensions["renderizador_pdf"] = self
+        app.register_error_handler(ErroPDF, pdf_indisponivel)
+
+    def converter(self, html):
+        if not self.workers:
+            _iniciar_worker(self.backend, self.opcoes)
+            return _converter(html)
+
+        futuro = self._submeter(html)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturoTimeout:
+            # O worker continua com o documento; a vaga só volta quando ele terminar
+            raise ErroPDF(f"PDF não ficou pronto em {self.timeout}s.")
+        except BrokenProcessPool:
+            self._descartar_pool()
+            raise ErroPDF("Pool de PDFs reiniciado.")
+
+    # Lote (folha de pagamento): recebe pares (id, html) e devolve (id, pdf) conforme ficam prontos.
+    # Cada documento ocupa uma vaga da mesma fila dos PDFs avulsos, com no máximo um documento por processo
+    # do pool em andamento: as PDF_FILA_MAX vagas restantes ficam para as requisições.
+    # Se nenhum documento fica pronto em PDF_TIMEOUT, o lote para com ErroPDF.
+    def converter_lote(self, itens):
+        if not self.workers:
+            _iniciar_worker(self.backend, self.opcoes)
+            for id, html in itens:
+                yield id, _converter(html)
+            return
+
+        pendentes = {}
+        try:
+            for id, html in itens:
+                pendentes[self._submeter(html)] = id
+                if len(pendentes) >= self.workers:
+                    yield from self._prontos(pendentes)
+            while pendentes:
+                yield from self._prontos(pendentes)
+        except BrokenProcessPool:
+            self._descartar_pool()
+            raise ErroPDF("Pool de PDFs reiniciado.")
+        finally:
+            # Lote interrompido: os documentos que ainda não começaram liberam as vagas
+            for futuro in pendentes:
+                futuro.cancel()
+
+    def _prontos(self, pendentes):
+        prontos, _ = wait(pendentes, timeout=self.timeout, return_when=FIRST_COMPLETED)
+        if not prontos:
+            raise ErroPDF(f"PDF não ficou pronto em {self.timeout}s.")
+        for futuro in prontos:
+            yield pendentes.pop(futuro), futuro.result()
+
+    # Vaga na fila (espera até PDF_TIMEOUT) e envio ao pool; a vaga volta quando o documento termina
+    def _submeter(self, html):
+        if not self._vagas.acquire(timeout=self.timeout):
+            raise ErroPDF("Fila de PDFs cheia.")
+        try:
+            futuro = self._executor().submit(_converter, html)
+        except BrokenProcessPool:
+            self._vagas.release()
+            self._descartar_pool()
+            raise ErroPDF("Pool de PDFs reiniciado.")
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        return futuro
+
+    # O pool é criado no primeiro uso de cada processo (os workers do gunicorn nascem por fork)
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_iniciar_worker,
+                    initargs=(self.backend, self.opcoes)
+                )
+            return self._pool
+
+    def _descartar_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def encerrar(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+renderizador_pdf = RenderizadorPDF()
+atexit.register(renderizador_pdf.encerrar)
+
+def pdf_indisponivel(erro):
+    logger.warning("PDF não gerado: %s", erro)
+    return "Não foi possível gerar o PDF agora. Tente novamente em instantes.", 503
+
+## CACHE DE PDFs ##
+# Endereçado pelo conteúdo: a chave é o hash da versão do template mais os dados usados no documento
+# (campos do funcionário e da empresa, mês, totais calculados). Se um ponto muda, os totais mudam e a
+# chave também, então não há invalidação explícita: a entrada antiga só deixa de ser usada e sai pelo LRU.
+# Os arquivos ficam em PDF_CACHE_DIR (fora de static/) e o tamanho total é limitado por PDF_CACHE_MAX_MB,
+# descartando os menos usados (mtime é atualizado a cada acerto).
+class CachePDF:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._tamanho = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.diretorio = app.config["PDF_CACHE_DIR"]
+        self.limite = app.config["PDF_CACHE_MAX_MB"] * 1024 * 1024
+        os.makedirs(self.diretorio, exist_ok=True)
+        app.extensions["cache_pdf"] = self
+
+    def chave(self, template_name, contexto):
+        dados = json.dumps(
+            {"template": template_name, "versao": versao_template(template_name), "contexto": serializar(contexto)},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(dados.encode()).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pdf")
+
+    def obter(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as arquivo:
+                pdf = arquivo.read()
+            os.utime(caminho)
+            return pdf
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, chave, pdf):
+        # Escrita atômica: outro processo nunca lê um PDF pela metade
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        with os.fdopen(descritor, "wb") as arquivo:
+            arquivo.write(pdf)
+        os.replace(temporario, self._caminho(chave))
+
+        with self._lock:
+            if self._tamanho is None:
+                self._tamanho = sum(tamanho for _, tamanho, _ in self._arquivos())
+            else:
+                self._tamanho += len(pdf)
+            if self._tamanho > self.limite:
+                self._liberar_espaco()
+
+    def _arquivos(self):
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(".pdf"):
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        return arquivos
+
+    # Recontado do disco (outros processos também gravam) e reduzido a 90% do limite
+    def _liberar_espaco(self):
+        arquivos = sorted(self._arquivos())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= self.limite * 0.9:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+        self._tamanho = total
+
+cache_pdf = CachePDF()
+
+@lru_cache(maxsize=None)
+def _hash_template(template_name, fonte):
+    return hashlib.sha256(fonte.encode()).hexdigest()[:16]
+
+def versao_template(template_name):
+    fonte, _, _ = current_app.jinja_env.loader.get_source(current_app.jinja_env, template_name)
+    return _hash_template(template_name, fonte)
+
+# Dados do contexto em forma estável para o hash; modelos entram com as colunas e as relações
+# muitos-para-um (ex.: funcionário -> empresa), sem a senha
+def serializar(valor, profundidade=1):
+    if isinstance(valor, db.Model):
+        estado = inspect(valor)
+        dados = {coluna.key: getattr(valor, coluna.key) for coluna in estado.mapper.column_attrs if coluna.key != "senha"}
+        if profundidade:
+            for relacao in estado.mapper.relationships:
+                if relacao.direction is MANYTOONE:
+                    dados[relacao.key] = serializar(getattr(valor, relacao.key), profundidade - 1)
+        return dados
+    if isinstance(valor, dict):
+        return {str(chave): serializar(item, profundidade) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [serializar(item, profundidade) for item in valor]
+    return valor
+
+## PROCESSO DO POOL ##
+_conversor = None
+
+def _iniciar_worker(backend, opcoes):
+    global _conversor
+    if _conversor is not None:
+        return
+
+    if backend == "weasyprint":
+        from weasyprint import HTML, default_url_fetcher
+        from weasyprint.text.fonts import FontConfiguration
+
+        fontes = FontConfiguration()
+        origem = "https://portal.invalid/static/"
+
+        # Nada é buscado na rede: /static/... (url_for) é lido da pasta da aplicação, o resto é bloqueado
+        def buscar_url(url):
+            if url.startswith(origem):
+                url = "file://" + os.path.join(opcoes["static"], url[len(origem):])
+            elif not url.startswith("data:"):
+                raise ValueError(f"URL externa bloqueada no PDF: {url}")
+            return default_url_fetcher(url)
+
+        def converter(html):
+            return HTML(string=html, base_url=origem, url_fetcher=buscar_url).write_pdf(font_config=fontes)
+    elif backend == "pdfkit":
+        import pdfkit
+
+        configuracao = pdfkit.configuration(wkhtmltopdf=opcoes["wkhtmltopdf"] or "")
+
+        def converter(html):
+            return pdfkit.from_string(html, False, configuration=configuracao, options={"quiet": ""})
+    else:
+        raise ValueError(f"Backend de PDF desconhecido: {backend}")
+
+    # Documento de aquecimento: carrega fontes e o CSS padrão antes do primeiro pedido real
+    converter("<html><body><p>PDF</p></body></html>")
+    _conversor = converter
+
+def _converter(html):
+    return _conversor(html)
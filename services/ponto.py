@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy.orm import joinedload
+from extensions import db, upsert
+from models import User, Ponto, Marcacao, TIPOS_MARCACAO
+from services.banco_horas import atualizar_resumos, jornada_diaria
+from services.dashboard import invalidar_empresas, invalidar_usuarios
+
+## REGISTRO DE PONTO ##
+# Uma transação e um commit por batida:
+#   1. upsert do ponto do dia (ON CONFLICT DO UPDATE trava a linha até o commit, então cliques
+#      duplos e batidas simultâneas do mesmo usuário são serializados);
+#   2. INSERT ... SELECT da marcação, com o tipo derivado da contagem atual no próprio comando;
+#   3. atualização do resumo diário.
+# Retorna o tipo registrado ou None se todas as marcações do dia já foram feitas.
+def registrar_marcacao(usuario, agora=None):
+    agora = agora or datetime.now(timezone.utc)
+    hoje, hora = agora.date(), agora.time()
+
+    stmt = upsert(Ponto).values(user_id=usuario.id, data=hoje)
+    stmt = stmt.on_conflict_do_update(index_elements=[Ponto.user_id, Ponto.data], set_={"data": stmt.excluded.data})
+    ponto_id = db.session.execute(stmt.returning(Ponto.id)).scalar_one()
+
+    qtd = db.select(db.func.count(Marcacao.id)).where(Marcacao.ponto_id == ponto_id, Marcacao.data == hoje).scalar_subquery()
+    tipo = db.case(*[(qtd == posicao, nome) for posicao, nome in enumerate(TIPOS_MARCACAO)])
+    selecao = db.select(db.literal(hoje), db.literal(hora), tipo, db.literal(ponto_id)).where(qtd < len(TIPOS_MARCACAO))
+
+    stmt = db.insert(Marcacao).from_select(["data", "hora", "tipo", "ponto_id"], selecao).returning(Marcacao.tipo)
+    tipo_registrado = db.session.execute(stmt).scalar_one_or_none()
+
+    if tipo_registrado:
+        atualizar_resumos([ponto_id], jornada_diaria(usuario.empresa))
+
+    db.session.commit()
+    if tipo_registrado:
+        invalidar_empresas(usuario.empresa_id)
+        invalidar_usuarios(usuario.id)
+    return tipo_registrado
+
+## SINCRONIZAÇÃO DE TERMINAIS ##
+# Batidas coletadas offline chegam com o horário original (mesma referência UTC usada no registro online)
+# e uma chave de idempotência. A validação é feita em lote: uma consulta para todos os usuários do pacote.
+# Retorna o relatório por item, na ordem recebida.
+def sincronizar_batidas(itens, empresa_id, tolerancia=timedelta(minutes=5)):
+    relatorio = [{"id": item.get("id") if isinstance(item, dict) else None} for item in itens]
+    limite = datetime.now(timezone.utc).replace(tzinfo=None) + tolerancia
+
+    candidatas = []
+    for posicao, item in enumerate(itens):
+        erro = None
+        if not isinstance(item, dict) or not item.get("id") or not item.get("user_id"):
+            erro = "Campos obrigatórios: id, user_id, data e hora."
+        else:
+            try:
+                dia = date.fromisoformat(str(item.get("data")))
+                hora = time.fromisoformat(str(item.get("hora")))
+                user_id = int(item["user_id"])
+            except (TypeError, ValueError):
+                erro = "Data, hora ou usuário inválidos."
+            else:
+                if hora.tzinfo:
+                    # Hora com fuso (08:00+03:00): convertida para UTC, o que pode mudar o dia
+                    momento = datetime.combine(dia, hora).astimezone(timezone.utc)
+                    dia, hora = momento.date(), momento.time()
+                if datetime.combine(dia, hora) > limite:
+                    erro = "Horário no futuro."
+                else:
+                    candidatas.append((posicao, {"chave": f"{user_id}:{str(item['id'])[:64]}", "user_id": user_id, "data": dia, "hora": hora}))
+        if erro:
+            relatorio[posicao].update(status="invalida", erro=erro)
+
+    ids = {batida["user_id"] for _, batida in candidatas}
+    permitidos = set(db.session.scalars(
+        db.select(User.id).where(User.id.in_(ids), User.empresa_id == empresa_id, User.ativo.is_(True))
+    )) if ids else set()
+
+    validas = []
+    vistas = set()
+    for posicao, batida in candidatas:
+        if batida["user_id"] not in permitidos:
+            relatorio[posicao].update(status="invalida", erro="Usuário inexistente, inativo ou de outra empresa.")
+        elif batida["chave"] in vistas:
+            relatorio[posicao]["status"] = "duplicada"
+        else:
+            vistas.add(batida["chave"])
+            validas.append((posicao, batida))
+
+    resultado = inserir_marcacoes([batida for _, batida in validas])
+    db.session.commit()
+    invalidar_empresas(empresa_id)
+    invalidar_usuarios(*{batida["user_id"] for _, batida in validas})
+
+    for posicao, batida in validas:
+        relatorio[posicao]["status"] = resultado[batida["chave"]]
+
+    return relatorio
+
+## GRAVAÇÃO EM LOTE ##
+# Grava várias batidas (dicts com chave, user_id, data e hora) em uma transação:
+# upsert dos pontos envolvidos, insert em lote das marcações novas e renumeração dos tipos por hora.
+# Chaves já gravadas são ignoradas; batidas além da 6ª do dia são recusadas.
+# Retorna {chave: "inserida" | "duplicada" | "excedente"}. O commit fica com quem chama.
+def inserir_marcacoes(batidas):
+    unicas = {}
+    for b in batidas:
+        unicas.setdefault(b["chave"], b)
+    batidas = list(unicas.values())
+    if not batidas:
+        return {}
+
+    # Os filtros por data limitam as consultas às partições dos dias do lote
+    datas = {b["data"] for b in batidas}
+    resultado = {}
+    existentes = set(db.session.scalars(
+        db.select(Marcacao.chave).where(Marcacao.chave.in_([b["chave"] for b in batidas]), Marcacao.data.in_(datas))
+    ))
+    for b in batidas:
+        if b["chave"] in existentes:
+            resultado[b["chave"]] = "duplicada"
+    novas = [b for b in batidas if b["chave"] not in existentes]
+    if not novas:
+        return resultado
+
+    # Ordenado para que lotes concorrentes travem os pontos sempre na mesma ordem
+    dias = sorted({(b["user_id"], b["data"]) for b in novas})
+    stmt = upsert(Ponto)
+    stmt = stmt.on_conflict_do_update(index_elements=[Ponto.user_id, Ponto.data], set_={"data": stmt.excluded.data})
+    pontos = {
+        (p.user_id, p.data): p.id
+        for p in db.session.execute(stmt.returning(Ponto.id, Ponto.user_id, Ponto.data), [{"user_id": u, "data": d} for u, d in dias])
+    }
+
+    ocupadas = dict(
+        db.session.query(Marcacao.ponto_id, db.func.count(Marcacao.id))
+        .filter(Marcacao.ponto_id.in_(pontos.values()), Marcacao.data.in_(datas))
+        .group_by(Marcacao.ponto_id)
+        .all()
+    )
+
+    linhas = []
+    for b in sorted(novas, key=lambda b: (b["user_id"], b["data"], b["hora"])):
+        ponto_id = pontos[(b["user_id"], b["data"])]
+        if ocupadas.get(ponto_id, 0) >= len(TIPOS_MARCACAO):
+            resultado[b["chave"]] = "excedente"
+            continue
+        ocupadas[ponto_id] = ocupadas.get(ponto_id, 0) + 1
+        linhas.append({"chave": b["chave"], "data": b["data"], "hora": b["hora"], "ponto_id": ponto_id})
+
+    if linhas:
+        stmt = upsert(Marcacao).on_conflict_do_nothing(index_elements=[Marcacao.chave, Marcacao.data])
+        inseridas = set(db.session.scalars(stmt.returning(Marcacao.chave), linhas))
+        for linha in linhas:
+            resultado[linha["chave"]] = "inserida" if linha["chave"] in inseridas else "duplicada"
+
+        afetados = {linha["ponto_id"] for linha in linhas}
+        renumerar_tipos(afetados, datas)
+        atualizar_resumos_por_usuario(afetados)
+
+    return resultado
+
+# Os tipos seguem a ordem das horas do dia (entrada, saída almoço, ...), como em calcular_horas_ponto
+# `datas` são os dias dos pontos, para que a consulta e o UPDATE só toquem as partições desses dias
+def renumerar_tipos(ponto_ids, datas):
+    ordem = (
+        db.select(
+            Marcacao.id,
+            db.func.row_number().over(partition_by=Marcacao.ponto_id, order_by=(Marcacao.hora, Marcacao.id)).label("ordem")
+        )
+        .where(Marcacao.ponto_id.in_(ponto_ids), Marcacao.data.in_(datas))
+        .subquery()
+    )
+    tipo = db.case(*[(ordem.c.ordem == posicao + 1, nome) for posicao, nome in enumerate(TIPOS_MARCACAO)])
+    db.session.execute(
+        db.update(Marcacao).where(Marcacao.id == ordem.c.id, Marcacao.data.in_(datas)).values(tipo=tipo),
+        execution_options={"synchronize_session": False}
+    )
+
+def atualizar_resumos_por_usuario(ponto_ids):
+    usuarios = (
+        db.session.query(Ponto.id, User)
+        .join(User, User.id == Ponto.user_id)
+        .options(joinedload(User.empresa))
+        .filter(Ponto.id.in_(ponto_ids))
+        .all()
+    )
+
+    por_jornada = defaultdict(list)
+    for ponto_id, usuario in usuarios:
+        por_jornada[jornada_diaria(usuario.empresa)].append(ponto_id)
+
+    for carga, ids in por_jornada.items():
+        atualizar_resumos(ids, carga)
@@ -0,0 +1,45 @@
+import random
+import time
+from functools import wraps
+from flask import current_app, g, request, session
+from extensions import db
+
+PREFIXO = "replica_"
+
+## RÉPLICAS DE LEITURA ##
+# As réplicas são binds "replica_N" (DATABASE_REPLICA_URLS). Views de relatório e painel usam
+# @somente_leitura e leem de uma réplica sorteada por requisição (extensions.SessaoRoteada).
+# Leia-o-que-escreveu: depois de uma escrita do usuário (batida, formulário...) as leituras dele ficam
+# no primário por REPLICA_JANELA segundos, tempo de sobra para a réplica alcançar o primário.
+def replicas():
+    return [db.engines[chave] for chave in current_app.config.get("SQLALCHEMY_BINDS", {}) if chave.startswith(PREFIXO)]
+
+def somente_leitura(f):
+    @wraps(f)
+    def funcao_decorada(*args, **kwargs):
+        disponiveis = replicas()
+        if disponiveis and session.get("_primario_ate", 0) <= time.time():
+            g.replica = random.choice(disponiveis)
+        return f(*args, **kwargs)
+    return funcao_decorada
+
+# Cálculos que alimentam um cache compartilhado (painéis em services.dashboard) leem do primário mesmo numa
+# view @somente_leitura: um valor lido de uma réplica atrasada ficaria no cache até o TTL, depois de a batida
+# já ter invalidado a chave. Os acertos de cache continuam sem tocar o banco.
+def do_primario(funcao, *args, **kwargs):
+    replica = g.pop("replica", None)
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        if replica is not None:
+            g.replica = replica
+
+def fixar_primario():
+    if current_app.config.get("SQLALCHEMY_BINDS") and "_user_id" in session:
+        session["_primario_ate"] = int(time.time()) + current_app.config["REPLICA_JANELA"]
+
+# after_request: qualquer requisição que pode escrever; as rotas de batida que aceitam GET chamam fixar_primario()
+def fixar_primario_apos_escrita(resposta):
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        fixar_primario()
+    return resposta
@@ -0,0 +1,58 @@
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2 é opcional (pacote argon2-cffi); scrypt e pbkdf2 vêm do próprio werkzeug
+    PasswordHasher = None
+
+METODO_PADRAO = "scrypt"
+
+## POLÍTICA DE SENHAS ##
+# Único ponto que gera e confere hashes. O método vem de SENHA_METODO, no formato do werkzeug
+# ("scrypt:n:r:p", "pbkdf2:sha256:iteracoes") ou "argon2[:tempo:memoria_kib:paralelismo]".
+# Hashes gravados com outro método ou custo continuam válidos e são refeitos no próximo login
+# (precisa_rehash), então trocar a configuração não exige reset de senhas.
+def metodo_configurado():
+    if has_app_context():
+        return current_app.config["SENHA_METODO"]
+    return METODO_PADRAO
+
+def gerar_hash(senha, metodo=None):
+    metodo = metodo or metodo_configurado()
+    if metodo.startswith("argon2"):
+        return _argon2(metodo).hash(senha)
+    return generate_password_hash(senha, method=metodo)
+
+def verificar(hash_senha, senha):
+    if hash_senha.startswith("$argon2"):
+        if PasswordHasher is None:
+            return False
+        try:
+            return PasswordHasher().verify(hash_senha, senha)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(hash_senha, senha)
+
+def precisa_rehash(hash_senha, metodo=None):
+    metodo = metodo or metodo_configurado()
+    if metodo.startswith("argon2"):
+        return not hash_senha.startswith("$argon2") or _argon2(metodo).check_needs_rehash(hash_senha)
+    return hash_senha.startswith("$argon2") or hash_senha.split("$", 1)[0] != _prefixo(metodo)
+
+# Prefixo que o werkzeug grava para o método (ex.: "scrypt" -> "scrypt:32768:8:1")
+@lru_cache(maxsize=None)
+def _prefixo(metodo):
+    return generate_password_hash("", method=metodo).split("$", 1)[0]
+
+@lru_cache(maxsize=None)
+def _argon2(metodo):
+    if PasswordHasher is None:
+        raise RuntimeError("SENHA_METODO argon2 requer o pacote argon2-cffi.")
+    _, *custos = metodo.split(":")
+    if not custos:
+        return PasswordHasher()
+    tempo, memoria, paralelismo = map(int, custos)
+    return PasswordHasher(time_cost=tempo, memory_cost=memoria, parallelism=paralelismo)
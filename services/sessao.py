@@ -0,0 +1,21 @@
+import time
+from flask import current_app, request, session
+
+## SESSÃO DESLIZANTE ##
+# A sessão expira após PERMANENT_SESSION_LIFETIME sem uso, mas o cookie só é reassinado e reenviado
+# quando já se passou SESSAO_RENOVACAO (fração) desse tempo desde a última renovação; nas outras
+# respostas não há Set-Cookie. Com 30 min e 0.25, a inatividade derruba a sessão entre 22,5 e 30 min.
+# Arquivos estáticos e requisições sem usuário logado nem olham a sessão.
+def renovar_sessao():
+    endpoint = request.endpoint
+    if endpoint is None or endpoint == "static" or endpoint.endswith(".static"):
+        return
+    if "_user_id" not in session:
+        return
+
+    agora = int(time.time())
+    validade = current_app.permanent_session_lifetime.total_seconds()
+    renovada = session.get("_renovada", 0)
+    if not session.permanent or agora - renovada >= validade * current_app.config["SESSAO_RENOVACAO"]:
+        session.permanent = True
+        session["_renovada"] = agora
@@ -45,6 +45,7 @@ document.addEventListener("DOMContentLoaded", function () {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
+                    id: btnRegistrar.dataset.batida || (btnRegistrar.dataset.batida = crypto.randomUUID()),
                     data: agora.toISOString().split("T")[0],
                     hora: agora.toTimeString().split(" ")[0]
                 })
@@ -52,6 +53,9 @@ document.addEventListener("DOMContentLoaded", function () {
             .then(res => {
                 if (res.redirected) {
                     window.location.href = res.url;
+                } else if (res.status === 202) {
+                    // A batida é gravada em lote; aguarda a gravação antes de recarregar
+                    setTimeout(() => window.location.reload(), 1000);
                 } else {
                     window.location.reload();
                 }
@@ -59,4 +63,40 @@ document.addEventListener("DOMContentLoaded", function () {
             .catch(err => console.error("Erro ao registrar ponto:", err));
         });
     }
+});
+
+document.addEventListener("DOMContentLoaded", function () {
+    const btnHistorico = document.getElementById("carregarHistorico");
+    const tabela = document.getElementById("historicoRegistros");
+
+    if (btnHistorico && tabela) {
+        btnHistorico.addEventListener("click", function () {
+            btnHistorico.disabled = true;
+
+            fetch(btnHistorico.dataset.url)
+            .then(res => res.json())
+            .then(dados => {
+                const vazio = tabela.querySelector("td[colspan]");
+                if (vazio && dados.registros.length) vazio.parentElement.remove();
+
+                dados.registros.forEach(r => {
+                    const linha = tabela.insertRow();
+                    [r.data, r.horarios, r.total_trabalhado, r.saldo, r.extras, r.deficit].forEach(valor => {
+                        linha.insertCell().textContent = valor;
+                    });
+                });
+
+                if (dados.proximo) {
+                    btnHistorico.dataset.url = dados.proximo;
+                    btnHistorico.disabled = false;
+                } else {
+                    btnHistorico.remove();
+                }
+            })
+            .catch(err => {
+                btnHistorico.disabled = false;
+                console.error("Erro ao carregar histórico:", err);
+            });
+        });
+    }
 });
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+import tempfile
+from datetime import date, time, timedelta
+
+# O Config lê DATABASE_URL na importação: os testes usam um SQLite descartável
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "testes.db")
+
+import pytest
+from sqlalchemy import event
+from app import create_app
+from extensions import db
+from models import Empresa, User, Ponto, Marcacao, TIPOS_MARCACAO
+from services.dashboard import cache_dashboard
+from services.identidade import cache_identidades
+
+HORAS = [time(8), time(12), time(13), time(17), time(18), time(19)]
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+# Os dados são gravados num contexto próprio e nenhum fica ativo durante o teste: cada requisição do cliente
+# de teste abre o seu (sessão e `g` novos), como no servidor. Acesso direto ao banco: fixture `contexto`.
+@pytest.fixture
+def banco(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        cache_dashboard.limpar()
+        cache_identidades.limpar()
+
+        empresa = Empresa(nome="Empresa", cnpj="00000000000100", endereco="Rua 1", carga_mensal=220)
+        db.session.add(empresa)
+        db.session.flush()
+        for nome, email, tipo in [("Admin", "admin@teste", "admin"), ("Funcionário", "func@teste", "funcionario")]:
+            usuario = User(nome=nome, email=email, cpf=email[:4], tipo=tipo, salario_mensal=3000, empresa_id=empresa.id)
+            usuario.set_senha("senha")
+            db.session.add(usuario)
+        db.session.commit()
+    yield db
+
+@pytest.fixture
+def contexto(app, banco):
+    with app.app_context():
+        yield db
+
+# Grava `dias` pontos do funcionário terminando em `ate`, com `marcacoes` batidas cada
+@pytest.fixture
+def criar_pontos(app, banco):
+    def criar(dias, ate=None, marcacoes=4):
+        with app.app_context():
+            funcionario = User.query.filter_by(email="func@teste").one()
+            ate = ate or date.today()
+            for atraso in range(dias):
+                dia = ate - timedelta(days=atraso)
+                ponto = Ponto(user_id=funcionario.id, data=dia)
+                db.session.add(ponto)
+                db.session.flush()
+                for posicao in range(marcacoes):
+                    db.session.add(Marcacao(data=dia, hora=HORAS[posicao], tipo=TIPOS_MARCACAO[posicao], ponto_id=ponto.id))
+            db.session.commit()
+            db.session.refresh(funcionario)
+            return funcionario
+    return criar
+
+# Conta os comandos SQL enviados ao banco enquanto o bloco roda
+class ContadorConsultas:
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+
+    def __enter__(self):
+        self.total = 0
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *erro):
+        event.remove(self.engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+@pytest.fixture
+def contar_consultas(app):
+    with app.app_context():
+        return ContadorConsultas(db.engine)
+
+@pytest.fixture
+def login(app):
+    def entrar(email):
+        cliente = app.test_client()
+        resposta = cliente.post("/auth/login", data={"email": email, "senha": "senha"})
+        assert resposta.status_code == 302
+        return cliente
+    return entrar
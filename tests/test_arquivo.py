@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+import pytest
+from models import User, Ponto, ResumoMensal
+from services import arquivo
+from services.ponto import sincronizar_batidas
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+## ARQUIVO FRIO ##
+# O Parquet fica ordenado por usuário e data (também depois de um novo arquivamento com batidas tardias)
+# e a leitura devolve os dias de cada usuário na ordem pedida.
+ANO = date.today().year - 6
+
+@pytest.fixture
+def usuarios(app, contexto, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "ARQUIVO_DIR", str(tmp_path))
+    # Grupos pequenos para que a leitura passe por vários
+    monkeypatch.setattr(arquivo, "TAMANHO_LOTE", 3)
+    return User.query.order_by(User.id).all()
+
+def sincronizar(usuario, dias, prefixo):
+    itens = [
+        {"id": f"{prefixo}{dia}-{hora}", "user_id": usuario.id, "data": dia.isoformat(), "hora": hora}
+        for dia in dias for hora in ("08:00", "17:00")
+    ]
+    sincronizar_batidas(itens, usuario.empresa_id)
+
+def dias_do_ano(*numeros):
+    return [date(ANO, 1, 1) + timedelta(days=numero) for numero in numeros]
+
+def test_arquivar_e_ler_o_ano(usuarios):
+    admin, funcionario = usuarios
+    sincronizar(funcionario, dias_do_ano(0, 40, 80, 120), "f")
+    sincronizar(admin, dias_do_ano(10, 50), "a")
+
+    assert arquivo.arquivar_ano(admin.empresa_id, ANO) == 6
+    assert Ponto.query.count() == 0
+    assert ResumoMensal.query.filter_by(user_id=funcionario.id, ano=ANO).count() == 4
+
+    linhas = list(arquivo.linhas_arquivadas(admin.empresa_id, date(ANO, 1, 1), date(ANO + 1, 1, 1), usuarios=[funcionario.id, admin.id]))
+    assert [(linha.user_id, linha.data) for linha in linhas] == (
+        [(funcionario.id, dia) for dia in dias_do_ano(0, 40, 80, 120)] + [(admin.id, dia) for dia in dias_do_ano(10, 50)]
+    )
+    assert all(linha.qtd_marcacoes == 2 for linha in linhas)
+
+    # Período parcial
+    linhas = arquivo.linhas_arquivadas(admin.empresa_id, date(ANO, 2, 1), date(ANO, 4, 1), usuarios=[funcionario.id])
+    assert [linha.data for linha in linhas] == dias_do_ano(40, 80)
+
+def test_novo_arquivamento_intercala_batidas_tardias(usuarios):
+    admin, funcionario = usuarios
+    sincronizar(funcionario, dias_do_ano(0, 40, 80), "f")
+    sincronizar(admin, dias_do_ano(10), "a")
+    arquivo.arquivar_ano(admin.empresa_id, ANO)
+
+    sincronizar(funcionario, dias_do_ano(20), "t")
+    sincronizar(admin, dias_do_ano(5, 90), "t")
+    assert arquivo.arquivar_ano(admin.empresa_id, ANO) == 3
+
+    tabela = pq.read_table(arquivo.caminho_arquivo(admin.empresa_id, ANO))
+    chaves = list(zip(tabela["user_id"].to_pylist(), tabela["data"].to_pylist()))
+    assert chaves == sorted(chaves)
+    assert len(chaves) == 7
+    assert arquivo.LeitorArquivo(arquivo.caminho_arquivo(admin.empresa_id, ANO)).ordenado
+
+    fechado = ResumoMensal.query.filter_by(user_id=funcionario.id, ano=ANO, mes=1).one()
+    assert fechado.dias_trabalhados == 2
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+from models import User, ResumoMensal
+from services.banco_horas import CAMPOS_MENSAIS, calcular_banco_horas_acumulado, fechar_mes, jornada_diaria
+from services.ponto import sincronizar_batidas
+
+## FECHAMENTO MENSAL ##
+# Batidas que chegam depois do fechamento (terminal offline) corrigem o mês fechado: o resultado tem de ser
+# o mesmo de refazer o fechamento do zero.
+ULTIMO_DIA_MES_ANTERIOR = date.today().replace(day=1) - timedelta(days=1)
+
+def sincronizar(funcionario, *batidas):
+    itens = [{"id": chave, "user_id": funcionario.id, "data": dia.isoformat(), "hora": hora} for chave, dia, hora in batidas]
+    relatorio = sincronizar_batidas(itens, funcionario.empresa_id)
+    assert all(item["status"] == "inserida" for item in relatorio), relatorio
+
+def fechamento(funcionario, dia):
+    resumo = ResumoMensal.query.filter_by(user_id=funcionario.id, ano=dia.year, mes=dia.month).one()
+    return {campo: getattr(resumo, campo) for campo in CAMPOS_MENSAIS}
+
+def test_batidas_tardias_ajustam_o_mes_fechado(contexto):
+    funcionario = User.query.filter_by(email="func@teste").one()
+    dia = ULTIMO_DIA_MES_ANTERIOR
+    sincronizar(funcionario, ("a", dia, "08:00"), ("b", dia, "12:00"))
+    assert fechar_mes(dia.year, dia.month) == 1
+    assert fechamento(funcionario, dia)["dias_trabalhados"] == 1
+
+    # Completa um dia já resumido, abre um dia novo e deixa outro com uma batida só (não conta como trabalhado)
+    sincronizar(
+        funcionario,
+        ("c", dia, "13:00"), ("d", dia, "17:00"),
+        ("e", dia - timedelta(days=1), "08:00"), ("f", dia - timedelta(days=1), "17:00"),
+        ("g", dia - timedelta(days=2), "08:00"),
+    )
+    ajustado = fechamento(funcionario, dia)
+
+    fechar_mes(dia.year, dia.month, refazer=True)
+    assert ajustado == fechamento(funcionario, dia)
+    assert ajustado["dias_trabalhados"] == 2
+    assert ajustado["segundos_trabalhados"] == 17 * 3600
+
+def test_fechar_mes_nao_refaz_mes_ja_fechado(contexto):
+    funcionario = User.query.filter_by(email="func@teste").one()
+    dia = ULTIMO_DIA_MES_ANTERIOR
+    sincronizar(funcionario, ("a", dia, "08:00"), ("b", dia, "17:00"))
+
+    assert fechar_mes(dia.year, dia.month) == 1
+    assert fechar_mes(dia.year, dia.month) == 0
+    assert ResumoMensal.query.count() == 1
+
+def test_acumulado_soma_fechados_e_abertos(contexto):
+    funcionario = User.query.filter_by(email="func@teste").one()
+    fechado = ULTIMO_DIA_MES_ANTERIOR
+    aberto = fechado.replace(day=1) - timedelta(days=1)
+    sincronizar(funcionario, ("a", fechado, "08:00"), ("b", fechado, "17:00"), ("c", aberto, "08:00"), ("d", aberto, "12:00"))
+    fechar_mes(fechado.year, fechado.month)
+
+    meses, dias, totais = calcular_banco_horas_acumulado(funcionario.id, jornada_diaria(funcionario.empresa))
+
+    assert [(mes["ano"], mes["mes"]) for mes in meses] == [(fechado.year, fechado.month)]
+    assert [dia["data"] for dia in dias] == [aberto]
+    assert totais["total_trabalhado"] == timedelta(hours=13)
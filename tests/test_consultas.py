@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+import pytest
+from models import Ponto
+from repositories.ponto import consultar_horarios, pontos_com_marcacoes
+
+## N+1 NAS TELAS DE PONTO ##
+# O número de consultas de cada tela é fixo: não cresce com a quantidade de pontos nem de marcações.
+ULTIMO_DIA_MES_ANTERIOR = date.today().replace(day=1) - timedelta(days=1)
+
+def test_consultar_horarios_em_uma_consulta(contexto, criar_pontos, contar_consultas):
+    user_id = criar_pontos(40, marcacoes=6).id
+
+    with contar_consultas as consultas:
+        linhas = consultar_horarios(Ponto.user_id == user_id, inicio=date.today() - timedelta(days=39)).all()
+
+    assert len(linhas) == 40
+    assert all(linha.qtd_marcacoes == 6 for linha in linhas)
+    assert consultas.total == 1
+
+def test_pontos_com_marcacoes_carregadas(contexto, criar_pontos, contar_consultas):
+    user_id = criar_pontos(40, marcacoes=6).id
+
+    with contar_consultas as consultas:
+        pontos = pontos_com_marcacoes(Ponto.user_id == user_id)
+        horas = [[marcacao.hora for marcacao in ponto.marcacoes] for ponto in pontos]
+
+    assert len(pontos) == 40
+    assert all(lista == sorted(lista) for lista in horas)
+    assert consultas.total == 2
+
+@pytest.mark.parametrize("dias, marcacoes", [(1, 1), (25, 6)])
+@pytest.mark.parametrize("url, email, esperado", [
+    ("/funcionarios/historico", "func@teste", 1),
+    ("/admin/funcionario/{id}/historico", "admin@teste", 2),
+    ("/funcionarios/dashboard/historico?mes={mes:%Y-%m}", "func@teste", 3),
+])
+def test_historico_com_consultas_fixas(banco, criar_pontos, contar_consultas, login, url, email, esperado, dias, marcacoes):
+    # Metade dos pontos no mês anterior (histórico sob demanda) e metade até hoje (mês atual)
+    user_id = criar_pontos(dias, ate=ULTIMO_DIA_MES_ANTERIOR, marcacoes=marcacoes).id
+    criar_pontos(min(dias, date.today().day), marcacoes=marcacoes)
+    cliente = login(email)
+    url = url.format(id=user_id, mes=ULTIMO_DIA_MES_ANTERIOR)
+    # A primeira requisição põe o usuário da sessão em cache (services.identidade); conta-se a seguinte
+    cliente.get(url)
+
+    with contar_consultas as consultas:
+        resposta = cliente.get(url)
+
+    assert resposta.status_code == 200
+    assert consultas.total == esperado
@@ -0,0 +1,75 @@
+import io
+import pytest
+from models import User
+from services.importacao import ERRO_CODIFICACAO, ErroLinha, importar_funcionarios, ler_salario
+
+## IMPORTAÇÃO DE FUNCIONÁRIOS (CSV) ##
+@pytest.mark.parametrize("valor, esperado", [
+    ("3.500,00", 3500.0),
+    ("3500,50", 3500.5),
+    ("3.500", 3500.0),
+    ("1.234.567,89", 1234567.89),
+    ("3500.00", 3500.0),
+    ("3.50", 3.5),
+    ("R$ 2.000,00", 2000.0),
+    ("", 0.0),
+])
+def test_ler_salario(valor, esperado):
+    assert ler_salario(valor) == esperado
+
+@pytest.mark.parametrize("valor", ["3,500.00", "abc", "1.2.3", "3.500,00,00"])
+def test_ler_salario_invalido(valor):
+    with pytest.raises(ErroLinha):
+        ler_salario(valor)
+
+CABECALHO = "nome;cpf;email;cargo;senha;salario_mensal\n"
+
+# Sem o pool de processos para os hashes
+@pytest.fixture
+def importar(app, contexto, monkeypatch):
+    monkeypatch.setitem(app.config, "IMPORTACAO_WORKERS", 0)
+    empresa_id = User.query.filter_by(email="func@teste").one().empresa_id
+    return lambda conteudo: importar_funcionarios(io.BytesIO(conteudo), empresa_id)
+
+def test_importa_com_bom_e_ponto_e_virgula(importar):
+    conteudo = ("\ufeff" + CABECALHO + "Ana;529.982.247-25;ANA@teste;Auxiliar;abc;3.500,00\n").encode("utf-8")
+
+    relatorio = importar(conteudo)
+
+    assert relatorio == {"importados": 1, "erros": []}
+    ana = User.query.filter_by(email="ana@teste").one()
+    assert (ana.cpf, ana.salario_mensal, ana.tipo) == ("52998224725", 3500.0, "funcionario")
+
+def test_linha_fora_do_utf8_para_a_importacao(importar):
+    conteudo = (
+        CABECALHO.encode()
+        + "Ana;52998224725;ana@teste;Auxiliar;abc;1000\n".encode("utf-8")
+        + "José;11144477735;jose@teste;Auxiliar;abc;1000\n".encode("latin-1")
+        + "Bia;39053344705;bia@teste;Auxiliar;abc;1000\n".encode("utf-8")
+    )
+
+    relatorio = importar(conteudo)
+
+    assert relatorio == {"importados": 1, "erros": [{"linha": 3, "mensagem": ERRO_CODIFICACAO}]}
+    assert User.query.filter(User.email.in_(["jose@teste", "bia@teste"])).count() == 0
+
+def test_arquivo_inteiro_fora_do_utf8(importar):
+    conteudo = (CABECALHO.replace("cargo", "função") + "José;11144477735;jose@teste;Auxiliar;abc;1000\n").encode("latin-1")
+
+    relatorio = importar(conteudo)
+
+    assert relatorio == {"importados": 0, "erros": [{"linha": 1, "mensagem": ERRO_CODIFICACAO}]}
+
+def test_erros_por_linha_nao_param_a_importacao(importar):
+    conteudo = (
+        CABECALHO
+        + "Ana;52998224725;ana@teste;Auxiliar;abc;três mil\n"
+        + "Bia;123;bia@teste;Auxiliar;abc;1000\n"
+        + "Caio;39053344705;caio@teste;Auxiliar;abc;1000\n"
+        + "Duda;39053344705;duda@teste;Auxiliar;abc;1000\n"
+    ).encode("utf-8")
+
+    relatorio = importar(conteudo)
+
+    assert relatorio["importados"] == 1
+    assert [erro["linha"] for erro in relatorio["erros"]] == [2, 3, 5]
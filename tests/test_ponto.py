@@ -0,0 +1,76 @@
+from datetime import datetime, time, timedelta, timezone
+from models import User, Ponto, Marcacao, TIPOS_MARCACAO
+from services.ponto import registrar_marcacao, sincronizar_batidas
+
+## TIPOS DAS MARCAÇÕES ##
+# O registro online deriva o tipo da contagem do dia e a sincronização renumera o dia pelo horário.
+# Como a batida online é a mais recente do dia (a sincronização só aceita até 5 minutos no futuro), os dois
+# caminhos chegam à mesma numeração.
+ONTEM = datetime.now(timezone.utc).date() - timedelta(days=1)
+
+def funcionario():
+    return User.query.filter_by(email="func@teste").one()
+
+def batida(chave, hora, usuario, dia=ONTEM):
+    return {"id": chave, "user_id": usuario.id, "data": dia.isoformat(), "hora": hora}
+
+def tipos_do_dia(usuario, dia=ONTEM):
+    return [
+        (marcacao.hora.strftime("%H:%M"), marcacao.tipo)
+        for marcacao in Marcacao.query.join(Ponto).filter(Ponto.user_id == usuario.id, Ponto.data == dia).order_by(Marcacao.hora)
+    ]
+
+def test_registro_online_numera_pela_contagem(contexto):
+    usuario = funcionario()
+    momentos = [datetime.combine(ONTEM, time(hora), timezone.utc) for hora in (8, 12, 13, 17, 18, 19, 20)]
+
+    tipos = [registrar_marcacao(usuario, momento) for momento in momentos]
+
+    assert tipos == TIPOS_MARCACAO + [None]
+    assert [tipo for _, tipo in tipos_do_dia(usuario)] == TIPOS_MARCACAO
+
+def test_sincronizacao_numera_pelo_horario(contexto):
+    usuario = funcionario()
+    itens = [batida(chave, hora, usuario) for chave, hora in [("a", "17:00"), ("b", "08:00"), ("c", "13:00"), ("d", "12:00")]]
+
+    sincronizar_batidas(itens, usuario.empresa_id)
+
+    assert tipos_do_dia(usuario) == list(zip(["08:00", "12:00", "13:00", "17:00"], TIPOS_MARCACAO))
+
+def test_batida_offline_anterior_renumera_as_online(contexto):
+    usuario = funcionario()
+    for hora in (8, 12):
+        registrar_marcacao(usuario, datetime.combine(ONTEM, time(hora), timezone.utc))
+
+    sincronizar_batidas([batida("a", "07:50", usuario)], usuario.empresa_id)
+
+    assert tipos_do_dia(usuario) == list(zip(["07:50", "08:00", "12:00"], TIPOS_MARCACAO))
+
+## IDEMPOTÊNCIA DA SINCRONIZAÇÃO ##
+# A chave é (usuário, id do terminal): repetições no mesmo pacote ou em reenvios não duplicam a batida.
+def test_chave_repetida_no_pacote_e_no_reenvio(contexto):
+    usuario = funcionario()
+    itens = [batida("t1", "08:00", usuario), batida("t1", "08:00", usuario), batida("t2", "12:00", usuario)]
+
+    primeiro = sincronizar_batidas(itens, usuario.empresa_id)
+    reenvio = sincronizar_batidas(itens, usuario.empresa_id)
+
+    assert [item["status"] for item in primeiro] == ["inserida", "duplicada", "inserida"]
+    assert [item["status"] for item in reenvio] == ["duplicada", "duplicada", "duplicada"]
+    assert Marcacao.query.count() == 2
+
+def test_mesmo_id_de_terminal_para_usuarios_diferentes(contexto):
+    usuario = funcionario()
+    admin = User.query.filter_by(email="admin@teste").one()
+
+    relatorio = sincronizar_batidas([batida("t1", "08:00", usuario), batida("t1", "08:00", admin)], usuario.empresa_id)
+
+    assert [item["status"] for item in relatorio] == ["inserida", "inserida"]
+
+def test_batidas_alem_da_sexta_sao_excedentes(contexto):
+    usuario = funcionario()
+    itens = [batida(f"t{hora}", f"{hora:02d}:00", usuario) for hora in range(8, 15)]
+
+    relatorio = sincronizar_batidas(itens, usuario.empresa_id)
+
+    assert [item["status"] for item in relatorio] == ["inserida"] * 6 + ["excedente"]
@@ -0,0 +1,54 @@
+from datetime import date
+import pytest
+from extensions import db
+from models import User
+from repositories.usuarios import codificar_cursor, decodificar_cursor, listar_funcionarios
+
+## PAGINAÇÃO POR CHAVE ##
+# Percorrer as páginas pelo cursor devolve cada funcionário uma única vez, na mesma ordem da consulta sem
+# paginação, inclusive com valores repetidos e admissões nulas (que vão para o fim).
+@pytest.fixture
+def funcionarios(contexto):
+    empresa_id = User.query.filter_by(email="func@teste").one().empresa_id
+    for numero in range(23):
+        db.session.add(User(
+            nome=f"Nome {numero % 4}", email=f"f{numero:02d}@teste", cpf=f"{numero:011d}", senha="x",
+            tipo="funcionario", salario_mensal=1000, empresa_id=empresa_id,
+            data_admissao=date(2024, 1 + numero % 3, 1)
+        ))
+    db.session.flush()
+    # A coluna tem default no INSERT: cadastros antigos sem admissão ficam nulos só por UPDATE
+    db.session.execute(db.update(User).where(User.email.in_([f"f{numero:02d}@teste" for numero in range(0, 23, 5)])).values(data_admissao=None))
+    db.session.commit()
+    return User.empresa_id == empresa_id
+
+def percorrer(filtro, **parametros):
+    vistos, cursor = [], None
+    while True:
+        itens, cursor = listar_funcionarios(filtro, cursor=cursor, por_pagina=5, **parametros)
+        vistos += [item.id for item in itens]
+        if not cursor:
+            return vistos
+
+@pytest.mark.parametrize("ordem", ["nome", "email", "cpf", "admissao"])
+@pytest.mark.parametrize("direcao", ["asc", "desc"])
+def test_paginas_cobrem_a_listagem_sem_repetir(funcionarios, ordem, direcao):
+    completa, proximo = listar_funcionarios(funcionarios, ordem=ordem, direcao=direcao, por_pagina=200)
+
+    assert proximo is None
+    assert percorrer(funcionarios, ordem=ordem, direcao=direcao) == [item.id for item in completa]
+
+def test_admissoes_nulas_ficam_no_fim(funcionarios):
+    for direcao in ("asc", "desc"):
+        itens, _ = listar_funcionarios(funcionarios, ordem="admissao", direcao=direcao, por_pagina=200)
+        admissoes = [item.data_admissao for item in itens]
+        assert None not in admissoes[:admissoes.index(None)]
+        assert set(admissoes[admissoes.index(None):]) == {None}
+
+@pytest.mark.parametrize("valor, ordem", [("Nome 1", "nome"), (date(2024, 2, 1), "admissao"), (None, "admissao")])
+def test_cursor_ida_e_volta(valor, ordem):
+    assert decodificar_cursor(codificar_cursor(valor, 42), ordem) == (valor, 42)
+
+@pytest.mark.parametrize("cursor", ["lixo", "", codificar_cursor("x", "y")])
+def test_cursor_invalido_volta_ao_inicio(cursor):
+    assert decodificar_cursor(cursor, "nome") is None
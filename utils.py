@@ -4,8 +4,7 @@ from flask import abort
 from flask_login import current_user
 from datetime import datetime, date
 from calendar import monthrange
-from extensions import db
-from models import Log
+from services.auditoria import auditoria
 
 # Decorators
 def superadmin_required(f):
@@ -29,11 +28,9 @@ def month_range(ano: int, mes: int):
     ultimo = date(ano, mes, monthrange(ano, mes)[1])
     return primeiro, ultimo
 
-# Ações de log
-def log_action(usuario, acao):
-    novo_log = Log(usuario_id=usuario.id, acao=acao)
-    db.session.add(novo_log)
-    db.session.commit()
+# Ações de log (trilha de auditoria gravada em lote; sincrono=True para ações sensíveis)
+def log_action(usuario, acao, sincrono=False):
+    auditoria.registrar(usuario.id if usuario else None, acao, sincrono=sincrono)
 
 def to_time(d, h):
     if not h:
@@ -136,6 +133,34 @@ def calcular_trct(funcionario, data_demissao):
     }
 
 
+def calcular_holerite(funcionario, horas_dias):
+    jornada_dia = funcionario.empresa.carga_mensal / 22
+    valor_hora = funcionario.salario_mensal / funcionario.empresa.carga_mensal
+
+    total_horas = sum(horas_dias)
+    extras = sum(horas - jornada_dia for horas in horas_dias if horas > jornada_dia)
+
+    # Cálculo do salário
+    valor_base = round(total_horas * valor_hora, 2)
+    valor_extras = round(extras * valor_hora * 1.5, 2) # Total de horas extras
+    bruto = valor_base + valor_extras
+
+    desconto_inss = round(bruto * 0.08, 2)  # 8% de INSS
+    desconto_vt = round(bruto * 0.05, 2)  # 5% de vale transporte
+    liquido = round(bruto - desconto_inss - desconto_vt, 2) # Salário líquido
+
+    return {
+        'dias': len(horas_dias),
+        'horas': round(total_horas, 2),
+        'salario_base': funcionario.salario_mensal,
+        'valor_base': valor_base,
+        'valor_extras': valor_extras,
+        'bruto': bruto,
+        'desconto_inss': desconto_inss,
+        'desconto_vt': desconto_vt,
+        'valor_liquido': liquido
+    }
+
 def validar_cnpj(cnpj: str) -> bool:
     return bool(re.fullmatch(r"\d{14}", cnpj))
 